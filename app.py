@@ -1,54 +1,54 @@
 # --- IMPORTS PRINCIPAIS ---
+import time
+_inicio_execucao = time.perf_counter()
+
 import streamlit as st
 import requests
-import math
 import datetime
+import sqlite3
+
+import clima
+import metricas
+import perfis
+import prefetch
+import registros
+from base_conhecimento import diagnostico
+from motor import gerar_recomendacao, analisar_checkpoint
+from textos import blocos_recomendacao, textos_checkpoint
+from cache import cache_calculos, chave_calculo
+# 'plano' e 'horario' usam pandas/NumPy: importados só quando os Módulos 7 e 8
+# são usados, para não pesar na primeira carga da página
+
+# Janela de check-points usada no diagnóstico automático do Módulo 9
+DIAS_DIAGNOSTICO = 14
+
+@st.cache_resource
+def iniciar_servicos():
+    # Uma vez por processo, não a cada rerun:
+    # endpoint /metrics e/ou log periódico (CEREBRO_METRICAS_*) e o agendador
+    # que mantém as previsões dos sites consultados aquecidas (CEREBRO_PREFETCH_*)
+    metricas.iniciar_do_ambiente()
+    prefetch.iniciar_do_ambiente()
+
+
+iniciar_servicos()
 
 # ==============================================================================
-# MÓDULO 2: BASE DE CONHECIMENTO (O "Receituário")
-# (Copiar exatamente como estava)
+# MÓDULOS 2 e 4: RECEITUÁRIO E CÁLCULOS
+# (Ficam em 'motor.py', junto com a lógica dos Módulos 5 e 6)
 # ==============================================================================
-receituario_agronomico = {
-    "Vegetativo": {
-        "ec_ideal_solucao": 2.2,
-        "ph_ideal_solucao": 5.8,
-        "meta_deficit_pressao_vapor_kpa": 1.0,
-        "kc": 0.6
-    },
-    "Florescimento": {
-        "ec_ideal_solucao": 2.4,
-        "ph_ideal_solucao": 5.8,
-        "meta_deficit_pressao_vapor_kpa": 1.2,
-        "kc": 0.8
-    },
-    "Frutificação Inicial": {
-        "ec_ideal_solucao": 2.5,
-        "ph_ideal_solucao": 5.8,
-        "meta_deficit_pressao_vapor_kpa": 1.2,
-        "kc": 1.0
-    },
-    "Plena Frutificação/Colheita": {
-        "ec_ideal_solucao": 2.8,
-        "ph_ideal_solucao": 5.8,
-        "meta_deficit_pressao_vapor_kpa": 1.3,
-        "kc": 1.15
-    }
-}
 
 # ==============================================================================
 # MÓDULO 3: FUNÇÕES DA API DE CLIMA
-# (Copiar exatamente como estava - V4 Corrigida)
+# (Cliente HTTP, timeouts e caches ficam em 'clima.py')
 # ==============================================================================
 def get_lat_long(cidade, estado):
     try:
-        url_geocoding = f"https://geocoding-api.open-meteo.com/v1/search"
-        params = {"name": cidade, "admin1": estado, "count": 1, "language": "pt", "format": "json"}
-        response = requests.get(url_geocoding, params=params)
-        response.raise_for_status() 
-        data = response.json()
-        if "results" in data and len(data["results"]) > 0:
-            result = data["results"][0]
-            return result["latitude"], result["longitude"], result.get("name", cidade)
+        with metricas.medir("geocoding"):
+            resultado = clima.buscar_lat_long(cidade, estado)
+        if resultado is not None:
+            prefetch.registrar_site(cidade, estado)
+            return tuple(resultado)
         else:
             st.error(f"Erro: Cidade '{cidade}, {estado}' não encontrada.")
             return None, None, None
@@ -56,25 +56,24 @@ def get_lat_long(cidade, estado):
         st.error(f"Erro ao conectar à API de geocoding: {e}")
         return None, None, None
 
+def avisar_se_desatualizada(previsao):
+    if previsao.desatualizada:
+        obtida = datetime.datetime.fromtimestamp(previsao.obtida_em).strftime("%d/%m/%Y %H:%M")
+        st.warning(f"⚠️ API de clima lenta ou indisponível: usando a última previsão conhecida "
+                   f"(obtida em {obtida}, há {previsao.idade_horas:.0f} h). Ela será atualizada em segundo plano.")
+
 def get_previsao_clima(lat, long):
     if lat is None or long is None: return None
     try:
-        url_forecast = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": long,
-            "daily": "shortwave_radiation_sum,temperature_2m_max,temperature_2m_min",
-            "timezone": "auto",
-            "forecast_days": 1
-        }
-        response = requests.get(url_forecast, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if "daily" in data:
+        with metricas.medir("previsao"):
+            previsao = clima.previsao_diaria_imediata(lat, long)
+        if previsao is not None:
+            avisar_se_desatualizada(previsao)
+            daily = previsao.daily
             return {
-                "solar_radiation_sum": data["daily"]["shortwave_radiation_sum"][0], 
-                "temp_max_externa": data["daily"]["temperature_2m_max"][0],
-                "temp_min_externa": data["daily"]["temperature_2m_min"][0]
+                "solar_radiation_sum": daily["shortwave_radiation_sum"][0], 
+                "temp_max_externa": daily["temperature_2m_max"][0],
+                "temp_min_externa": daily["temperature_2m_min"][0]
             }
         else:
             st.error("Erro: Resposta da API de clima não contém dados 'daily'.")
@@ -83,30 +82,57 @@ def get_previsao_clima(lat, long):
         st.error(f"Erro ao conectar à API de clima: {e}")
         return None
 
-# ==============================================================================
-# MÓDULO 4: FUNÇÕES DO "CÉREBRO" (Cálculos)
-# (Copiar exatamente como estava)
-# ==============================================================================
-TRANSMISSIVIDADE_ESTUFA = 0.70
-DENSIDADE_PLANTAS = 3.0
-FATOR_CONVERSAO_RADIACAO_ETO = 0.408
-FRACAO_LIXIVIACAO = 1.20
-
-def calcular_dvp(temperatura, umidade_relativa):
-    if umidade_relativa <= 0 or umidade_relativa > 100: return 0.0
-    pvs = 0.6108 * math.exp((17.27 * temperatura) / (temperatura + 237.3))
-    pva = pvs * (umidade_relativa / 100.0)
-    dvp = pvs - pva
-    return dvp
-
-def calcular_volume_irrigacao(radiacao_solar_externa_mj, kc):
-    radiacao_interna = radiacao_solar_externa_mj * TRANSMISSIVIDADE_ESTUFA
-    eto_mm_dia = radiacao_interna * FATOR_CONVERSAO_RADIACAO_ETO
-    etc_mm_dia = eto_mm_dia * kc
-    litros_por_m2 = etc_mm_dia
-    litros_por_planta = litros_por_m2 / DENSIDADE_PLANTAS
-    volume_total_irrigacao_planta = litros_por_planta * FRACAO_LIXIVIACAO
-    return volume_total_irrigacao_planta
+def get_previsao_clima_dias(lat, long, dias):
+    if lat is None or long is None: return None
+    try:
+        with metricas.medir("previsao_dias"):
+            previsao = clima.previsao_diaria_imediata(lat, long, dias=dias)
+        if previsao is not None:
+            avisar_se_desatualizada(previsao)
+            return previsao.daily
+        else:
+            st.error("Erro: Resposta da API de clima não contém dados 'daily'.")
+            return None
+    except requests.exceptions.RequestException as e:
+        st.error(f"Erro ao conectar à API de clima: {e}")
+        return None
+
+def get_previsao_horaria(lat, long):
+    if lat is None or long is None: return None
+    try:
+        with metricas.medir("previsao_horaria"):
+            hourly = clima.buscar_previsao_horaria(lat, long)
+        if hourly is not None:
+            return hourly
+        else:
+            st.error("Erro: Resposta da API de clima não contém dados 'hourly'.")
+            return None
+    except requests.exceptions.RequestException as e:
+        st.error(f"Erro ao conectar à API de clima: {e}")
+        return None
+
+# Plano (Módulo 7) e perfil horário (Módulo 8) ficam no cache de cálculos do
+# processo: usuários com a mesma previsão e as mesmas entradas compartilham
+# uma única execução. Os DataFrames devolvidos não devem ser alterados.
+def calcular_plano(estagio, daily, ec_drenado, temp_max_int, temp_min_int, umidade, perfil, estufa):
+    from plano import gerar_plano, resumo_plano
+
+    def calcular():
+        plano = gerar_plano(estagio, daily, ec_drenado, temp_max_int, temp_min_int, umidade, perfil, estufa)
+        return plano, resumo_plano(plano)
+
+    chave = chave_calculo("plano", estagio, daily, ec_drenado, temp_max_int, temp_min_int, umidade, perfil, estufa)
+    return cache_calculos().obter(chave, calcular)
+
+def calcular_perfil_horario(estagio, hourly, perfil, estufa):
+    from horario import perfil_horario, horarios_pulsos, janelas_estresse
+
+    def calcular():
+        p = perfis.tabela().linha(estagio, perfil, estufa)
+        curva = perfil_horario(estagio, hourly, perfil, estufa)
+        return curva, horarios_pulsos(curva, p['kc'], parametros=p), janelas_estresse(curva)
+
+    return cache_calculos().obter(chave_calculo("perfil", estagio, hourly, perfil, estufa), calcular)
 
 # ==============================================================================
 # MÓDULO DE INTERFACE (Streamlit)
@@ -141,12 +167,11 @@ if not st.session_state.lead_captured:
             if not nome or not email:
                 st.error("Por favor, preencha todos os campos obrigatórios.")
             else:
-                # --- PRÓXIMO PASSO (V1.3): Salvar o Lead ---
-                # Aqui você adicionaria o código para salvar o (nome, email)
-                # em um Google Sheet ou banco de dados.
-                # Por enquanto, apenas "desbloqueamos" o app.
+                # Salva o lead (fila em memória; gravado em lote em segundo plano)
+                registros.registrar_lead(nome, email)
                 st.session_state.lead_captured = True
                 st.session_state.user_name = nome
+                st.session_state.user_email = email
                 st.rerun() # Recarrega a página no modo "logado"
 
 # --- O APLICATIVO PRINCIPAL (Se o lead foi capturado) ---
@@ -158,15 +183,33 @@ else:
     st.sidebar.header("Módulo 1: Dados do Cliente")
     in_cidade = st.sidebar.text_input('Cidade:', value='Pitimbu')
     in_estado = st.sidebar.text_input('Estado (Sigla):', value='PB')
+    # Perfis de 'dados/perfis.json' (cultura/cultivar e tipo de estufa)
+    tabela_perfis = perfis.tabela()
+    in_perfil = st.sidebar.selectbox(
+        'Cultura/Cultivar:',
+        options=tabela_perfis.perfis,
+        index=tabela_perfis.perfis.index(tabela_perfis.perfil_padrao),
+        format_func=tabela_perfis.nomes.get,
+    )
+    in_estufa = st.sidebar.selectbox(
+        'Tipo de Estufa:',
+        options=tabela_perfis.estufas,
+        index=tabela_perfis.estufas.index(tabela_perfis.estufa_padrao),
+        format_func=tabela_perfis.nomes.get,
+    )
+    estagios_perfil = list(tabela_perfis.estagios_por_perfil[in_perfil])
     in_estagio = st.sidebar.selectbox(
         'Estágio Fenológico:',
-        options=list(receituario_agronomico.keys()),
-        index=1 # Padrão "Florescimento"
+        options=estagios_perfil,
+        index=min(1, len(estagios_perfil) - 1) # Padrão "Florescimento"
     )
     in_temp_max_int = st.sidebar.number_input('Temp. Máx. Interna (24h):', value=30.0, format="%.1f")
     in_temp_min_int = st.sidebar.number_input('Temp. Mín. Interna (24h):', value=20.0, format="%.1f")
     in_umidade_media_int = st.sidebar.number_input('Umidade Média Interna (%):', value=70.0, format="%.1f")
     in_ec_drenado = st.sidebar.number_input('EC da Solução Drenada (mS/cm):', value=2.8, format="%.1f")
+
+    with st.sidebar.expander("Caches (acertos/falhas)"):
+        st.json({**clima.estatisticas_cache(), "calculos": cache_calculos().estatisticas()})
     
     st.divider()
 
@@ -187,90 +230,18 @@ else:
                 
                 radiacao_prevista = dados_clima['solar_radiation_sum']
 
-                # 2. Busca Receituário
-                parametros = receituario_agronomico[in_estagio]
-                ec_ideal_base = parametros['ec_ideal_solucao']
-                ph_ideal = parametros['ph_ideal_solucao']
-                dvp_meta = parametros['meta_deficit_pressao_vapor_kpa']
-                kc_atual = parametros['kc']
-
-                # 3. Lógica de Água e Frequência
-                if radiacao_prevista > 24: recomendacao_agua_freq = "Alta (12-16 pulsos)"
-                elif radiacao_prevista < 15: recomendacao_agua_freq = "Baixa (6-8 pulsos)"
-                else: recomendacao_agua_freq = "Padrão (8-12 pulsos)"
-                
-                recomendacao_agua_vol = calcular_volume_irrigacao(radiacao_prevista, kc_atual)
-                fracao_lix_base = (FRACAO_LIXIVIACAO - 1) * 100
-                nota_lixiviacao = f"(Nota: Volume inclui {fracao_lix_base:.0f}% de lixiviação)"
-
-                # 4. Lógica de Nutrientes (Ajuste Clima + Flush)
-                ec_ajuste_clima = 0.0
-                if radiacao_prevista > 25:
-                    ec_ajuste_clima = -0.2
-                    nota_ajuste_clima = f"(EC reduzido em 0.2 devido à alta radiação prevista de {radiacao_prevista} MJ/m²)"
-                elif radiacao_prevista < 12:
-                    ec_ajuste_clima = 0.2
-                    nota_ajuste_clima = f"(EC aumentado em 0.2 devido à baixa radiação prevista de {radiacao_prevista} MJ/m²)"
-                else:
-                    nota_ajuste_clima = "(EC padrão para esta radiação)"
-                
-                ec_ideal_ajustado = ec_ideal_base + ec_ajuste_clima
-                delta_ec = in_ec_drenado - ec_ideal_ajustado
-                
-                if delta_ec > 0.5:
-                    fator_flush = 1.15 
-                    recomendacao_agua_vol *= fator_flush
-                    acao_nutrientes = (f"**ATENÇÃO:** Risco de salinidade. O EC do dreno ({in_ec_drenado:.1f} mS/cm) está alto.\n"
-                                       f"   - O volume de água já foi aumentado em 15% para lixiviar (lavar) o substrato.\n" 
-                                       f"   - Reduzir o EC da solução nutritiva para {ec_ideal_ajustado - 0.2:.1f} mS/cm temporariamente.")
-                    nota_lixiviacao = f"*(Nota: Volume inclui {fracao_lix_base:.0f}% de lixiviação + 15% de 'flush' para lavagem de sais.)*"
-                elif delta_ec < -0.5:
-                    acao_nutrientes = (f"**INFO:** A planta está absorvendo nutrientes ativamente. O EC do dreno ({in_ec_drenado:.1f} mS/cm) está baixo.\n"
-                                       f"   - Aumentar o EC da solução nutritiva para {ec_ideal_ajustado + 0.2:.1f} mS/cm.")
-                else:
-                    acao_nutrientes = (f"**OK:** O EC do dreno ({in_ec_drenado:.1f} mS/cm) está próximo da meta.\n"
-                                       f"   - Manter o EC da solução nutritiva em {ec_ideal_ajustado:.1f} mS/cm.")
+                # 2. Motor de Recomendação (motor.py) e textos (textos.py)
+                with metricas.medir("calculo"):
+                    r = gerar_recomendacao(in_estagio, radiacao_prevista, in_temp_max_int,
+                                           in_temp_min_int, in_umidade_media_int, in_ec_drenado,
+                                           in_perfil, in_estufa)
+                    blocos = blocos_recomendacao(r, f"{nome_cidade_api}, {in_estado}", datetime.date.today())
+                registros.registrar_recomendacao(r, st.session_state.get("user_email"), in_cidade, in_estado)
 
-                # 5. Lógica de Ambiente (DVP)
-                temp_media_int = (in_temp_max_int + in_temp_min_int) / 2.0
-                dvp_calculado = calcular_dvp(temp_media_int, in_umidade_media_int)
-                alerta_ambiente_str = ""
-                
-                if dvp_calculado > (dvp_meta + 0.3): 
-                    alerta_ambiente_str = f"   - **[ALERTA DE ESTRESSE]**\n"
-                    acao_ambiente = (f"O DVP calculado ({dvp_calculado:.2f} kPa) está acima da meta ({dvp_meta} kPa).\n"
-                                     f"   - O ar está seco, aumentando o risco de estresse hídrico e deficiência de Cálcio (fundo-preto).\n"
-                                     f"   - **AÇÃO:** Aumentar a FREQUÊNCIA dos pulsos (conforme sugerido) para manter o substrato úmido.\n"
-                                     f"   - Se disponível, acionar nebulização/sombreamento.")
-                    recomendacao_agua_freq = f"{recomendacao_agua_freq} (AUMENTADA DEVIDO AO DVP ALTO)"
-                elif dvp_calculado < (dvp_meta - 0.4):
-                    alerta_ambiente_str = f"   - **[ALERTA DE UMIDADE]**\n"
-                    acao_ambiente = (f"O DVP calculado ({dvp_calculado:.2f} kPa) está muito baixo ({dvp_meta} kPa).\n"
-                                     f"   - O ar está muito úmido, reduzindo a transpiração e o risco de doenças fúngicas.\n"
-                                     f"   - **AÇÃO:** Aumentar a ventilação da estufa (abrir janelas/ventoinhas) para renovar o ar.")
-                else:
-                    acao_ambiente = f"**OK:** O DVP calculado ({dvp_calculado:.2f} kPa) está dentro da faixa ideal (Meta: {dvp_meta} kPa)."
-
-                # --- SUCESSO: Exibe o Output ---
-                data_hoje = datetime.date.today().strftime("%d/%m/%Y")
-                st.markdown(f"## --- RECOMENDAÇÃO DE FERTIRRIGAÇÃO ({data_hoje}) ---")
-                st.markdown(f"**Cultura:** Tomate Grape (Estágio: {in_estagio})\n**Local:** {nome_cidade_api}, {in_estado}")
-                
-                st.subheader("1. GESTÃO DE ÁGUA")
-                st.markdown(f"*(Baseado em previsão de {radiacao_prevista:.2f} MJ/m² de radiação)*")
-                st.markdown(f"**Volume Total por Planta:** `{recomendacao_agua_vol:.2f} Litros/planta/dia`")
-                st.markdown(f"**Sugestão de Frequência:** `{recomendacao_agua_freq}`")
-                st.caption(nota_lixiviacao)
-                
-                st.subheader("2. GESTÃO DE NUTRIENTES")
-                st.markdown(f"**Meta de EC Base (Estágio):** `{ec_ideal_base} mS/cm`")
-                st.markdown(f"**Meta de EC Ajustada (Clima):** `{ec_ideal_ajustado:.1f} mS/cm`")
-                st.caption(nota_ajuste_clima)
-                st.markdown(f"**Meta de pH da Solução:** `{ph_ideal}`")
-                st.markdown(f"**AÇÃO:**\n {acao_nutrientes}")
-
-                st.subheader("3. ANÁLISE DE AMBIENTE (INTERNO)")
-                st.markdown(alerta_ambiente_str + "   - " + acao_ambiente)
+                # --- SUCESSO: Exibe o Output (os mesmos blocos dos relatórios em 'relatorios.py') ---
+                with metricas.medir("renderizacao"):
+                    for tipo, texto in blocos:
+                        getattr(st, tipo)(texto)
 
             except Exception as e:
                 st.error(f"Ocorreu um erro ao gerar a recomendação: {e}")
@@ -278,6 +249,83 @@ else:
 
     st.divider()
 
+    # --- MÓDULO 7: Plano de Vários Dias (em um Expander) ---
+    with st.expander("Módulo 7: Plano de Irrigação e EC (Vários Dias)"):
+
+        st.markdown("Plano para o horizonte da previsão, para preparar os tanques da semana de uma vez. "
+                    "Usa os dados do Módulo 1 (as medições de hoje valem para todos os dias).")
+        plano_dias = st.slider('Dias de previsão:', min_value=2, max_value=clima.DIAS_PLANO_MAXIMO, value=clima.DIAS_PLANO_PADRAO)
+
+        if st.button("Gerar Plano"):
+            with st.spinner("Buscando a previsão e calculando o plano..."):
+                try:
+                    lat, long, nome_cidade_api = get_lat_long(in_cidade, in_estado)
+                    if lat is None: raise Exception("Falha no Geocoding.")
+
+                    daily = get_previsao_clima_dias(lat, long, plano_dias)
+                    if daily is None: raise Exception("Falha ao buscar clima.")
+
+                    plano, resumo = calcular_plano(in_estagio, daily, in_ec_drenado, in_temp_max_int,
+                                                   in_temp_min_int, in_umidade_media_int, in_perfil, in_estufa)
+
+                    st.markdown(f"### --- PLANO DE {resumo['dias']} DIAS ---")
+                    st.markdown(f"**Cultura:** {tabela_perfis.nomes[in_perfil]} (Estágio: {in_estagio})\n**Local:** {nome_cidade_api}, {in_estado}")
+                    st.dataframe(plano, hide_index=True)
+
+                    st.markdown(f"**Volume Total por Planta no Período:** `{resumo['volume_total_planta_litros']:.2f} Litros/planta`")
+                    if resumo['ec_solucao_min'] is not None:
+                        st.markdown(f"**EC da Solução no Período:** `{resumo['ec_solucao_min']:.1f} a {resumo['ec_solucao_max']:.1f} mS/cm`")
+                    if resumo['dias_flush']:
+                        st.warning(f"**Dias de 'flush' projetados:** {', '.join(resumo['dias_flush'])}")
+                    if resumo['dias_sem_previsao']:
+                        st.caption(f"({resumo['dias_sem_previsao']} dia(s) sem radiação prevista ficaram de fora dos totais)")
+
+                except Exception as e:
+                    st.error(f"Ocorreu um erro ao gerar o plano: {e}")
+
+    st.divider()
+
+    # --- MÓDULO 8: Perfil Horário (em um Expander) ---
+    with st.expander("Módulo 8: Perfil Horário de DVP e Pulsos"):
+
+        st.markdown("Curva de DVP e radiação de hoje, hora a hora, com o horário sugerido de cada pulso. "
+                    "Usa a previsão do ar externo para a cidade e o estágio do Módulo 1.")
+
+        if st.checkbox("Mostrar perfil horário"):
+            try:
+                lat, long, nome_cidade_api = get_lat_long(in_cidade, in_estado)
+                if lat is None: raise Exception("Falha no Geocoding.")
+
+                hourly = get_previsao_horaria(lat, long)
+                if hourly is None: raise Exception("Falha ao buscar clima.")
+
+                perfil, pulsos, janelas = calcular_perfil_horario(in_estagio, hourly, in_perfil, in_estufa)
+
+                st.markdown(f"**Local:** {nome_cidade_api}, {in_estado}")
+                st.line_chart(perfil.set_index("hora")[["dvp", "dvp_meta"]])
+                st.line_chart(perfil.set_index("hora")[["radiacao_acumulada_mj_m2"]])
+
+                st.subheader("Pulsos sugeridos")
+                if len(pulsos):
+                    st.markdown(f"**{len(pulsos)} pulsos** de `{pulsos['volume_planta_litros'].iloc[0]:.3f} Litros/planta` "
+                                f"(um a cada {pulsos['radiacao_acumulada_mj_m2'].iloc[0]:.1f} MJ/m² de radiação acumulada)")
+                    st.dataframe(pulsos, hide_index=True)
+                else:
+                    st.markdown("Radiação prevista insuficiente para disparar pulsos.")
+
+                st.subheader("Janelas de estresse (DVP)")
+                if len(janelas):
+                    for j in janelas.itertuples():
+                        alerta = "**[ALERTA DE ESTRESSE AGUDO]**" if j.critico else "**[ATENÇÃO: Estresse Elevado]**"
+                        st.markdown(f"{alerta} {j.inicio:%H:%M} a {j.fim:%H:%M} ({j.horas} h, DVP máx. {j.dvp_max:.2f} kPa)")
+                else:
+                    st.markdown("**OK:** O DVP previsto fica dentro da faixa ideal o dia todo.")
+
+            except Exception as e:
+                st.error(f"Ocorreu um erro ao gerar o perfil horário: {e}")
+
+    st.divider()
+
     # --- MÓDULO 6: Check-Point Tático (em um Expander) ---
     with st.expander("Módulo 6: Check-Point de Meio-Dia (Manejo Tático)"):
         
@@ -286,8 +334,8 @@ else:
         # Inputs do Módulo 6
         check_estagio = st.selectbox(
             'Estágio Fenológico (Check):',
-            options=list(receituario_agronomico.keys()),
-            index=1,
+            options=estagios_perfil,
+            index=min(1, len(estagios_perfil) - 1),
             key="check_estagio" # 'key' é importante para diferenciar de outros widgets
         )
         check_temp_atual = st.number_input('Temp. Interna (AGORA):', value=32.0, format="%.1f")
@@ -298,55 +346,22 @@ else:
         if st.button("Analisar Check-Point"):
             with st.spinner("Analisando dados táticos..."):
                 
-                # --- Lógica de Geração (copiada do Módulo 6) ---
-                parametros_check = receituario_agronomico[check_estagio]
-                dvp_meta_check = parametros_check['meta_deficit_pressao_vapor_kpa']
-                
-                DVP_CRITICO = 1.8 
-                dvp_atual = calcular_dvp(check_temp_atual, check_umidade_atual)
-                alerta_ambiente_tatico_str = ""
-
-                if dvp_atual > DVP_CRITICO:
-                    alerta_ambiente_tatico_str = "**[ALERTA DE ESTRESSE AGUDO]**"
-                    acao_ambiente_tatico = (f"O DVP atual ({dvp_atual:.2f} kPa) está acima do limite crítico ({DVP_CRITICO} kPa).\n"
-                                            f"   - A planta está em forte estresse hídrico (risco de 'fundo-preto').\n"
-                                            f"   - **AÇÃO IMEDIATA:** Aumentar a FREQUÊNCIA dos pulsos de irrigação (ex: de 60 para 40 min).\n"
-                                            f"   - Se disponível, acionar nebulização/sombreamento AGORA.")
-                elif dvp_atual > (dvp_meta_check + 0.4):
-                    alerta_ambiente_tatico_str = "**[ATENÇÃO: Estresse Elevado]**"
-                    acao_ambiente_tatico = (f"O DVP atual ({dvp_atual:.2f} kPa) está elevado (Meta: {dvp_meta_check} kPa).\n"
-                                            f"   - Aumentar a frequência dos pulsos de irrigação para o restante da tarde.")
-                else:
-                    acao_ambiente_tatico = f"**OK:** O DVP atual ({dvp_atual:.2f} kPa) está dentro da faixa ideal."
-                
-                delta_ec_tatico = check_ec_dreno_atual - check_ec_aplicado
-                DELTA_EC_CRITICO = 1.0
-                alerta_nutricao_tatico_str = ""
-
-                if delta_ec_tatico > DELTA_EC_CRITICO:
-                    alerta_nutricao_tatico_str = "**[ALERTA DE ACÚMULO SALINO]**"
-                    acao_nutricao_tatico = (f"O EC do dreno ({check_ec_dreno_atual:.1f} mS/cm) está muito acima do EC aplicado ({check_ec_aplicado:.1f} mS/cm).\n"
-                                            f"   - Isso indica que a planta não está conseguindo absorver a solução, e os sais estão concentrando rápido.\n"
-                                            f"   - **AÇÃO IMEDIATA:** Realizar 1-2 pulsos de irrigação com EC 50% mais baixo (ou água pura) para lavar o substrato.")
-                elif delta_ec_tatico < 0.2:
-                    alerta_nutricao_tatico_str = "**[INFO: CONSUMO ALTO]**"
-                    acao_nutricao_tatico = (f"O EC do dreno ({check_ec_dreno_atual:.1f} mS/cm) está muito próximo (ou abaixo) do EC aplicado ({check_ec_aplicado:.1f} mS/cm).\n"
-                                            f"   - A planta está consumindo nutrientes mais rápido do que a aplicação.\n"
-                                            f"   - **AÇÃO:** Considerar aumentar o EC da solução no próximo preparo de tanque.")
-                else:
-                    acao_nutricao_tatico = f"**OK:** O EC do dreno ({check_ec_dreno_atual:.1f} mS/cm) está com um diferencial saudável em relação ao aplicado ({check_ec_aplicado:.1f} mS/cm)."
+                c = analisar_checkpoint(check_estagio, check_temp_atual, check_umidade_atual,
+                                        check_ec_aplicado, check_ec_dreno_atual, in_perfil, in_estufa)
+                t = textos_checkpoint(c)
+                registros.registrar_checkpoint(c, st.session_state.get("user_email"), in_cidade, in_estado)
 
                 # --- Exibe o Output Tático ---
                 data_check = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
                 st.markdown(f"### --- CHECK-POINT DE MANEJO ({data_check}) ---")
                 
                 st.subheader("1. ANÁLISE DE AMBIENTE (TEMPO REAL)")
-                if alerta_ambiente_tatico_str: st.markdown(alerta_ambiente_tatico_str)
-                st.markdown(acao_ambiente_tatico)
+                if t['alerta_ambiente']: st.markdown(t['alerta_ambiente'])
+                st.markdown(t['acao_ambiente'])
                 
                 st.subheader("2. ANÁLISE DE NUTRIÇÃO (TEMPO REAL)")
-                if alerta_nutricao_tatico_str: st.markdown(alerta_nutricao_tatico_str)
-                st.markdown(acao_nutricao_tatico)
+                if t['alerta_nutricao']: st.markdown(t['alerta_nutricao'])
+                st.markdown(t['acao_nutricao'])
 # --- COLE ESTE CÓDIGO NO FINAL DO SEU 'app.py' ---
 # (Ainda dentro do 'else' principal, após o 'expander' do Módulo 6)
 
@@ -361,103 +376,8 @@ else:
         """)
         
         # --- Base de Conhecimento de Diagnóstico ---
-        # (Um sistema especialista simples em forma de dicionário)
-        diagnostico_db = {
-            "Frutos": {
-                "Mancha escura/aquosa no fundo (oposto ao caule)": {
-                    "diagnostico": "Deficiência de Cálcio (Fisiológica) - 'Fundo-Preto' (Blossom-End Rot)",
-                    "causa_provavel": (
-                        "Este é um problema clássico de **transporte de Cálcio**, não de falta dele na solução.\n\n"
-                        "Causas Comuns:\n"
-                        "1. **Estresse Hídrico (DVP Alto):** O ar está muito seco (DVP > 1.5 kPa). A planta transpira muito rápido, e o 'puxão' de água é tão forte que ela não consegue levar o Cálcio (que é um nutriente 'preguiçoso') até a ponta do fruto.\n"
-                        "2. **Acúmulo de Sais (EC do Dreno Alto):** O EC do substrato está muito alto (ex: > 3.5 mS/cm). O excesso de outros sais (K, Mg) compete com o Cálcio e 'bloqueia' sua absorção pela raiz."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO IMEDIATA:**\n"
-                        "1. Use o **Módulo 6** para checar o DVP e o EC do dreno *agora*.\n"
-                        "2. Se o DVP estiver alto, aumente a **FREQUÊNCIA** dos pulsos de irrigação para manter o substrato sempre úmido.\n"
-                        "3. Se o EC do dreno estiver alto, realize um **FLUSH** (conforme Módulo 6) para lavar os sais."
-                    ),
-                    "style": "error" # Mostra como um alerta vermelho
-                },
-                "Rachaduras (principalmente perto do caule)": {
-                    "diagnostico": "Rachaduras por Pressão (Cracking)",
-                    "causa_provavel": (
-                        "Isso é causado por uma **mudança brusca na absorção de água**.\n\n"
-                        "A casca do fruto 'endureceu' durante um período de estresse ou crescimento lento (dias nublados, EC alto), e de repente a planta absorveu muita água (dia de sol forte, ou uma rega muito volumosa após um período seco), 'inflando' o fruto mais rápido do que a casca pode aguentar."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO PREVENTIVA:**\n"
-                        "1. Mantenha a irrigação e o EC do substrato o mais **constante** possível (evite 'altos e baixos').\n"
-                        "2. Use o **Módulo 5** diariamente para ajustar o volume de água à previsão de radiação, evitando excessos em dias nublados e falta em dias de sol."
-                    ),
-                    "style": "warning" # Mostra como um alerta amarelo
-                }
-            },
-            "Folhas Novas (Ponteiro)": {
-                "Amareladas (nervuras verdes, resto amarelo)": {
-                    "diagnostico": "Deficiência de Ferro (Clorose Férrica)",
-                    "causa_provavel": (
-                        "Geralmente não é falta de Ferro na solução, mas sim um **bloqueio de absorção**.\n\n"
-                        "Causa Comum:\n"
-                        "1. **pH da Solução Nutritiva Alto:** O pH na zona da raiz está acima de 6.2-6.5. O Ferro (e outros micronutrientes como Manganês) se torna insolúvel e a planta não consegue absorvê-lo."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO IMEDIATA:**\n"
-                        "1. Verifique o **pH da sua solução nutritiva** e o **pH do seu dreno**.\n"
-                        "2. Certifique-se de que a sua meta de pH (definida no Módulo 5, ex: 5.8) está sendo atingida. Ajuste seu dosador de ácido se necessário."
-                    ),
-                    "style": "warning"
-                },
-                "Folhas pequenas, deformadas ou 'queimadas' na ponta": {
-                    "diagnostico": "Deficiência de Cálcio (Sistêmico) ou Boro",
-                    "causa_provavel": (
-                        "Similar ao 'Fundo-Preto' no fruto, isso indica um problema de **transporte de Cálcio** para os pontos de crescimento mais novos (o 'ponteiro').\n\n"
-                        "Causa Comum:\n"
-                        "1. **DVP Muito Baixo (Umidade Alta):** O ar está muito úmido (DVP < 0.5 kPa). A planta não consegue transpirar, e sem transpiração, não há 'puxão' de água para levar o Cálcio até as folhas novas.\n"
-                        "2. **DVP Muito Alto (Estresse):** O estresse é tão grande que o fluxo de água é interrompido."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO IMEDIATA:**\n"
-                        "1. Use o **Módulo 6** para checar o DVP.\n"
-                        "2. Se o DVP estiver **muito baixo** (muito úmido), aumente a ventilação da estufa (abra janelas/ventoinhas) para forçar a transpiração.\n"
-                        "3. Se o DVP estiver **muito alto**, siga as recomendações de aumentar a frequência de rega."
-                    ),
-                    "style": "error"
-                }
-            },
-            "Folhas Velhas (Baixeiro)": {
-                "Amarelamento geral (começa nas pontas e avança)": {
-                    "diagnostico": "Deficiência de Nitrogênio (N)",
-                    "causa_provavel": (
-                        "A planta está 'passando fome' e 'comendo' seus próprios tecidos. O Nitrogênio é um nutriente móvel, então a planta o retira das folhas velhas (menos importantes) para enviar às folhas novas (crescimento).\n\n"
-                        "Causa Comum:\n"
-                        "1. **EC da Solução Aplicada Muito Baixo:** O EC alvo (definido no Módulo 5) está abaixo da demanda da planta para o estágio atual."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO IMEDIATA:**\n"
-                        "1. Verifique o EC da solução que você está aplicando. Ele está de acordo com a meta do **Módulo 5**?\n"
-                        "2. Use o **Módulo 6** para checar o Delta de EC. Se o EC do dreno estiver *abaixo* do EC aplicado, é um sinal claro de alto consumo. Aumente o EC da sua solução."
-                    ),
-                    "style": "warning"
-                },
-                "Amarelamento entre as nervuras (V invertido)": {
-                    "diagnostico": "Deficiência de Magnésio (Mg)",
-                    "causa_provavel": (
-                        "O Magnésio é o centro da molécula de clorofila. A planta o retira das folhas velhas para as novas.\n\n"
-                        "Causa Comum:\n"
-                        "1. **EC da Solução Aplicada Muito Baixo** (similar ao Nitrogênio).\n"
-                        "2. **Excesso de Potássio (K):** O Potássio (K) compete diretamente com o Magnésio (Mg) pela absorção. Se o EC do seu dreno está muito alto (Módulo 6), o excesso de K pode estar bloqueando o Mg."
-                    ),
-                    "acao_recomendada": (
-                        "**AÇÃO IMEDIATA:**\n"
-                        "1. Verifique o EC da solução aplicada (Módulo 5).\n"
-                        "2. Verifique se há acúmulo de sais no dreno (Módulo 6). Se o EC do dreno estiver alto, aplique um 'flush' para reequilibrar os nutrientes no substrato."
-                    ),
-                    "style": "warning"
-                }
-            }
-        }
+        # (Carregada uma vez por processo de 'dados/diagnostico.json')
+        diagnostico_db = diagnostico()
         
         # --- Lógica do Fluxograma ---
         
@@ -483,3 +403,45 @@ else:
                     st.warning(f"**Causa Provável:**\n{resultado['causa_provavel']}")
                 
                 st.info(f"**Ação Recomendada (Pelo Cérebro):**\n{resultado['acao_recomendada']}")
+
+        # --- Diagnóstico automático (regras de 'dados/diagnostico.json' x dados medidos) ---
+        st.markdown("---")
+        st.markdown(f"**Diagnósticos prováveis pelos dados medidos** (check-points do Módulo 6 "
+                    f"em {in_cidade}, {in_estado}, últimos {DIAS_DIAGNOSTICO} dias)")
+        if st.button("Ranquear diagnósticos"):
+            from detetive import colunas_checkpoints, ranquear_sites
+
+            inicio = (datetime.date.today() - datetime.timedelta(days=DIAS_DIAGNOSTICO)).isoformat()
+            try:
+                linhas = registros.historico_site("checkpoints", in_cidade, in_estado, inicio=inicio)
+                ranking = ranquear_sites({in_cidade: colunas_checkpoints(linhas)},
+                                         perfil=in_perfil, estufa=in_estufa) if linhas else None
+            except sqlite3.Error as e:
+                st.error(f"Não foi possível ler os check-points registrados ({e}). "
+                         "Use o diagnóstico pelos sintomas, acima.")
+            except (ValueError, KeyError) as e:
+                st.error(f"Ocorreu um erro ao ranquear os diagnósticos: {e.args[0] if isinstance(e, KeyError) else e}")
+            else:
+                if not linhas:
+                    st.info("Nenhum check-point registrado para este site. Use o Módulo 6 para registrar medições.")
+                elif ranking.empty:
+                    st.success(f"**OK:** Nenhuma regra de diagnóstico disparou nos {len(linhas)} check-points.")
+                else:
+                    for d in ranking.head(3).itertuples():
+                        st.markdown(f"**{d.diagnostico}** ({d.local}: {d.sintoma}) — pontuação `{d.pontuacao:.2f}`\n"
+                                    f"   - Evidência: {d.evidencia} em {d.fracao_leituras:.0%} dos {len(linhas)} check-points")
+
+# --- Perfil de execução (tempo de Python de cada rerun, nesta sessão) ---
+_tempo_ms = (time.perf_counter() - _inicio_execucao) * 1000
+metricas.observar("cerebro_etapa_segundos", _tempo_ms / 1000, etapa="rerun")
+st.session_state.setdefault("primeira_execucao_ms", _tempo_ms)
+_tempos = st.session_state.setdefault("tempos_execucao_ms", [])
+_tempos.append(_tempo_ms)
+del _tempos[:-50]
+with st.sidebar.expander("Desempenho (ms por execução)"):
+    st.json({
+        "primeira_execucao": round(st.session_state.primeira_execucao_ms, 2),
+        "ultima_execucao": round(_tempo_ms, 2),
+        "mediana_ultimas": round(sorted(_tempos)[len(_tempos) // 2], 2),
+        "execucoes": len(_tempos),
+    })
@@ -0,0 +1,38 @@
+# ==============================================================================
+# BASES DE CONHECIMENTO (Perfis/Receituário e Detetive de Sintomas)
+# Os dados ficam em 'dados/*.json' e são carregados uma única vez por
+# processo. O Streamlit reexecuta o 'app.py' a cada interação, mas este
+# módulo fica em sys.modules: cada rerun só recebe a mesma estrutura pronta.
+# As estruturas são somente-leitura porque são compartilhadas entre sessões.
+# ==============================================================================
+import functools
+import json
+import os
+from types import MappingProxyType
+
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+
+
+def _congelar(valor):
+    if isinstance(valor, dict):
+        return MappingProxyType({k: _congelar(v) for k, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _carregar(nome):
+    with open(os.path.join(DIRETORIO_DADOS, nome), encoding="utf-8") as f:
+        return _congelar(json.load(f))
+
+
+@functools.lru_cache(maxsize=None)
+def perfis():
+    """Culturas, cultivares, estágios e estufas (Módulo 2); resolvidos em 'perfis.py'."""
+    return _carregar("perfis.json")
+
+
+@functools.lru_cache(maxsize=None)
+def diagnostico():
+    """Local do sintoma -> sintoma -> diagnóstico (Módulo 9)."""
+    return _carregar("diagnostico.json")
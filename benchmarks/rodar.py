@@ -0,0 +1,359 @@
+# ==============================================================================
+# BENCHMARKS DO PIPELINE DE RECOMENDAÇÃO
+# Suítes:
+#   calculo      - funções escalares do 'motor' vs. versão vetorizada do 'lote'
+#   ponta_a_ponta - geocoding + previsão + Módulo 5 com cache frio e quente,
+#                   e um lote de sites buscado em paralelo
+#   sessoes      - várias sessões simultâneas do 'app.py' (AppTest do Streamlit,
+#                   uma por processo, com o cache em disco compartilhado)
+# O open-meteo é substituído por 'servidor_openmeteo.py' (respostas gravadas,
+# latência configurável); nada sai para a rede.
+#
+# Os resultados são comparados com 'baseline.json': uma métrica que piora
+# além da tolerância faz o comando sair com código 1.
+#
+# Uso: python benchmarks/rodar.py                   (compara com o baseline)
+#      python benchmarks/rodar.py --salvar-baseline (grava um novo baseline)
+#      python benchmarks/rodar.py --suites calculo --latencia-ms 0
+# ==============================================================================
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRETORIO)
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, DIRETORIO)
+
+ARQUIVO_BASELINE = os.path.join(DIRETORIO, "baseline.json")
+SUITES = ("calculo", "ponta_a_ponta", "sessoes")
+TOLERANCIA_PADRAO = 0.30
+
+
+def _metrica(valor, unidade, maior_melhor=False):
+    return {"valor": round(valor, 4), "unidade": unidade, "maior_melhor": maior_melhor}
+
+
+def _mediana_ms(tempos):
+    return statistics.median(tempos) * 1000
+
+
+def _p95_ms(tempos):
+    ordenados = sorted(tempos)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000
+
+
+def _sites_aleatorios(n, semente=0, com_radiacao=True):
+    import numpy as np
+    import pandas as pd
+    import motor
+
+    rng = np.random.default_rng(semente)
+    sites = pd.DataFrame({
+        "cidade": [f"Cidade {i}" for i in range(n)],
+        "estado": "PB",
+        "estagio": rng.choice(list(motor.receituario_agronomico), n),
+        "temp_max_int": rng.uniform(24, 38, n).round(1),
+        "temp_min_int": rng.uniform(14, 24, n).round(1),
+        "umidade_media_int": rng.uniform(40, 95, n).round(1),
+        "ec_drenado": rng.uniform(1.5, 4.0, n).round(1),
+    })
+    if com_radiacao:
+        sites["radiacao_prevista"] = rng.uniform(8, 30, n).round(2)
+    return sites
+
+
+def suite_calculo(args):
+    import numpy as np
+    import lote
+    import motor
+
+    r = {}
+    n = 200_000
+    r["calculo.dvp_escalar_us"] = _metrica(
+        min(timeit.repeat(lambda: motor.calcular_dvp(28.5, 65.0), number=n, repeat=3)) / n * 1e6, "us")
+    r["calculo.volume_escalar_us"] = _metrica(
+        min(timeit.repeat(lambda: motor.calcular_volume_irrigacao(22.0, 0.8), number=n, repeat=3)) / n * 1e6, "us")
+
+    sites = _sites_aleatorios(10_000)
+    linhas = list(sites[["estagio", "radiacao_prevista", "temp_max_int", "temp_min_int",
+                         "umidade_media_int", "ec_drenado"]].itertuples(index=False))
+    inicio = time.perf_counter()
+    for linha in linhas:
+        motor.gerar_recomendacao(*linha)
+    r["calculo.recomendacao_escalar_por_s"] = _metrica(len(linhas) / (time.perf_counter() - inicio), "ops/s", True)
+
+    for tamanho in (1_000, 10_000, 100_000):
+        sites = _sites_aleatorios(tamanho)
+        tempos = [0.0] * 5
+        for i in range(len(tempos)):
+            inicio = time.perf_counter()
+            lote.gerar_recomendacoes(sites)
+            tempos[i] = time.perf_counter() - inicio
+        r[f"calculo.lote_{tamanho}_ms"] = _metrica(_mediana_ms(tempos), "ms")
+    r["calculo.lote_por_s"] = _metrica(100_000 / (r["calculo.lote_100000_ms"]["valor"] / 1000), "linhas/s", True)
+
+    rng = np.random.default_rng(1)
+    for tamanho in (1_000, 100_000, 1_000_000):
+        temperatura = rng.uniform(10, 40, tamanho)
+        umidade = rng.uniform(20, 100, tamanho)
+        tempos = timeit.repeat(lambda: lote.calcular_dvp_vetorizado(temperatura, umidade), number=1, repeat=5)
+        r[f"calculo.dvp_vetorizado_{tamanho}_ms"] = _metrica(_mediana_ms(tempos), "ms")
+
+    import cenarios
+    tabela = cenarios.TabelaRecomendacao.construir()
+    sites = _sites_aleatorios(100_000)
+    colunas = [sites[c].to_numpy() for c in ("estagio", "radiacao_prevista", "temp_max_int", "temp_min_int",
+                                             "umidade_media_int", "ec_drenado")]
+    tempos = timeit.repeat(lambda: tabela.consultar(*colunas), number=1, repeat=5)
+    r["calculo.tabela_consulta_100000_ms"] = _metrica(_mediana_ms(tempos), "ms")
+    eixos = (None, np.arange(0, 40, 0.5), np.arange(0, 8, 0.05), np.arange(10, 40, 1.0), np.arange(30, 100, 2.0))
+    tempos = timeit.repeat(lambda: cenarios.varrer(*eixos), number=1, repeat=5)
+    r["calculo.varredura_ms"] = _metrica(_mediana_ms(tempos), "ms")
+    return r
+
+
+def suite_ponta_a_ponta(args):
+    import cache
+    import clima
+    import lote
+    import motor
+
+    def recomendacao():
+        lat, long, _ = clima.buscar_lat_long("Pitimbu", "PB")
+        daily = clima.buscar_previsao_diaria(lat, long)
+        return motor.gerar_recomendacao("Florescimento", daily["shortwave_radiation_sum"][0], 30.0, 20.0, 70.0, 2.8)
+
+    r = {}
+    frio = []
+    for _ in range(args.repeticoes_frio):
+        cache.reiniciar_caches(tempfile.mkdtemp(prefix="cerebro_bench_"))
+        inicio = time.perf_counter()
+        recomendacao()
+        frio.append(time.perf_counter() - inicio)
+    r["ponta_a_ponta.cache_frio_ms"] = _metrica(_mediana_ms(frio), "ms")
+
+    quente = []
+    for _ in range(200):
+        inicio = time.perf_counter()
+        recomendacao()
+        quente.append(time.perf_counter() - inicio)
+    r["ponta_a_ponta.cache_quente_ms"] = _metrica(_mediana_ms(quente), "ms")
+
+    cache.reiniciar_caches(tempfile.mkdtemp(prefix="cerebro_bench_"))
+    sites = _sites_aleatorios(args.sites_lote, com_radiacao=False)
+    inicio = time.perf_counter()
+    primeira = None
+    for _ in lote.recomendacoes_em_fluxo(sites):
+        if primeira is None:
+            primeira = time.perf_counter() - inicio
+    total = time.perf_counter() - inicio
+    r[f"ponta_a_ponta.lote_{args.sites_lote}_sites_frio_ms"] = _metrica(total * 1000, "ms")
+    r[f"ponta_a_ponta.lote_{args.sites_lote}_sites_primeira_parte_ms"] = _metrica(primeira * 1000, "ms")
+    return r
+
+
+class FalhaSuite(Exception):
+    """A suíte não tem medidas confiáveis (ex: uma sessão terminou com erro)."""
+
+
+ESPERA_SESSOES_S = 300
+
+
+def _gerar_recomendacoes(at, cliques, latencias):
+    # Clica 'cliques' vezes em "Gerar Recomendação"; devolve os erros do app
+    erros = []
+    for _ in range(cliques):
+        botoes = [b for b in at.button if b.label.startswith("Gerar Recomendação")]
+        if not botoes:
+            raise RuntimeError("botão 'Gerar Recomendação' não encontrado no app")
+        inicio = time.perf_counter()
+        botoes[0].click().run()
+        latencias.append(time.perf_counter() - inicio)
+        if at.exception:
+            erros.append(f"exceção no app: {at.exception[0].message}")
+        elif at.error:
+            erros.append(f"erro no app: {at.error[0].value}")
+    return erros
+
+
+def _abrir_app(indice):
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+
+    # Fora da thread do ScriptRunner o AppTest avisa "missing ScriptRunContext"
+    # a cada acesso ao session_state
+    streamlit.logger.set_log_level("error")
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=120)
+    at.session_state["lead_captured"] = True
+    at.session_state["user_name"] = f"bench{indice}"
+    at.run()
+    return at
+
+
+def _sessao(indice, cliques, barreira, fila):
+    # Uma sessão por processo: o AppTest troca o Runtime global do Streamlit
+    # a cada execução, então sessões em threads do mesmo processo se atropelam
+    latencias, erros, inicio, fim = [], [], None, None
+    try:
+        at = _abrir_app(indice)
+        barreira.wait(timeout=ESPERA_SESSOES_S)
+        inicio = time.time()
+        erros = _gerar_recomendacoes(at, cliques, latencias)
+        fim = time.time()
+    except Exception as e:
+        erros.append(f"{type(e).__name__}: {e}")
+        barreira.abort()
+    fila.put((indice, latencias, erros, inicio, fim))
+
+
+def _rodar_sessoes(sessoes, cliques):
+    # (resultados de '_sessao', falhas): 'sessoes' processos ao mesmo tempo.
+    # O processo principal nunca roda o app: o ScriptRunner do Streamlit
+    # troca o módulo __main__, de que o 'spawn' precisa
+    import multiprocessing
+    import queue
+
+    contexto = multiprocessing.get_context("spawn")
+    barreira = contexto.Barrier(sessoes)
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=_sessao, args=(i, cliques, barreira, fila)) for i in range(sessoes)]
+    for p in processos:
+        p.start()
+    resultados = []
+    try:
+        for _ in processos:
+            resultados.append(fila.get(timeout=ESPERA_SESSOES_S + 120 * cliques))
+    except queue.Empty:
+        pass
+    finally:
+        for p in processos:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+    falhas = [f"sessão {indice}: {e}" for indice, _, erros, _, _ in resultados for e in erros]
+    if len(resultados) < sessoes:
+        falhas.append(f"{sessoes - len(resultados)} sessão(ões) não terminaram")
+    return resultados, falhas
+
+
+def suite_sessoes(args):
+    # Caches em disco novos, compartilhados pelos processos das sessões; uma
+    # primeira sessão sozinha aquece o cache, como o primeiro usuário do dia
+    os.environ["CEREBRO_CACHE_DIR"] = tempfile.mkdtemp(prefix="cerebro_bench_")
+    _, falhas = _rodar_sessoes(1, 1)
+    if not falhas:
+        resultados, falhas = _rodar_sessoes(args.sessoes, args.cliques)
+    if falhas:
+        for falha in falhas:
+            print(f"  {falha}", file=sys.stderr)
+        raise FalhaSuite(f"{len(falhas)} falha(s) nas sessões; as medidas seriam só das que sobraram")
+
+    latencias = [t for _, lat, _, _, _ in resultados for t in lat]
+    total = max(r[4] for r in resultados) - min(r[3] for r in resultados)
+    return {
+        "sessoes.recomendacao_p50_ms": _metrica(_mediana_ms(latencias), "ms"),
+        "sessoes.recomendacao_p95_ms": _metrica(_p95_ms(latencias), "ms"),
+        "sessoes.recomendacoes_por_s": _metrica(len(latencias) / total, "ops/s", True),
+    }
+
+
+def comparar(atual, baseline, tolerancia):
+    """Linhas (nome, base, atual, variação, regrediu) das métricas em comum."""
+    linhas = []
+    for nome, m in atual.items():
+        base = baseline.get(nome)
+        if base is None or not base["valor"]:
+            linhas.append((nome, None, m, None, False))
+            continue
+        variacao = m["valor"] / base["valor"] - 1
+        if m["maior_melhor"]:
+            regrediu = variacao < -tolerancia
+        else:
+            regrediu = variacao > tolerancia
+        linhas.append((nome, base, m, variacao, regrediu))
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de recomendação.")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--latencia-ms", type=float, default=80.0, help="Latência simulada do open-meteo")
+    parser.add_argument("--repeticoes-frio", type=int, default=5)
+    parser.add_argument("--sites-lote", type=int, default=200)
+    parser.add_argument("--sessoes", type=int, default=8, help="Sessões simultâneas do app")
+    parser.add_argument("--cliques", type=int, default=5, help="Recomendações por sessão")
+    parser.add_argument("--baseline", default=ARQUIVO_BASELINE)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    from servidor_openmeteo import ServidorOpenMeteo
+
+    with ServidorOpenMeteo(latencia_ms=args.latencia_ms) as servidor:
+        # Antes de importar 'clima': URLs do substituto, cache e registros descartáveis e
+        # sem teto de taxa (o objetivo é medir o pipeline, não o limitador) e
+        # sem o agendador de pré-busca (as requisições contadas são só as da suíte)
+        os.environ["CEREBRO_URL_GEOCODING"] = servidor.url_geocoding
+        os.environ["CEREBRO_URL_FORECAST"] = servidor.url_forecast
+        os.environ["CEREBRO_CACHE_DIR"] = tempfile.mkdtemp(prefix="cerebro_bench_")
+        os.environ["CEREBRO_REGISTROS_DB"] = os.path.join(os.environ["CEREBRO_CACHE_DIR"], "registros.sqlite3")
+        os.environ.setdefault("CEREBRO_REQUISICOES_POR_SEGUNDO", "0")
+        os.environ["CEREBRO_PREFETCH"] = "0"
+
+        resultados = {}
+        falhas = 0
+        for suite in args.suites:
+            print(f"== {suite}", file=sys.stderr)
+            antes = sum(servidor.contadores.values())
+            try:
+                resultados.update(globals()[f"suite_{suite}"](args))
+            except FalhaSuite as e:
+                print(f"falha na suíte {suite}: {e}", file=sys.stderr)
+                falhas += 1
+                continue
+            requisicoes = sum(servidor.contadores.values()) - antes
+            if requisicoes:
+                # Mais requisições que o baseline = cache ou agrupamento quebrado
+                resultados[f"{suite}.requisicoes_open_meteo"] = _metrica(requisicoes, "req")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metricas"]
+
+    regressoes = 0
+    for nome, base, m, variacao, regrediu in comparar(resultados, baseline, args.tolerancia):
+        base_txt = "-" if base is None else f"{base['valor']:.4g}"
+        var_txt = "" if variacao is None else f"{variacao:+.0%}"
+        marca = "  << REGRESSÃO" if regrediu else ""
+        print(f"{nome:<52}{base_txt:>12}{m['valor']:>12.4g} {m['unidade']:<9}{var_txt:>7}{marca}")
+        regressoes += regrediu
+
+    if falhas:
+        print(f"{falhas} suíte(s) falharam; baseline não gravado", file=sys.stderr)
+        sys.exit(1)
+    if args.salvar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "parametros": {k: v for k, v in vars(args).items() if k not in ("baseline", "salvar_baseline", "suites")},
+                "metricas": {**baseline, **resultados},
+            }, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"baseline gravado em {args.baseline}", file=sys.stderr)
+    elif regressoes:
+        print(f"{regressoes} métrica(s) pioraram mais de {args.tolerancia:.0%} em relação ao baseline", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
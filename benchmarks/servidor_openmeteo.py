@@ -0,0 +1,166 @@
+# ==============================================================================
+# SUBSTITUTO LOCAL DO OPEN-METEO (para benchmarks)
+# Servidor HTTP que devolve as respostas gravadas em 'respostas/' com uma
+# latência configurável, imitando as duas APIs usadas por 'clima.py':
+#   /v1/search    -> geocoding (qualquer cidade, exceto CIDADE_INEXISTENTE)
+#   /v1/forecast  -> previsão 'daily' e/ou 'hourly', uma ou várias coordenadas
+# Cada cidade recebe coordenadas próprias (derivadas do nome), para que os
+# lotes de vários sites não caiam todos no mesmo ponto da previsão. Como no
+# open-meteo, as datas de 'time' começam no dia de hoje do fuso da resposta
+# ('utc_offset_seconds').
+#
+# Uso: python benchmarks/servidor_openmeteo.py --porta 8765 --latencia-ms 80
+#      CEREBRO_URL_GEOCODING=http://127.0.0.1:8765/v1/search
+#      CEREBRO_URL_FORECAST=http://127.0.0.1:8765/v1/forecast
+# ==============================================================================
+import argparse
+import copy
+import datetime
+import json
+import os
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DIRETORIO_RESPOSTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "respostas")
+CIDADE_INEXISTENTE = "Inexistente"
+
+
+def _carregar(nome):
+    with open(os.path.join(DIRETORIO_RESPOSTAS, nome), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _repetir(valores, n):
+    return [valores[i % len(valores)] for i in range(n)]
+
+
+class ServidorOpenMeteo:
+    """Servidor em uma thread própria; 'contadores' conta as requisições."""
+
+    def __init__(self, porta=0, latencia_ms=0.0):
+        self.latencia_ms = latencia_ms
+        self.contadores = {"geocoding": 0, "forecast": 0}
+        self._trava = threading.Lock()
+        self._geocoding = _carregar("geocoding.json")
+        self._daily = _carregar("forecast_daily.json")
+        self._hourly = _carregar("forecast_hourly.json")
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.endswith("/search"):
+                    corpo = servidor.geocoding(params)
+                elif url.path.endswith("/forecast"):
+                    corpo = servidor.forecast(params)
+                else:
+                    self.send_error(404)
+                    return
+                if servidor.latencia_ms:
+                    time.sleep(servidor.latencia_ms / 1000)
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self._http.daemon_threads = True
+        self._thread = None
+
+    @property
+    def porta(self):
+        return self._http.server_address[1]
+
+    @property
+    def url_geocoding(self):
+        return f"http://127.0.0.1:{self.porta}/v1/search"
+
+    @property
+    def url_forecast(self):
+        return f"http://127.0.0.1:{self.porta}/v1/forecast"
+
+    def _contar(self, api):
+        with self._trava:
+            self.contadores[api] += 1
+
+    def geocoding(self, params):
+        self._contar("geocoding")
+        nome = params.get("name", "")
+        if nome == CIDADE_INEXISTENTE:
+            return {"generationtime_ms": self._geocoding["generationtime_ms"]}
+        corpo = copy.deepcopy(self._geocoding)
+        resultado = corpo["results"][0]
+        deslocamento = zlib.crc32(nome.encode("utf-8")) % 10000
+        resultado["name"] = nome
+        resultado["latitude"] = round(resultado["latitude"] - deslocamento // 100 * 0.05, 5)
+        resultado["longitude"] = round(resultado["longitude"] - deslocamento % 100 * 0.05, 5)
+        return corpo
+
+    def forecast(self, params):
+        self._contar("forecast")
+        dias = int(params.get("forecast_days", 1))
+        latitudes = params["latitude"].split(",")
+        longitudes = params["longitude"].split(",")
+        fuso = self._daily["utc_offset_seconds"]
+        hoje = datetime.datetime.fromtimestamp(time.time() + fuso, datetime.timezone.utc).date()
+        datas = [(hoje + datetime.timedelta(days=i)).isoformat() for i in range(dias)]
+        corpos = []
+        for lat, long in zip(latitudes, longitudes):
+            corpo = {k: v for k, v in self._daily.items() if k not in ("daily", "daily_units")}
+            corpo["latitude"], corpo["longitude"] = float(lat), float(long)
+            if "daily" in params:
+                corpo["daily_units"] = self._daily["daily_units"]
+                corpo["daily"] = {"time": datas}
+                corpo["daily"].update((v, _repetir(self._daily["daily"][v], dias)) for v in params["daily"].split(","))
+            if "hourly" in params:
+                corpo["hourly_units"] = self._hourly["hourly_units"]
+                corpo["hourly"] = {"time": [f"{d}T{h:02d}:00" for d in datas for h in range(24)]}
+                corpo["hourly"].update((v, _repetir(self._hourly["hourly"][v], 24 * dias))
+                                       for v in params["hourly"].split(","))
+            corpos.append(corpo)
+        return corpos[0] if len(corpos) == 1 else corpos
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Substituto local do open-meteo para benchmarks.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    servidor = ServidorOpenMeteo(args.porta, args.latencia_ms)
+    print(f"CEREBRO_URL_GEOCODING={servidor.url_geocoding}")
+    print(f"CEREBRO_URL_FORECAST={servidor.url_forecast}")
+    try:
+        servidor._http.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# ==============================================================================
+# CACHE EM DISCO (SQLite) COMPARTILHADO ENTRE SESSÕES
+# O Streamlit reexecuta o 'app.py' a cada interação, então qualquer objeto
+# criado lá é perdido. Este módulo é importado uma única vez por processo e o
+# arquivo SQLite sobrevive a reinícios do servidor.
+#
+# Todas as sessões do Streamlit rodam no mesmo processo e veem as mesmas
+# instâncias: buscas e cálculos iguais feitos ao mesmo tempo por vários
+# usuários viram uma execução só ('GrupoVoos'), e as camadas em memória têm
+# tamanho limitado (sai o item usado há mais tempo).
+# ==============================================================================
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import metricas
+
+DIRETORIO_CACHE = os.environ.get("CEREBRO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+GEOCODING_TTL_DIAS = float(os.environ.get("CEREBRO_GEOCODING_TTL_DIAS", "180"))
+ULTIMA_PREVISAO_TTL_DIAS = float(os.environ.get("CEREBRO_ULTIMA_PREVISAO_TTL_DIAS", "7"))
+SITES_TTL_DIAS = float(os.environ.get("CEREBRO_SITES_TTL_DIAS", "30"))
+# Itens mantidos em memória por cache (o SQLite continua com tudo)
+MEMORIA_MAX_ITENS = int(os.environ.get("CEREBRO_CACHE_MEMORIA_MAX", "4096"))
+CALCULOS_MAX_ITENS = int(os.environ.get("CEREBRO_CACHE_CALCULOS_MAX", "256"))
+
+
+def normalizar_chave(*partes):
+    # "Pitimbu", " pitimbú " e "PITIMBU" viram a mesma chave
+    normalizadas = []
+    for parte in partes:
+        texto = unicodedata.normalize("NFKD", str(parte).strip().lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        normalizadas.append(" ".join(texto.split()))
+    return "|".join(normalizadas)
+
+
+class _Voo:
+    # Uma busca em andamento; as outras threads com a mesma chave esperam nela
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class GrupoVoos:
+    """Chamadas concorrentes com a mesma chave viram uma execução só.
+
+    A primeira thread executa a função; as que chegam enquanto ela roda
+    esperam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._em_voo = {}
+        self.agrupadas = 0
+
+    def executar(self, chave, funcao):
+        with self._trava:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _Voo()
+            else:
+                self.agrupadas += 1
+
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor
+
+        try:
+            voo.valor = funcao()
+            return voo.valor
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_voo[chave]
+            voo.evento.set()
+
+
+class _LRU:
+    # chave -> (valor, expira_em), com no máximo 'max_itens'; sai o usado há mais tempo
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.despejos = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def ler(self, chave, agora):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[1] < agora:
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def gravar(self, chave, valor, expira_em):
+        with self._trava:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.despejos += 1
+
+    def limpar_expirados(self, agora):
+        with self._trava:
+            for chave in [c for c, (_, expira_em) in self._itens.items() if expira_em < agora]:
+                del self._itens[chave]
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+
+class CacheSQLite:
+    """Cache chave -> valor (JSON) com expiração, persistido em SQLite.
+
+    Buscas concorrentes pela mesma chave são agrupadas: só a primeira thread
+    chama a função de busca, as demais recebem o mesmo resultado.
+    """
+
+    def __init__(self, caminho, tabela, ttl_segundos, max_itens_memoria=MEMORIA_MAX_ITENS):
+        self.caminho = caminho
+        self.tabela = tabela
+        self.ttl_segundos = ttl_segundos
+        self._local = threading.local()
+        self._voos = GrupoVoos()
+        # Camada em memória (LRU) na frente do SQLite
+        self._memoria = _LRU(max_itens_memoria)
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with self._conexao() as con:
+            con.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabela} ("
+                "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL NOT NULL)"
+            )
+
+    def _conexao(self):
+        # Uma conexão por thread (cada sessão do Streamlit roda em sua thread)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def ler(self, chave):
+        agora = time.time()
+        valor = self._memoria.ler(chave, agora)
+        if valor is not None:
+            self.acertos_memoria += 1
+            return valor
+
+        linha = self._conexao().execute(
+            f"SELECT valor, expira_em FROM {self.tabela} WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None or linha[1] < agora:
+            return None
+        valor = json.loads(linha[0])
+        self._memoria.gravar(chave, valor, linha[1])
+        self.acertos_disco += 1
+        return valor
+
+    def gravar(self, chave, valor, ttl_segundos=None):
+        ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+        expira_em = time.time() + ttl
+        with self._conexao() as con:
+            con.execute(
+                f"INSERT OR REPLACE INTO {self.tabela} (chave, valor, expira_em) VALUES (?, ?, ?)",
+                (chave, json.dumps(valor), expira_em),
+            )
+        self._memoria.gravar(chave, valor, expira_em)
+
+    def limpar_expirados(self):
+        agora = time.time()
+        with self._conexao() as con:
+            con.execute(f"DELETE FROM {self.tabela} WHERE expira_em < ?", (agora,))
+        self._memoria.limpar_expirados(agora)
+
+    def valores(self):
+        """Todos os valores ainda válidos (ex: lista de sites registrados)."""
+        linhas = self._conexao().execute(
+            f"SELECT valor FROM {self.tabela} WHERE expira_em >= ?", (time.time(),)
+        ).fetchall()
+        return [json.loads(linha[0]) for linha in linhas]
+
+    def estatisticas(self):
+        return {
+            "acertos_memoria": self.acertos_memoria,
+            "acertos_disco": self.acertos_disco,
+            "falhas": self.falhas,
+            "agrupadas": self._voos.agrupadas,
+            "despejos_memoria": self._memoria.despejos,
+        }
+
+    def obter(self, chave, buscar, ttl_segundos=None):
+        """Devolve o valor em cache ou chama 'buscar()' uma única vez por chave.
+
+        Resultados None (ex: cidade não encontrada) não são gravados.
+        'ttl_segundos' pode ser uma função, avaliada no momento da gravação.
+        """
+        valor = self.ler(chave)
+        if valor is not None:
+            return valor
+
+        def buscar_e_gravar():
+            # Outra thread pode ter gravado entre a leitura e o início do voo
+            valor = self.ler(chave)
+            if valor is None:
+                self.falhas += 1
+                valor = buscar()
+                if valor is not None:
+                    ttl = ttl_segundos() if callable(ttl_segundos) else ttl_segundos
+                    self.gravar(chave, valor, ttl)
+            return valor
+
+        return self._voos.executar(chave, buscar_e_gravar)
+
+
+class CacheMemoria:
+    """Resultados de cálculos (ex: plano, perfil horário) compartilhados entre sessões.
+
+    Só em memória, com expiração, no máximo 'max_itens' (LRU) e cálculos
+    concorrentes da mesma chave agrupados. Os valores são compartilhados:
+    quem recebe não deve alterá-los.
+    """
+
+    def __init__(self, max_itens, ttl_segundos):
+        self.ttl_segundos = ttl_segundos
+        self._voos = GrupoVoos()
+        self._memoria = _LRU(max_itens)
+        self.acertos_memoria = 0
+        self.falhas = 0
+
+    def obter(self, chave, calcular, ttl_segundos=None):
+        valor = self._memoria.ler(chave, time.time())
+        if valor is not None:
+            self.acertos_memoria += 1
+            return valor
+
+        def calcular_e_guardar():
+            valor = self._memoria.ler(chave, time.time())
+            if valor is None:
+                self.falhas += 1
+                valor = calcular()
+                if valor is not None:
+                    ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+                    self._memoria.gravar(chave, valor, time.time() + ttl)
+            return valor
+
+        return self._voos.executar(chave, calcular_e_guardar)
+
+    def estatisticas(self):
+        return {
+            "acertos_memoria": self.acertos_memoria,
+            "falhas": self.falhas,
+            "agrupadas": self._voos.agrupadas,
+            "despejos_memoria": self._memoria.despejos,
+        }
+
+
+def chave_calculo(*partes):
+    """Chave hashável a partir das entradas de um cálculo (dicts e listas viram tuplas)."""
+    def congelar(valor):
+        if isinstance(valor, dict):
+            return tuple((k, congelar(v)) for k, v in sorted(valor.items()))
+        if isinstance(valor, (list, tuple)):
+            return tuple(congelar(v) for v in valor)
+        return valor
+    return congelar(partes)
+
+
+_caches = {}
+_trava_caches = threading.Lock()
+
+
+def _cache_unico(tabela, ttl_segundos):
+    # Instância única por processo e por tabela, no mesmo arquivo SQLite
+    with _trava_caches:
+        if tabela not in _caches:
+            _caches[tabela] = CacheSQLite(
+                os.path.join(DIRETORIO_CACHE, "cerebro_cache.sqlite3"),
+                tabela=tabela,
+                ttl_segundos=ttl_segundos,
+            )
+        return _caches[tabela]
+
+
+def cache_calculos():
+    # Resultados derivados da previsão; a chave inclui a própria previsão
+    with _trava_caches:
+        if "calculos" not in _caches:
+            _caches["calculos"] = CacheMemoria(CALCULOS_MAX_ITENS, 6 * 3600)
+        return _caches["calculos"]
+
+
+def cache_geocoding():
+    return _cache_unico("geocoding", GEOCODING_TTL_DIAS * 86400)
+
+
+def cache_previsao():
+    # O TTL real de cada previsão é calculado em 'clima.py' (próxima rodada do modelo)
+    return _cache_unico("previsao", 6 * 3600)
+
+
+def cache_ultima_previsao():
+    # Última previsão obtida por coordenada, sem a data na chave: é o que se
+    # serve (marcado como desatualizado) quando o open-meteo está lento ou fora
+    return _cache_unico("ultima_previsao", ULTIMA_PREVISAO_TTL_DIAS * 86400)
+
+
+def cache_fusos():
+    # Fuso de cada coordenada ('utc_offset_seconds' da última resposta do
+    # open-meteo): dá a data local do site para as chaves da previsão
+    return _cache_unico("fusos", ULTIMA_PREVISAO_TTL_DIAS * 86400)
+
+
+def cache_sites():
+    # Sites consultados na interface; o agendador em 'prefetch.py' os mantém aquecidos
+    return _cache_unico("sites", SITES_TTL_DIAS * 86400)
+
+
+def reiniciar_caches(diretorio=None):
+    """Descarta as instâncias em memória; com 'diretorio', passa a usar outro arquivo.
+
+    Usado pelos benchmarks para medir buscas com cache frio.
+    """
+    global DIRETORIO_CACHE
+    with _trava_caches:
+        if diretorio is not None:
+            DIRETORIO_CACHE = diretorio
+        _caches.clear()
+
+
+def _coletar_metricas():
+    with _trava_caches:
+        caches = dict(_caches)
+    for nome, c in caches.items():
+        for resultado, valor in c.estatisticas().items():
+            yield "cerebro_cache_total", {"cache": nome, "resultado": resultado}, valor
+
+
+metricas.registrar_coletor(_coletar_metricas)
@@ -0,0 +1,320 @@
+# ==============================================================================
+# VARREDURA DE CENÁRIOS E TABELA DE CONSULTA (Módulo 5 pré-calculado)
+# A recomendação do Módulo 5 depende só de estágio, radiação prevista, EC
+# drenado, temperatura média interna e umidade (mais as constantes de
+# 'motor'). 'varrer' avalia a lógica inteira sobre grades densas dessas
+# entradas em uma única passada vetorizada ('lote.calcular_recomendacoes'
+# com broadcasting): serve para mapas de sensibilidade.
+#
+# A lógica se separa em duas partes independentes, o que mantém a tabela
+# pequena (alguns MB em vez de uma grade de 5 dimensões):
+#   água/nutrientes: (estágio, radiação, EC drenado)
+#   ambiente:        (estágio, temperatura média, umidade)
+# 'TabelaRecomendacao' guarda essas grades em um .npz e responde em O(1):
+# interpolação bilinear dentro da célula quando os quatro cantos têm a mesma
+# faixa/status (o volume é linear e o EC constante entre os limites, então a
+# interpolação é exata; o DVP erra menos de 1e-4 kPa). Quando um limite do
+# motor corta a célula (inclusive o DVP zerado com umidade <= 0), ou a
+# entrada está fora da grade, a lógica é avaliada direto para aquela linha. Varredura e tabela usam o perfil e a estufa
+# padrão de 'dados/perfis.json'.
+#
+# Uso: python cenarios.py tabela                       (gera/atualiza o .npz)
+#      python cenarios.py mapa --campo volume_planta_litros \
+#          --linhas radiacao_prevista --colunas ec_drenado -o mapa.csv
+# ==============================================================================
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import lote
+import motor
+import perfis
+from cache import DIRETORIO_CACHE
+from historico import CODIGOS_STATUS
+
+CAMINHO_TABELA = os.environ.get(
+    "CEREBRO_TABELA_RECOMENDACAO", os.path.join(DIRETORIO_CACHE, "tabela_recomendacao.npz")
+)
+
+# Eixos da varredura, na ordem das dimensões dos resultados
+EIXOS = ("estagio", "radiacao_prevista", "ec_drenado", "temp_media_int", "umidade_media_int")
+
+# Grades da tabela: (início, passo, pontos). Os limites do motor (radiação
+# 12/15/24/25 MJ/m², EC meta ± 0.5) caem sobre nós da grade.
+GRADE_RADIACAO = (0.0, 0.1, 401)       # 0 a 40 MJ/m²/dia
+GRADE_EC_DRENADO = (0.0, 0.05, 201)    # 0 a 10 mS/cm
+GRADE_TEMPERATURA = (-5.0, 0.1, 551)   # -5 a 50 °C
+GRADE_UMIDADE = (0.0, 0.2, 501)        # 0 a 100 %
+
+
+def _pontos(grade):
+    # Arredondados: o nó 2.05 tem que ser o mesmo float que o valor digitado 2.05
+    inicio, passo, n = grade
+    return np.round(inicio + passo * np.arange(n), 6)
+
+
+def _codificar(campo, valores):
+    codigos = np.zeros(np.shape(valores), dtype=np.int8)
+    for i, nome in enumerate(CODIGOS_STATUS[campo]):
+        codigos[valores == nome] = i
+    return codigos
+
+
+@dataclass(frozen=True)
+class Varredura:
+    # eixos: nome -> valores (1-D); campos: nome -> array com uma dimensão por eixo
+    eixos: dict
+    campos: dict
+
+    def mapa(self, campo, linhas, colunas):
+        """DataFrame linhas x colunas de um campo; os outros eixos devem ter um valor só."""
+        outros = [e for e in EIXOS if e not in (linhas, colunas)]
+        grandes = [e for e in outros if len(self.eixos[e]) > 1]
+        if grandes:
+            raise ValueError(f"Fixe um único valor para: {', '.join(grandes)}")
+        valores = self.campos[campo]
+        indice = tuple(slice(None) if e in (linhas, colunas) else 0 for e in EIXOS)
+        valores = valores[indice]
+        if EIXOS.index(linhas) > EIXOS.index(colunas):
+            valores = valores.T
+        return pd.DataFrame(
+            valores,
+            index=pd.Index(self.eixos[linhas], name=linhas),
+            columns=pd.Index(self.eixos[colunas], name=colunas),
+        )
+
+
+def varrer(estagio=None, radiacao_prevista=15.0, ec_drenado=2.8, temp_media_int=25.0, umidade_media_int=70.0):
+    """Recomendação para o produto cartesiano das entradas, numa passada só.
+
+    Cada argumento é um valor ou uma sequência; 'estagio=None' usa todos os
+    estágios do receituário. Os campos saem com forma
+    (estágios, radiações, ECs, temperaturas, umidades).
+    """
+    estagios = list(motor.receituario_agronomico) if estagio is None else list(np.atleast_1d(estagio))
+    valores = [np.atleast_1d(np.asarray(v, dtype=float))
+               for v in (radiacao_prevista, ec_drenado, temp_media_int, umidade_media_int)]
+    eixos = dict(zip(EIXOS, [np.array(estagios, dtype=object)] + valores))
+
+    def na_dimensao(array, dim):
+        forma = [1] * len(EIXOS)
+        forma[dim] = -1
+        return np.asarray(array).reshape(forma)
+
+    p = {k: na_dimensao(v, 0) for k, v in lote.parametros_receituario(estagios).items()}
+    radiacao, ec, temp, umidade = (na_dimensao(v, d) for d, v in enumerate(valores, start=1))
+    campos = lote.calcular_recomendacoes(p, radiacao, ec, temp, temp, umidade)
+    forma = tuple(len(v) for v in eixos.values())
+    return Varredura(eixos, {k: np.broadcast_to(v, forma) for k, v in campos.items()})
+
+
+def assinatura():
+    """Hash dos perfis, das constantes do motor e das grades: muda -> tabela refeita."""
+    constantes = {k: v for k, v in vars(motor).items() if k.isupper() and isinstance(v, (int, float, dict))}
+    grades = (GRADE_RADIACAO, GRADE_EC_DRENADO, GRADE_TEMPERATURA, GRADE_UMIDADE)
+    receituario = [dict(linha) for linha in perfis.tabela().linhas]
+    texto = json.dumps([receituario, constantes, grades], sort_keys=True, default=dict)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _celula(grade, x):
+    # Índice do canto inferior, fração dentro da célula e máscara de fora da grade
+    inicio, passo, n = grade
+    x = np.asarray(x, dtype=float)
+    fim = inicio + passo * (n - 1)
+    pos = (np.clip(x, inicio, fim) - inicio) / passo
+    i = np.minimum(np.floor(pos).astype(np.intp), n - 2)
+    return i, pos - i, (x < inicio) | (x > fim) | np.isnan(x)
+
+
+def _interpolar(grade, e, i, fi, j, fj, continuos, degraus):
+    """Bilinear em (i, j) das tabelas 'grade[campo][e]'.
+
+    'degraus' são campos constantes por partes (faixas, status, EC da
+    solução): saem do nó mais próximo, e a máscara devolvida marca as
+    células em que os quatro cantos não concordam (um limite do motor passa
+    por dentro dela).
+    """
+    cantos = [(i, j), (i + 1, j), (i, j + 1), (i + 1, j + 1)]
+    pesos = [(1 - fi) * (1 - fj), fi * (1 - fj), (1 - fi) * fj, fi * fj]
+    proximo = (e, i + (fi >= 0.5), j + (fj >= 0.5))
+    borda = np.zeros(np.shape(i), dtype=bool)
+    saida = {}
+    for campo in degraus:
+        t = grade[campo]
+        base = t[e, i, j]
+        for a, b in cantos[1:]:
+            borda |= t[e, a, b] != base
+        saida[campo] = t[proximo]
+    for campo in continuos:
+        t = grade[campo]
+        saida[campo] = sum(w * t[e, a, b] for w, (a, b) in zip(pesos, cantos))
+    return saida, borda
+
+
+class TabelaRecomendacao:
+    """Grades pré-calculadas do Módulo 5, com consulta O(1) por interpolação."""
+
+    # Constantes por partes na grade de água/nutrientes (o volume é linear entre os limites)
+    DEGRAUS_AGUA = ("faixa_pulsos", "status_nutrientes", "ec_solucao_recomendada")
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.estagios = {str(nome): i for i, nome in enumerate(arrays["estagios"])}
+
+    @classmethod
+    def construir(cls):
+        estagios = list(motor.receituario_agronomico)
+        agua = varrer(estagios, _pontos(GRADE_RADIACAO), _pontos(GRADE_EC_DRENADO), 25.0, 70.0)
+        ambiente = varrer(estagios, 15.0, 2.8, _pontos(GRADE_TEMPERATURA), _pontos(GRADE_UMIDADE))
+        a = {k: v[:, :, :, 0, 0] for k, v in agua.campos.items()}
+        b = {k: v[:, 0, 0, :, :] for k, v in ambiente.campos.items()}
+        return cls({
+            "assinatura": np.array(assinatura()),
+            "estagios": np.array(estagios, dtype=str),
+            "volume_planta_litros": a["volume_planta_litros"].astype(np.float32),
+            "ec_solucao_recomendada": a["ec_solucao_recomendada"].astype(np.float32),
+            "faixa_pulsos": _codificar("faixa_pulsos", a["faixa_pulsos"]),
+            "status_nutrientes": _codificar("status_nutrientes", a["status_nutrientes"]),
+            # O DVP não depende do estágio: uma grade só, com eixo de estágio unitário
+            "dvp_calculado": b["dvp_calculado"][:1].astype(np.float32),
+            "status_ambiente": _codificar("status_ambiente", b["status_ambiente"]),
+        })
+
+    def salvar(self, caminho=CAMINHO_TABELA):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        temporario = caminho + ".tmp.npz"
+        np.savez(temporario, **self.arrays)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_TABELA):
+        """Tabela do disco; refeita (e regravada) se faltar ou estiver desatualizada."""
+        try:
+            with np.load(caminho) as dados:
+                arrays = {k: dados[k] for k in dados.files}
+            if str(arrays["assinatura"]) == assinatura():
+                return cls(arrays)
+        except (OSError, KeyError, ValueError):
+            pass
+        tabela = cls.construir()
+        try:
+            tabela.salvar(caminho)
+        except OSError:
+            pass
+        return tabela
+
+    def consultar(self, estagio, radiacao_prevista, temp_max_int, temp_min_int, umidade_media_int, ec_drenado):
+        """Mesma assinatura de 'motor.gerar_recomendacao'; aceita valores ou arrays.
+
+        Devolve um dicionário com volume_planta_litros, ec_solucao_recomendada,
+        faixa_pulsos, status_nutrientes, flush, dvp_calculado e status_ambiente.
+        Nas células cortadas por um limite do motor (cerca de 1% da grade),
+        nas que ligam a umidade 0 (DVP zerado) ao resto da grade e fora da
+        grade, a lógica é avaliada direto, para essas linhas apenas: faixas e
+        status saem sempre iguais aos de 'motor.gerar_recomendacao'.
+        """
+        escalar = np.ndim(radiacao_prevista) == 0 and np.ndim(estagio) == 0
+        estagio, radiacao, temp_max, temp_min, umidade, ec = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(estagio, dtype=object)),
+            *(np.atleast_1d(np.asarray(v, dtype=float))
+              for v in (radiacao_prevista, temp_max_int, temp_min_int, umidade_media_int, ec_drenado)),
+        )
+        e = np.fromiter((self.estagios[n] for n in estagio), dtype=np.intp, count=len(estagio))
+        temp_media = (temp_max + temp_min) / 2.0
+
+        i, fi, fora_i = _celula(GRADE_RADIACAO, radiacao)
+        j, fj, fora_j = _celula(GRADE_EC_DRENADO, ec)
+        agua, borda_agua = _interpolar(self.arrays, e, i, fi, j, fj, ("volume_planta_litros",), self.DEGRAUS_AGUA)
+        k, fk, fora_k = _celula(GRADE_TEMPERATURA, temp_media)
+        m, fm, fora_m = _celula(GRADE_UMIDADE, umidade)
+        dvp, _ = _interpolar(self.arrays, np.zeros_like(e), k, fk, m, fm, ("dvp_calculado",), ())
+        # 'motor.calcular_dvp' zera o DVP com umidade <= 0 ou > 100: a célula
+        # com um canto de cada lado desses pontos não pode ser interpolada
+        nos = _pontos(GRADE_UMIDADE)
+        baixo, cima = nos[m], nos[np.minimum(m + 1, len(nos) - 1)]
+        corte_dvp = (fm > 0) & (((baixo <= 0) != (cima <= 0)) | ((baixo > 100) != (cima > 100)))
+        ambiente, borda_ambiente = _interpolar(self.arrays, e, k, fk, m, fm, (), ("status_ambiente",))
+
+        resultado = {
+            "volume_planta_litros": agua["volume_planta_litros"].astype(float),
+            "ec_solucao_recomendada": agua["ec_solucao_recomendada"].astype(float),
+            "dvp_calculado": dvp["dvp_calculado"].astype(float),
+        }
+        for campo, codigos in (("faixa_pulsos", agua), ("status_nutrientes", agua), ("status_ambiente", ambiente)):
+            resultado[campo] = np.asarray(CODIGOS_STATUS[campo], dtype=object)[codigos[campo]]
+
+        borda = borda_agua | borda_ambiente | corte_dvp | fora_i | fora_j | fora_k | fora_m
+        if borda.any():
+            p = lote.parametros_receituario(estagio[borda])
+            exato = lote.calcular_recomendacoes(p, radiacao[borda], ec[borda], temp_max[borda],
+                                                temp_min[borda], umidade[borda])
+            for campo in resultado:
+                resultado[campo][borda] = exato[campo]
+        resultado["flush"] = resultado["status_nutrientes"] == "salinidade"
+        if escalar:
+            resultado = {k: v[0].item() if hasattr(v[0], "item") else v[0] for k, v in resultado.items()}
+        return resultado
+
+
+_tabela = None
+_trava_tabela = threading.Lock()
+
+
+def tabela():
+    """Tabela única por processo (carregada do disco ou construída na primeira chamada)."""
+    global _tabela
+    with _trava_tabela:
+        if _tabela is None:
+            _tabela = TabelaRecomendacao.carregar()
+        return _tabela
+
+
+def _eixo(texto):
+    # "0:40:0.5" -> grade; "1,2,3" -> lista; "2.8" -> valor
+    if ":" in texto:
+        inicio, fim, passo = map(float, texto.split(":"))
+        return np.round(np.arange(inicio, fim + passo / 2, passo), 6)
+    return [float(v) for v in texto.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de cenários e tabela de consulta do Módulo 5.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_tabela = sub.add_parser("tabela", help="Gera (ou atualiza) a tabela de consulta")
+    p_tabela.add_argument("-o", "--saida", default=CAMINHO_TABELA)
+    p_mapa = sub.add_parser("mapa", help="Mapa de sensibilidade de um campo (CSV)")
+    p_mapa.add_argument("--campo", default="volume_planta_litros")
+    p_mapa.add_argument("--linhas", choices=EIXOS[1:], default="radiacao_prevista")
+    p_mapa.add_argument("--colunas", choices=EIXOS[1:], default="ec_drenado")
+    p_mapa.add_argument("--estagio", default="Florescimento", choices=list(motor.receituario_agronomico))
+    p_mapa.add_argument("--radiacao", default="0:35:1", help="Valor, lista (a,b) ou grade (início:fim:passo)")
+    p_mapa.add_argument("--ec-drenado", default="1:5:0.25")
+    p_mapa.add_argument("--temp-media", default="25")
+    p_mapa.add_argument("--umidade", default="70")
+    p_mapa.add_argument("-o", "--saida", default="-")
+    args = parser.parse_args(argv)
+
+    if args.comando == "tabela":
+        t = TabelaRecomendacao.construir()
+        t.salvar(args.saida)
+        tamanho = sum(a.nbytes for a in t.arrays.values())
+        print(f"{args.saida}: {tamanho / 1e6:.1f} MB, assinatura {assinatura()}")
+        return
+
+    v = varrer(args.estagio, _eixo(args.radiacao), _eixo(args.ec_drenado), _eixo(args.temp_media), _eixo(args.umidade))
+    mapa = v.mapa(args.campo, args.linhas, args.colunas)
+    mapa.to_csv(args.saida if args.saida != "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
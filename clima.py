@@ -0,0 +1,463 @@
+# ==============================================================================
+# CLIENTE DA API DE CLIMA (open-meteo)
+# Sessão HTTP única por processo (pool de conexões, sem novo handshake TLS a
+# cada clique), timeouts explícitos, retentativas com backoff e cache de
+# previsão em memória + disco. 'previsao_diaria_imediata' serve a interface
+# sem esperar pelo open-meteo: a última previsão conhecida (marcada como
+# desatualizada) é entregue enquanto outra é buscada em segundo plano.
+# ==============================================================================
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as TempoEsgotado
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metricas
+from cache import cache_fusos, cache_geocoding, cache_previsao, cache_ultima_previsao, normalizar_chave
+
+URL_GEOCODING = os.environ.get("CEREBRO_URL_GEOCODING", "https://geocoding-api.open-meteo.com/v1/search")
+URL_FORECAST = os.environ.get("CEREBRO_URL_FORECAST", "https://api.open-meteo.com/v1/forecast")
+
+TIMEOUT_CONEXAO = float(os.environ.get("CEREBRO_TIMEOUT_CONEXAO", "3.05"))
+TIMEOUT_LEITURA = float(os.environ.get("CEREBRO_TIMEOUT_LEITURA", "10"))
+MAX_RETENTATIVAS = int(os.environ.get("CEREBRO_MAX_RETENTATIVAS", "3"))
+FATOR_BACKOFF = float(os.environ.get("CEREBRO_FATOR_BACKOFF", "0.5"))
+
+# Os modelos usados pelo open-meteo são atualizados em rodadas fixas (UTC).
+# Uma previsão em cache vale até a próxima rodada + o atraso de publicação.
+INTERVALO_RODADA_HORAS = float(os.environ.get("CEREBRO_INTERVALO_RODADA_HORAS", "3"))
+ATRASO_PUBLICACAO_MIN = float(os.environ.get("CEREBRO_ATRASO_PUBLICACAO_MIN", "30"))
+
+# Modo lote: várias coordenadas por requisição (o open-meteo aceita listas
+# separadas por vírgula), poucas requisições em paralelo e um teto de taxa.
+COORDENADAS_POR_REQUISICAO = int(os.environ.get("CEREBRO_COORDENADAS_POR_REQUISICAO", "50"))
+MAX_CONCORRENCIA = int(os.environ.get("CEREBRO_MAX_CONCORRENCIA", "8"))
+REQUISICOES_POR_SEGUNDO = float(os.environ.get("CEREBRO_REQUISICOES_POR_SEGUNDO", "10"))
+
+# Horizonte do plano de vários dias (Módulo 7); 16 é o limite do open-meteo
+DIAS_PLANO_PADRAO = 7
+DIAS_PLANO_MAXIMO = 16
+
+# Interface: quanto esperar pela atualização antes de servir a última previsão
+# conhecida, e quanto esperar quando não há nenhuma em cache
+ESPERA_COM_RESERVA_S = float(os.environ.get("CEREBRO_ESPERA_COM_RESERVA_S", "1"))
+ESPERA_SEM_RESERVA_S = float(os.environ.get("CEREBRO_ESPERA_SEM_RESERVA_S", "15"))
+
+CASAS_COORDENADAS = 2  # ~1 km: sites vizinhos compartilham a mesma previsão
+VARIAVEIS_DIARIAS = ("shortwave_radiation_sum", "temperature_2m_max", "temperature_2m_min")
+VARIAVEIS_HORARIAS = ("temperature_2m", "relative_humidity_2m", "shortwave_radiation")
+
+_sessao = None
+_trava_sessao = threading.Lock()
+
+
+class LimiteTaxa:
+    """No máximo 'por_segundo' requisições por segundo, somando todas as threads."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self._proxima = 0.0
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        with self._trava:
+            agora = time.monotonic()
+            vez = max(agora, self._proxima)
+            self._proxima = vez + self.intervalo
+        if vez > agora:
+            time.sleep(vez - agora)
+
+
+_limite_taxa = LimiteTaxa(REQUISICOES_POR_SEGUNDO)
+
+
+def sessao():
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            retentativas = Retry(
+                total=MAX_RETENTATIVAS,
+                backoff_factor=FATOR_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+            )
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retentativas)
+            s = requests.Session()
+            s.mount("https://", adaptador)
+            s.mount("http://", adaptador)
+            _sessao = s
+        return _sessao
+
+
+def _get_json(url, params):
+    api = "geocoding" if url == URL_GEOCODING else "forecast"
+    _limite_taxa.aguardar()
+    inicio = time.perf_counter()
+    try:
+        response = sessao().get(url, params=params, timeout=(TIMEOUT_CONEXAO, TIMEOUT_LEITURA))
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.Timeout:
+        metricas.incrementar("cerebro_upstream_timeouts_total", api=api)
+        raise
+    except requests.exceptions.RequestException as e:
+        metricas.incrementar("cerebro_upstream_erros_total", api=api, tipo=type(e).__name__)
+        raise
+    finally:
+        metricas.observar("cerebro_upstream_segundos", time.perf_counter() - inicio, api=api)
+
+
+def segundos_ate_proxima_rodada(agora=None):
+    agora = time.time() if agora is None else agora
+    intervalo = INTERVALO_RODADA_HORAS * 3600
+    atraso = ATRASO_PUBLICACAO_MIN * 60
+    proxima = ((agora - atraso) // intervalo + 1) * intervalo + atraso
+    return proxima - agora
+
+
+def buscar_lat_long(cidade, estado):
+    """[latitude, longitude, nome] da cidade, ou None se não encontrada."""
+    def buscar():
+        params = {"name": cidade, "admin1": estado, "count": 1, "language": "pt", "format": "json"}
+        data = _get_json(URL_GEOCODING, params)
+        if "results" in data and len(data["results"]) > 0:
+            result = data["results"][0]
+            return [result["latitude"], result["longitude"], result.get("name", cidade)]
+        return None
+
+    return cache_geocoding().obter(normalizar_chave(cidade, estado), buscar)
+
+
+def _chave_base(lat_r, long_r, variaveis, dias):
+    return f"{lat_r}|{long_r}|{','.join(variaveis)}|{dias}"
+
+
+_ORDINAL_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+def _hoje_local(lat_r, long_r, agora=None):
+    """Data de hoje (ISO) no fuso do site, o mesmo das datas de 'time' do
+    open-meteo (timezone=auto), não no do servidor.
+
+    O fuso é o da última resposta para a coordenada; antes da primeira, é
+    estimado pela longitude (15° por hora).
+    """
+    fuso = cache_fusos().ler(f"{lat_r}|{long_r}")
+    if fuso is None:
+        fuso = round(long_r / 15) * 3600
+    agora = time.time() if agora is None else agora
+    return datetime.date.fromordinal(_ORDINAL_EPOCH + int((agora + fuso) // 86400)).isoformat()
+
+
+def _guardar_fuso(lat_r, long_r, resposta):
+    fuso = resposta.get("utc_offset_seconds")
+    if fuso is not None:
+        cache_fusos().gravar(f"{lat_r}|{long_r}", fuso)
+
+
+def _chave_previsao(lat_r, long_r, variaveis, dias, data_local=None):
+    data_local = _hoje_local(lat_r, long_r) if data_local is None else data_local
+    return f"{_chave_base(lat_r, long_r, variaveis, dias)}|{data_local}"
+
+
+def _data_inicial(bloco):
+    # "2026-10-17" (daily) ou "2026-10-17T00:00" (hourly)
+    return bloco["time"][0][:10]
+
+
+def _guardar_ultima(lat_r, long_r, variaveis, dias, daily):
+    cache_ultima_previsao().gravar(
+        _chave_base(lat_r, long_r, variaveis, dias), {"daily": daily, "obtida_em": time.time()}
+    )
+
+
+def _arredondar(lat, long):
+    return round(float(lat), CASAS_COORDENADAS), round(float(long), CASAS_COORDENADAS)
+
+
+def _previsao_do_dia(bloco, lat_r, long_r, variaveis, dias):
+    # Bloco 'daily' ou 'hourly' em cache pela data local do site. Se a
+    # resposta começar em outra data (fuso ainda estimado), ela é guardada na
+    # chave da data certa e a chave pedida não é gravada
+    prefixo = "h|" if bloco == "hourly" else ""
+    hoje = _hoje_local(lat_r, long_r)
+    outra_data = []
+
+    def buscar():
+        params = {
+            "latitude": lat_r,
+            "longitude": long_r,
+            bloco: ",".join(variaveis),
+            "timezone": "auto",
+            "forecast_days": dias,
+        }
+        data = _get_json(URL_FORECAST, params)
+        _guardar_fuso(lat_r, long_r, data)
+        valores = data.get(bloco)
+        if valores is not None:
+            if bloco == "daily":
+                _guardar_ultima(lat_r, long_r, variaveis, dias, valores)
+            if _data_inicial(valores) != hoje:
+                outra_data.append(_data_inicial(valores))
+                cache_previsao().gravar(prefixo + _chave_previsao(lat_r, long_r, variaveis, dias, outra_data[0]),
+                                        valores, segundos_ate_proxima_rodada())
+        return valores
+
+    def ttl():
+        return -1 if outra_data else segundos_ate_proxima_rodada()
+
+    return cache_previsao().obter(prefixo + _chave_previsao(lat_r, long_r, variaveis, dias, hoje), buscar,
+                                  ttl_segundos=ttl)
+
+
+def buscar_previsao_diaria(lat, long, variaveis=VARIAVEIS_DIARIAS, dias=1):
+    """Bloco 'daily' da resposta do open-meteo (listas por variável), ou None."""
+    return _previsao_do_dia("daily", *_arredondar(lat, long), variaveis, dias)
+
+
+def buscar_previsao_horaria(lat, long, variaveis=VARIAVEIS_HORARIAS, dias=1):
+    """Bloco 'hourly' da resposta do open-meteo (listas por variável), ou None."""
+    return _previsao_do_dia("hourly", *_arredondar(lat, long), variaveis, dias)
+
+
+def _buscar_previsoes_multiplas(coordenadas, variaveis, dias):
+    # Uma requisição para várias coordenadas; a resposta vem na mesma ordem
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in coordenadas),
+        "longitude": ",".join(str(long) for _, long in coordenadas),
+        "daily": ",".join(variaveis),
+        "timezone": "auto",
+        "forecast_days": dias,
+    }
+    data = _get_json(URL_FORECAST, params)
+    if isinstance(data, dict):
+        data = [data]
+    for (lat_r, long_r), d in zip(coordenadas, data):
+        _guardar_fuso(lat_r, long_r, d)
+    return [d.get("daily") for d in data]
+
+
+def buscar_previsoes(coordenadas, variaveis=VARIAVEIS_DIARIAS, dias=1, forcar=False):
+    """Previsões de várias coordenadas, entregues à medida que chegam.
+
+    Gera dicionários {(lat, long): daily ou None}: primeiro um com tudo que já
+    estava em cache, depois um por requisição ao open-meteo. Coordenadas que
+    arredondam para o mesmo ponto são buscadas uma única vez. Uma requisição
+    que falha não interrompe as outras; suas coordenadas recebem None.
+    Com 'forcar', o cache é ignorado e tudo é buscado de novo (pré-busca).
+    """
+    cache = cache_previsao()
+    pontos = {}  # chave -> (lat_r, long_r, [coordenadas originais])
+    for lat, long in coordenadas:
+        lat_r, long_r = _arredondar(lat, long)
+        chave = _chave_previsao(lat_r, long_r, variaveis, dias)
+        pontos.setdefault(chave, (lat_r, long_r, []))[2].append((lat, long))
+
+    em_cache = {}
+    pendentes = []
+    for chave, (_, _, originais) in pontos.items():
+        daily = None if forcar else cache.ler(chave)
+        if daily is None:
+            cache.falhas += 1
+            pendentes.append(chave)
+        else:
+            em_cache.update((c, daily) for c in originais)
+    if em_cache:
+        yield em_cache
+    if not pendentes:
+        return
+
+    lotes = [pendentes[i:i + COORDENADAS_POR_REQUISICAO]
+             for i in range(0, len(pendentes), COORDENADAS_POR_REQUISICAO)]
+    with ThreadPoolExecutor(max_workers=MAX_CONCORRENCIA) as executor:
+        futuros = {
+            executor.submit(_buscar_previsoes_multiplas, [pontos[c][:2] for c in lote], variaveis, dias): lote
+            for lote in lotes
+        }
+        for futuro in as_completed(futuros):
+            lote = futuros[futuro]
+            try:
+                respostas = futuro.result()
+            except requests.exceptions.RequestException:
+                respostas = [None] * len(lote)
+            ttl = segundos_ate_proxima_rodada()
+            parcial = {}
+            for chave, daily in zip(lote, respostas):
+                if daily is not None:
+                    # Na data de 'time' da resposta: a chave pedida pode ter
+                    # usado um fuso estimado
+                    lat_r, long_r = pontos[chave][:2]
+                    cache.gravar(_chave_previsao(lat_r, long_r, variaveis, dias, _data_inicial(daily)), daily, ttl)
+                    _guardar_ultima(lat_r, long_r, variaveis, dias, daily)
+                parcial.update((c, daily) for c in pontos[chave][2])
+            yield parcial
+
+
+def buscar_lat_longs(locais):
+    """[latitude, longitude, nome] (ou None) de vários (cidade, estado), em paralelo.
+
+    Gera pares ((cidade, estado), resultado) à medida que chegam. A API de
+    geocoding não aceita várias cidades por requisição; a concorrência e o
+    teto de taxa são os mesmos de 'buscar_previsoes'.
+    """
+    locais = list(dict.fromkeys(locais))
+    with ThreadPoolExecutor(max_workers=MAX_CONCORRENCIA) as executor:
+        futuros = {executor.submit(buscar_lat_long, cidade, estado): (cidade, estado) for cidade, estado in locais}
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except requests.exceptions.RequestException:
+                resultado = None
+            yield futuros[futuro], resultado
+
+
+# --- Interface: servir já, atualizar em segundo plano ---
+
+@dataclass(frozen=True)
+class PrevisaoServida:
+    daily: dict
+    obtida_em: float  # epoch (s) da resposta do open-meteo
+    desatualizada: bool
+
+    @property
+    def idade_horas(self):
+        return (time.time() - self.obtida_em) / 3600
+
+
+_executor_atualizacao = None
+_atualizando = {}  # chave -> Future da busca em andamento
+_trava_atualizacao = threading.Lock()
+_servidas = {"atualizadas": 0, "desatualizadas": 0}
+
+
+def _atualizar_em_segundo_plano(lat, long, variaveis, dias):
+    # Uma busca por chave de cada vez; quem chega depois recebe o mesmo Future.
+    # Devolve (futuro, nova): 'nova' é False se a busca já estava em andamento
+    global _executor_atualizacao
+    chave = _chave_base(*_arredondar(lat, long), variaveis, dias)
+    with _trava_atualizacao:
+        futuro = _atualizando.get(chave)
+        if futuro is not None:
+            return futuro, False
+        if _executor_atualizacao is None:
+            _executor_atualizacao = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cerebro-atualizacao")
+        futuro = _atualizando[chave] = _executor_atualizacao.submit(
+            buscar_previsao_diaria, lat, long, variaveis, dias
+        )
+
+    def terminar(f):
+        with _trava_atualizacao:
+            if _atualizando.get(chave) is f:
+                del _atualizando[chave]
+
+    futuro.add_done_callback(terminar)
+    return futuro, True
+
+
+def _a_partir_de_hoje(daily, dias, hoje):
+    # Recorte de um bloco 'daily' antigo a partir de 'hoje' (data local do
+    # site, até 'dias' dias), ou None se hoje não estiver nele
+    datas = list(daily.get("time", ()))
+    if hoje not in datas:
+        return None
+    i = datas.index(hoje)
+    return {campo: list(valores)[i:i + dias] for campo, valores in daily.items()}
+
+
+def _reserva(lat_r, long_r, variaveis, dias):
+    """Última previsão conhecida recortada a partir de hoje (no fuso do
+    site), ou None.
+
+    Procura também nas de horizonte maior (a de 7 dias de ontem ainda tem o
+    dia de hoje); a mais recente que contém hoje ganha.
+    """
+    hoje = _hoje_local(lat_r, long_r)
+    melhor = None
+    for horizonte in sorted({dias, DIAS_PLANO_PADRAO, DIAS_PLANO_MAXIMO}):
+        if horizonte < dias:
+            continue
+        ultima = cache_ultima_previsao().ler(_chave_base(lat_r, long_r, variaveis, horizonte))
+        if ultima is None or (melhor is not None and ultima["obtida_em"] <= melhor["obtida_em"]):
+            continue
+        daily = _a_partir_de_hoje(ultima["daily"], dias, hoje)
+        if daily is not None:
+            melhor = {"daily": daily, "obtida_em": ultima["obtida_em"]}
+    return melhor
+
+
+def _servir(daily, obtida_em, desatualizada):
+    with _trava_atualizacao:
+        _servidas["desatualizadas" if desatualizada else "atualizadas"] += 1
+    return PrevisaoServida(daily, obtida_em, desatualizada)
+
+
+def previsao_diaria_imediata(lat, long, variaveis=VARIAVEIS_DIARIAS, dias=1):
+    """Previsão para a interface, sem deixar a latência do open-meteo chegar ao usuário.
+
+    1. Previsão da rodada atual em cache: devolvida na hora.
+    2. Senão, uma atualização é disparada em segundo plano; se ela não chegar
+       em ESPERA_COM_RESERVA_S (ou falhar), devolve a última previsão
+       conhecida com 'desatualizada=True', recortada a partir do dia de hoje
+       (pelas datas de 'time'). Só quem disparou a atualização espera; quem
+       chega com ela em andamento recebe a última previsão na hora.
+    3. Sem nenhuma previsão guardada que contenha hoje, espera a atualização até
+       ESPERA_SEM_RESERVA_S; estoura requests.exceptions.Timeout depois disso.
+
+    Devolve None se o open-meteo responder sem o bloco 'daily'.
+    """
+    lat_r, long_r = _arredondar(lat, long)
+    base = _chave_base(lat_r, long_r, variaveis, dias)
+    daily = cache_previsao().ler(_chave_previsao(lat_r, long_r, variaveis, dias))
+    if daily is not None:
+        ultima = cache_ultima_previsao().ler(base)
+        return _servir(daily, ultima["obtida_em"] if ultima else time.time(), False)
+
+    futuro, nova = _atualizar_em_segundo_plano(lat, long, variaveis, dias)
+    ultima = _reserva(lat_r, long_r, variaveis, dias)
+    if ultima is None:
+        espera = ESPERA_SEM_RESERVA_S
+    else:
+        espera = ESPERA_COM_RESERVA_S if nova else 0
+    try:
+        daily = futuro.result(timeout=espera)
+    except TempoEsgotado:
+        if ultima is None:
+            raise requests.exceptions.Timeout(
+                f"open-meteo não respondeu em {ESPERA_SEM_RESERVA_S:g} s e não há previsão guardada para hoje"
+            )
+        daily = None
+    except requests.exceptions.RequestException:
+        if ultima is None:
+            raise
+        daily = None
+
+    if daily is not None:
+        return _servir(daily, time.time(), False)
+    if ultima is not None:
+        return _servir(ultima["daily"], ultima["obtida_em"], True)
+    return None
+
+
+def estatisticas_cache():
+    return {
+        "geocoding": cache_geocoding().estatisticas(),
+        "previsao": cache_previsao().estatisticas(),
+        "ultima_previsao": cache_ultima_previsao().estatisticas(),
+    }
+
+
+def _coletar_metricas_previsoes():
+    # As estatísticas dos caches são exportadas por 'cache.py'
+    with _trava_atualizacao:
+        servidas = dict(_servidas)
+    for estado, valor in servidas.items():
+        yield "cerebro_previsoes_servidas_total", {"estado": estado}, valor
+
+
+metricas.registrar_coletor(_coletar_metricas_previsoes)
@@ -0,0 +1,225 @@
+# ==============================================================================
+# DETETIVE AUTOMÁTICO (Módulo 9 a partir dos dados medidos)
+# Cada diagnóstico de 'dados/diagnostico.json' tem uma lista de "regras":
+#   {"variavel": "dvp", "operador": ">", "limite": 1.5, "peso": 1.0,
+#    "descricao": "DVP alto (> 1.5 kPa)"}
+# As regras são compiladas uma vez por processo em arrays (variável, sinal,
+# limite, peso, diagnóstico) e avaliadas de uma vez sobre todas as leituras
+# de todas as estufas: um único "valores > limites" para a matriz
+# leituras x condições, e contagens por estufa com np.bincount.
+#
+# A pontuação de um diagnóstico em uma estufa é a maior, entre suas regras,
+# de peso x fração das leituras (com dado) em que a regra vale. Sintomas sem
+# regras (ex: rachaduras) continuam só no caminho manual do Módulo 9.
+#
+# Fontes: linhas de 'registros.historico_site("checkpoints", ...)',
+# colunas de 'historico.Historico.ler("leituras", ...)' ou as janelas de um
+# 'sensores.MonitorSensores'.
+# ==============================================================================
+import functools
+
+import numpy as np
+import pandas as pd
+
+import lote
+import perfis
+from base_conhecimento import diagnostico
+
+# 'ec_aplicado_vs_meta' = EC aplicado - EC ideal do estágio no perfil/estufa
+# do site (negativo: abaixo da meta)
+VARIAVEIS = ("dvp", "ec_aplicado", "ec_dreno", "delta_ec", "ph", "ec_aplicado_vs_meta")
+SINAIS = {">": 1.0, "<": -1.0}
+
+
+class IndiceRegras:
+    """Regras de todos os diagnósticos, compiladas em arrays paralelos."""
+
+    def __init__(self, base):
+        diagnosticos, condicoes = [], []
+        for local, sintomas in base.items():
+            for sintoma, item in sintomas.items():
+                for regra in item.get("regras", ()):
+                    if regra["variavel"] not in VARIAVEIS:
+                        raise ValueError(f"Variável desconhecida na regra de '{sintoma}': {regra['variavel']!r}")
+                    if regra["operador"] not in SINAIS:
+                        raise ValueError(f"Operador inválido na regra de '{sintoma}': {regra['operador']!r}")
+                    condicoes.append((len(diagnosticos), regra))
+                diagnosticos.append((local, sintoma, item["diagnostico"]))
+
+        self.diagnosticos = tuple(diagnosticos)
+        self.descricoes = tuple(regra["descricao"] for _, regra in condicoes)
+        self.diagnostico = np.array([d for d, _ in condicoes], dtype=np.intp)
+        self.variavel = np.array([VARIAVEIS.index(r["variavel"]) for _, r in condicoes], dtype=np.intp)
+        sinal = np.array([SINAIS[r["operador"]] for _, r in condicoes])
+        # "x > l" e "x < l" viram "s*x > s*l": uma comparação só para todas
+        self.sinal = sinal
+        self.limite_sinal = sinal * np.array([float(r["limite"]) for _, r in condicoes])
+        self.peso = np.array([float(r.get("peso", 1.0)) for _, r in condicoes])
+        # Condições de cada diagnóstico (para achar a evidência principal)
+        self.condicoes_por_diagnostico = tuple(
+            np.flatnonzero(self.diagnostico == d) for d in range(len(diagnosticos))
+        )
+
+    def avaliar(self, colunas, grupos=None, n_grupos=None):
+        """Fração das leituras de cada grupo em que cada condição vale.
+
+        'colunas' tem um array por variável (as ausentes contam como sem
+        dado); 'grupos' dá o índice da estufa de cada leitura. Devolve uma
+        matriz (n_grupos, n_condicoes), com NaN onde não há nenhum dado.
+        """
+        n = _linhas(colunas)
+        grupos = np.zeros(n, dtype=np.intp) if grupos is None else np.asarray(grupos, dtype=np.intp)
+        n_grupos = (int(grupos.max()) + 1 if n else 0) if n_grupos is None else n_grupos
+        nan = np.full(n, np.nan)
+        matriz = np.column_stack([np.asarray(colunas.get(v, nan), dtype=float) for v in VARIAVEIS])
+
+        valores = matriz[:, self.variavel] * self.sinal  # leituras x condições
+        validos = ~np.isnan(valores)
+        satisfeitas = valores > self.limite_sinal  # NaN > l é False
+
+        n_cond = len(self.peso)
+        celula = grupos[:, None] * n_cond + np.arange(n_cond)
+        acertos = np.bincount(celula[satisfeitas], minlength=n_grupos * n_cond).reshape(n_grupos, n_cond)
+        total = np.bincount(celula[validos], minlength=n_grupos * n_cond).reshape(n_grupos, n_cond)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, acertos / total, np.nan)
+
+    def pontuar(self, fracoes):
+        """(n_grupos, n_diagnosticos): maior peso x fração entre as regras de cada diagnóstico."""
+        contribuicao = np.nan_to_num(fracoes * self.peso, nan=0.0)
+        pontuacao = np.zeros((len(fracoes), len(self.diagnosticos)))
+        np.maximum.at(pontuacao.T, self.diagnostico, contribuicao.T)
+        return pontuacao, contribuicao
+
+    def ranquear(self, colunas, grupos=None, nomes=None, minimo=0.0):
+        """Diagnósticos prováveis por estufa, do mais para o menos provável.
+
+        DataFrame com site, local, sintoma, diagnostico, pontuacao (0 a 1),
+        evidencia (a regra que mais pesou) e fracao_leituras.
+        """
+        nomes = list(nomes) if nomes is not None else [0]
+        fracoes = self.avaliar(colunas, grupos, len(nomes))
+        pontuacao, contribuicao = self.pontuar(fracoes)
+
+        linhas = []
+        for d, (local, sintoma, nome) in enumerate(self.diagnosticos):
+            conds = self.condicoes_por_diagnostico[d]
+            if not len(conds):
+                continue
+            principal = conds[np.argmax(contribuicao[:, conds], axis=1)]
+            for g in np.flatnonzero(pontuacao[:, d] > minimo):
+                linhas.append({
+                    "site": nomes[g],
+                    "local": local,
+                    "sintoma": sintoma,
+                    "diagnostico": nome,
+                    "pontuacao": float(pontuacao[g, d]),
+                    "evidencia": self.descricoes[principal[g]],
+                    "fracao_leituras": float(fracoes[g, principal[g]]),
+                })
+        colunas_saida = ["site", "local", "sintoma", "diagnostico", "pontuacao", "evidencia", "fracao_leituras"]
+        df = pd.DataFrame(linhas, columns=colunas_saida)
+        return df.sort_values(["site", "pontuacao"], ascending=[True, False], kind="stable").reset_index(drop=True)
+
+
+@functools.lru_cache(maxsize=None)
+def indice():
+    """Índice compilado a partir da base do Módulo 9 (uma vez por processo)."""
+    return IndiceRegras(diagnostico())
+
+
+def preparar(colunas, estagio=None, perfil=None, estufa=None):
+    """Completa as variáveis derivadas a partir do que foi medido.
+
+    Aceita 'temperatura' + 'umidade' (DVP calculado), 'dvp_atual' (check-points)
+    e 'estagio' por linha ou um 'estagio' único para todas. A meta de EC vem
+    do 'perfil'/'estufa' de cada linha (colunas de mesmo nome, como nos
+    check-points) ou, onde faltarem, dos argumentos (None = padrão de
+    'dados/perfis.json'); ValueError ou KeyError se o estágio não existir nele.
+    """
+    saida = {k: np.asarray(v) for k, v in colunas.items()}
+    n = _linhas(saida)
+    if "dvp" not in saida:
+        if "dvp_atual" in saida:
+            saida["dvp"] = saida["dvp_atual"]
+        elif "temperatura" in saida and "umidade" in saida:
+            saida["dvp"] = lote.calcular_dvp_vetorizado(saida["temperatura"], saida["umidade"])
+    if "delta_ec" not in saida and "ec_dreno" in saida and "ec_aplicado" in saida:
+        saida["delta_ec"] = saida["ec_dreno"].astype(float) - saida["ec_aplicado"].astype(float)
+    if "ec_aplicado_vs_meta" not in saida and "ec_aplicado" in saida and n:
+        if "estagio" in saida:
+            meta = lote.parametros_receituario(
+                saida["estagio"], _coluna_perfil(saida, "perfil", perfil, n), _coluna_perfil(saida, "estufa", estufa, n)
+            )["ec_ideal_base"]
+        elif estagio is not None:
+            meta = perfis.tabela().linha(estagio, perfil, estufa)['ec_ideal_solucao']
+        else:
+            meta = None
+        if meta is not None:
+            saida["ec_aplicado_vs_meta"] = saida["ec_aplicado"].astype(float) - meta
+    return saida
+
+
+def _coluna_perfil(colunas, campo, padrao, n):
+    # Coluna 'perfil'/'estufa' com os vazios (registros antigos) preenchidos com 'padrao'
+    coluna = colunas.get(campo)
+    if coluna is None:
+        return None if padrao is None else np.full(n, padrao, dtype=object)
+    coluna = np.array(coluna, dtype=object)
+    if padrao is not None:
+        coluna[pd.isna(coluna) | (coluna == "")] = padrao
+    return coluna
+
+
+def _linhas(colunas):
+    return len(next(iter(colunas.values()))) if colunas else 0
+
+
+def ranquear_sites(dados_por_site, estagio=None, minimo=0.0, perfil=None, estufa=None):
+    """Ranking para várias estufas de uma vez: {site: {coluna: array}} -> DataFrame.
+
+    Serve direto para a saída de 'Historico.ler("leituras", ...)'. 'perfil'
+    e 'estufa' valem para todos os sites (ver 'preparar').
+    """
+    nomes = [s for s, colunas in dados_por_site.items() if _linhas(colunas)]
+    partes = [preparar(dados_por_site[s], estagio, perfil, estufa) for s in nomes]
+    tamanhos = [_linhas(p) for p in partes]
+    colunas = {
+        v: np.concatenate([np.asarray(p[v], dtype=float) if v in p else np.full(n, np.nan)
+                           for p, n in zip(partes, tamanhos)])
+        for v in VARIAVEIS if any(v in p for p in partes)
+    }
+    grupos = np.repeat(np.arange(len(nomes)), tamanhos)
+    return indice().ranquear(colunas, grupos, nomes, minimo)
+
+
+def colunas_checkpoints(linhas):
+    """Linhas da tabela 'checkpoints' de 'registros' -> colunas para 'ranquear_sites'."""
+    campos = ("dvp_atual", "ec_aplicado", "ec_dreno", "delta_ec")
+    colunas = {c: np.array([linha[c] for linha in linhas], dtype=float) for c in campos}
+    for campo in ("estagio", "perfil", "estufa"):
+        colunas[campo] = np.array([linha.get(campo) for linha in linhas], dtype=object)
+    return colunas
+
+
+def ranquear_monitor(monitor, minimo=0.0):
+    """Ranking das estufas de um 'sensores.MonitorSensores', pelas médias das janelas.
+
+    Com pH, usa o da última leitura de cada janela.
+    """
+    dados = {}
+    for estufa, janela in monitor.janelas.items():
+        if not len(janela):
+            continue
+        c = janela.checkpoint()
+        dados[estufa] = {
+            "dvp": np.array([c.dvp_atual]),
+            "ec_aplicado": np.array([c.ec_aplicado]),
+            "ec_dreno": np.array([c.ec_dreno]),
+            "delta_ec": np.array([c.delta_ec]),
+            "ph": np.array([janela.ph if janela.ph is not None else np.nan]),
+            "estagio": np.array([c.estagio], dtype=object),
+            "perfil": np.array([c.perfil], dtype=object),
+            "estufa": np.array([c.estufa], dtype=object),
+        }
+    return ranquear_sites(dados, minimo=minimo)
@@ -0,0 +1,208 @@
+# ==============================================================================
+# HISTÓRICO COLUNAR (anos de leituras e recomendações)
+# Armazenamento só-de-acréscimo: um arquivo binário por campo (float32, int64
+# ou int8), particionado por tabela / site / mês (UTC):
+#
+#   historico/leituras/E1/2026-10/momento.int64
+#   historico/leituras/E1/2026-10/temperatura.float32
+#   ...
+#
+# Na leitura os arquivos são mapeados em memória (np.memmap) e recortados por
+# busca binária no 'momento'; só as páginas do intervalo pedido são lidas do
+# disco. As colunas saem como arrays NumPy e podem ir direto para
+# 'lote.calcular_dvp_vetorizado' ou 'lote.gerar_recomendacoes'.
+# ==============================================================================
+import datetime
+import os
+
+import numpy as np
+
+DIRETORIO_HISTORICO = os.environ.get(
+    "CEREBRO_HISTORICO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico")
+)
+
+# 'momento' (epoch em segundos, int64) é obrigatório e vem sempre primeiro
+ESQUEMAS = {
+    "leituras": {
+        "momento": np.int64,
+        "temperatura": np.float32,
+        "umidade": np.float32,
+        "ec_aplicado": np.float32,
+        "ec_dreno": np.float32,
+    },
+    "recomendacoes": {
+        "momento": np.int64,
+        "radiacao_prevista": np.float32,
+        "temp_max_int": np.float32,
+        "temp_min_int": np.float32,
+        "umidade_media_int": np.float32,
+        "ec_drenado": np.float32,
+        "volume_planta_litros": np.float32,
+        "ec_solucao_recomendada": np.float32,
+        "dvp_calculado": np.float32,
+        # Códigos de 'motor': índices em CODIGOS_STATUS
+        "faixa_pulsos": np.int8,
+        "status_nutrientes": np.int8,
+        "status_ambiente": np.int8,
+    },
+}
+
+CODIGOS_STATUS = {
+    "faixa_pulsos": ("padrao", "alta", "baixa"),
+    "status_nutrientes": ("ok", "salinidade", "consumo"),
+    "status_ambiente": ("ok", "estresse", "umidade"),
+}
+
+
+def _mes(momento):
+    return datetime.datetime.fromtimestamp(int(momento), datetime.timezone.utc).strftime("%Y-%m")
+
+
+def _inicio_mes(mes):
+    return int(datetime.datetime.strptime(mes, "%Y-%m").replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _fim_mes(mes):
+    ano, m = map(int, mes.split("-"))
+    ano, m = (ano + 1, 1) if m == 12 else (ano, m + 1)
+    return _inicio_mes(f"{ano:04d}-{m:02d}")
+
+
+def codificar_status(campo, valores):
+    """Textos de status ("ok", "alta", ...) -> códigos int8."""
+    codigos = CODIGOS_STATUS[campo]
+    return np.array([codigos.index(v) for v in valores], dtype=np.int8)
+
+
+def decodificar_status(campo, codigos):
+    return np.asarray(CODIGOS_STATUS[campo], dtype=object)[np.asarray(codigos)]
+
+
+class Historico:
+    """Leituras e recomendações por site, em arquivos colunares mapeados."""
+
+    def __init__(self, diretorio=DIRETORIO_HISTORICO):
+        self.diretorio = diretorio
+
+    def _dir_site(self, tabela, site):
+        site = str(site)
+        if not site or site in (".", "..") or os.sep in site or (os.altsep and os.altsep in site):
+            raise ValueError(f"Identificador de site inválido: {site!r}")
+        if tabela not in ESQUEMAS:
+            raise ValueError(f"Tabela desconhecida: {tabela!r}")
+        return os.path.join(self.diretorio, tabela, site)
+
+    def anexar(self, tabela, site, colunas):
+        """Acrescenta linhas de um site. 'colunas' tem um array por campo do esquema.
+
+        As linhas são ordenadas por 'momento' e não podem ser anteriores à
+        última linha já gravada no mesmo mês (o histórico só cresce).
+        """
+        esquema = ESQUEMAS[tabela]
+        faltando = [c for c in esquema if c not in colunas]
+        if faltando:
+            raise ValueError(f"Campos ausentes para '{tabela}': {', '.join(faltando)}")
+
+        momento = np.asarray(colunas["momento"], dtype=np.int64)
+        ordem = np.argsort(momento, kind="stable")
+        momento = momento[ordem]
+        if len(momento) == 0:
+            return 0
+        valores = {c: np.asarray(colunas[c], dtype=tipo)[ordem] for c, tipo in esquema.items() if c != "momento"}
+
+        dir_site = self._dir_site(tabela, site)
+        a = 0
+        while a < len(momento):
+            mes = _mes(momento[a])
+            b = int(np.searchsorted(momento, _fim_mes(mes)))
+            dir_mes = os.path.join(dir_site, mes)
+            os.makedirs(dir_mes, exist_ok=True)
+            self._alinhar(dir_mes, esquema)
+            ultimo = self._ultimo_momento(dir_mes)
+            if ultimo is not None and momento[a] < ultimo:
+                raise ValueError(f"Linhas de {site} em {mes} anteriores às já gravadas (só acréscimo).")
+            # 'momento' por último: só conta como gravada a linha que chegou ao
+            # 'momento'; o que sobrar nos outros campos de uma gravação
+            # interrompida é cortado por '_alinhar' antes do próximo acréscimo
+            for campo, coluna in valores.items():
+                self._acrescentar(dir_mes, campo, esquema[campo], coluna[a:b])
+            self._acrescentar(dir_mes, "momento", np.int64, momento[a:b])
+            a = b
+        return len(momento)
+
+    @staticmethod
+    def _caminho(dir_mes, campo, tipo):
+        return os.path.join(dir_mes, f"{campo}.{np.dtype(tipo).name}")
+
+    def _acrescentar(self, dir_mes, campo, tipo, valores):
+        with open(self._caminho(dir_mes, campo, tipo), "ab") as f:
+            f.write(np.ascontiguousarray(valores, dtype=tipo).tobytes())
+
+    def _alinhar(self, dir_mes, esquema):
+        # Corta todos os arquivos do mês no número de linhas do 'momento'
+        # (restos de uma gravação interrompida, inclusive um valor pela metade)
+        caminho = self._caminho(dir_mes, "momento", np.int64)
+        linhas = (os.path.getsize(caminho) if os.path.exists(caminho) else 0) // np.dtype(np.int64).itemsize
+        for campo, tipo in esquema.items():
+            caminho = self._caminho(dir_mes, campo, tipo)
+            tamanho = linhas * np.dtype(tipo).itemsize
+            if os.path.exists(caminho) and os.path.getsize(caminho) > tamanho:
+                os.truncate(caminho, tamanho)
+
+    def _mapear(self, dir_mes, campo, tipo, linhas=None):
+        caminho = self._caminho(dir_mes, campo, tipo)
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        n = tamanho // np.dtype(tipo).itemsize
+        if linhas is not None:
+            n = min(n, linhas)
+        if n == 0:
+            return np.empty(0, dtype=tipo)
+        return np.memmap(caminho, dtype=tipo, mode="r", shape=(n,))
+
+    def _ultimo_momento(self, dir_mes):
+        momento = self._mapear(dir_mes, "momento", np.int64)
+        return int(momento[-1]) if len(momento) else None
+
+    def meses(self, tabela, site):
+        dir_site = self._dir_site(tabela, site)
+        if not os.path.isdir(dir_site):
+            return []
+        return sorted(os.listdir(dir_site))
+
+    def sites(self, tabela):
+        dir_tabela = os.path.join(self.diretorio, tabela)
+        return sorted(os.listdir(dir_tabela)) if os.path.isdir(dir_tabela) else []
+
+    def fatias(self, tabela, sites, inicio, fim, campos=None):
+        """Gera (site, mes, {campo: array}) com as linhas em [inicio, fim).
+
+        Os arrays são recortes dos arquivos mapeados (nada é copiado); a
+        memória residente não cresce com o tamanho do histórico.
+        """
+        esquema = ESQUEMAS[tabela]
+        campos = list(esquema) if campos is None else ["momento"] + [c for c in campos if c != "momento"]
+        inicio, fim = int(inicio), int(fim)
+        for site in ([sites] if isinstance(sites, str) else sites):
+            dir_site = self._dir_site(tabela, site)
+            for mes in self.meses(tabela, site):
+                if _fim_mes(mes) <= inicio or _inicio_mes(mes) >= fim:
+                    continue
+                dir_mes = os.path.join(dir_site, mes)
+                momento = self._mapear(dir_mes, "momento", np.int64)
+                a, b = np.searchsorted(momento, [inicio, fim])
+                if a == b:
+                    continue
+                yield site, mes, {
+                    c: momento[a:b] if c == "momento" else self._mapear(dir_mes, c, esquema[c], len(momento))[a:b]
+                    for c in campos
+                }
+
+    def ler(self, tabela, sites, inicio, fim, campos=None):
+        """{site: {campo: array}} com as linhas em [inicio, fim), em ordem de tempo."""
+        partes = {}
+        for site, _, colunas in self.fatias(tabela, sites, inicio, fim, campos):
+            partes.setdefault(site, []).append(colunas)
+        return {
+            site: (lista[0] if len(lista) == 1 else {c: np.concatenate([p[c] for p in lista]) for c in lista[0]})
+            for site, lista in partes.items()
+        }
@@ -0,0 +1,85 @@
+# ==============================================================================
+# PERFIL HORÁRIO (Módulo 8)
+# Curva de DVP e radiação acumulada hora a hora a partir da previsão horária
+# do open-meteo, com os horários dos pulsos (disparados por soma de radiação)
+# e as janelas de estresse. Só operações com arrays: é barato o suficiente
+# para recalcular a cada rerun do Streamlit.
+# ==============================================================================
+import os
+
+import numpy as np
+import pandas as pd
+
+import motor
+import perfis
+from lote import calcular_dvp_vetorizado
+
+# Um pulso a cada X MJ/m² de radiação externa acumulada. Com 1.5, um dia de
+# 15 MJ/m² dá 10 pulsos e um de 24 MJ/m² dá 16 (as faixas do Módulo 5).
+LIMIAR_RADIACAO_PULSO_MJ = float(os.environ.get("CEREBRO_LIMIAR_RADIACAO_PULSO_MJ", "1.5"))
+W_M2_HORA_PARA_MJ_M2 = 3600 / 1e6
+
+
+def perfil_horario(estagio, hourly, perfil=None, estufa=None):
+    """Uma linha por hora: temperatura, umidade, radiação, DVP e alertas.
+
+    O open-meteo informa a radiação como média da hora anterior, então a
+    radiação acumulada na linha 'hora' vale para o fim daquela hora. Os dados
+    são do ar externo previsto, não das medições internas da estufa.
+    """
+    p = perfis.tabela().linha(estagio, perfil, estufa)
+    dvp_meta = p['meta_deficit_pressao_vapor_kpa']
+    temperatura = np.asarray(hourly["temperature_2m"], dtype=float)
+    umidade = np.asarray(hourly["relative_humidity_2m"], dtype=float)
+    radiacao_w = np.nan_to_num(np.asarray(hourly["shortwave_radiation"], dtype=float))
+    radiacao_mj = radiacao_w * W_M2_HORA_PARA_MJ_M2
+    dvp = calcular_dvp_vetorizado(temperatura, umidade)
+    return pd.DataFrame({
+        "hora": pd.to_datetime(hourly["time"]),
+        "temperatura": temperatura,
+        "umidade": umidade,
+        "radiacao_w_m2": radiacao_w,
+        "radiacao_mj_m2": radiacao_mj,
+        "radiacao_acumulada_mj_m2": np.cumsum(radiacao_mj),
+        "dvp": dvp,
+        "dvp_meta": dvp_meta,
+        "estresse": dvp > (dvp_meta + p['margem_dvp_alto']),
+        "critico": dvp > motor.DVP_CRITICO,
+    })
+
+
+def horarios_pulsos(perfil, kc, limiar_mj=LIMIAR_RADIACAO_PULSO_MJ, parametros=motor.PARAMETROS_PADRAO):
+    """Horário de cada pulso: o instante em que a radiação acumulada cruza
+    mais um múltiplo de 'limiar_mj' (interpolado dentro da hora).
+    'parametros' é a linha de 'perfis.tabela()' usada no volume do pulso."""
+    acumulada = perfil["radiacao_acumulada_mj_m2"].to_numpy()
+    total = acumulada[-1] if len(acumulada) else 0.0
+    limiares = limiar_mj * np.arange(1, int(total // limiar_mj) + 1)
+    i = np.searchsorted(acumulada, limiares)
+    falta_mj = acumulada[i] - limiares
+    horas_antes = falta_mj / perfil["radiacao_mj_m2"].to_numpy()[i]
+    inicio = perfil["hora"].to_numpy()[i] - pd.to_timedelta(horas_antes, unit="h").to_numpy()
+    return pd.DataFrame({
+        "pulso": np.arange(1, len(limiares) + 1),
+        "inicio": pd.to_datetime(inicio).floor("min"),
+        "radiacao_acumulada_mj_m2": limiares,
+        "volume_planta_litros": motor.calcular_volume_irrigacao(limiar_mj, kc, *motor.volume_perfil(parametros)),
+    })
+
+
+def janelas_estresse(perfil):
+    """Trechos contínuos com DVP acima do alerta do Módulo 5 (meta + margem)."""
+    estresse = perfil["estresse"].to_numpy()
+    bordas = np.diff(np.concatenate(([0], estresse.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordas == 1)
+    fins = np.flatnonzero(bordas == -1)
+    horas = perfil["hora"]
+    dvp = perfil["dvp"].to_numpy()
+    critico = perfil["critico"].to_numpy()
+    return pd.DataFrame({
+        "inicio": horas.iloc[inicios].to_numpy(),
+        "fim": horas.iloc[fins - 1].to_numpy(),
+        "horas": fins - inicios,
+        "dvp_max": [dvp[a:b].max() for a, b in zip(inicios, fins)],
+        "critico": [bool(critico[a:b].any()) for a, b in zip(inicios, fins)],
+    })
@@ -0,0 +1,402 @@
+# ==============================================================================
+# MODO LOTE (FROTA DE ESTUFAS)
+# Lê uma tabela de sites (CSV ou Parquet) e gera a recomendação do Módulo 5
+# para todas as linhas de uma vez, com NumPy/pandas em vez de um laço por site.
+# Os resultados são os mesmos de 'motor.gerar_recomendacao' linha a linha
+# (os status exatamente; o DVP pode diferir no último bit, ver
+# '_dvp_nos_limites').
+# As colunas opcionais 'perfil' e 'estufa' escolhem o perfil de cada site em
+# 'dados/perfis.json' (vazio = padrão).
+# Sem a coluna 'radiacao_prevista', o clima é buscado em paralelo (ver
+# 'clima.buscar_previsoes') e o CSV é escrito à medida que as previsões chegam.
+# Toda linha de entrada sai na saída, com as colunas como vieram; sem cidade
+# ou sem previsão, as colunas calculadas ficam vazias.
+#
+# Uso: python lote.py sites.csv -o recomendacoes.csv
+# ==============================================================================
+import argparse
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import motor
+import perfis
+
+COLUNAS_ENTRADA = ("estagio", "temp_max_int", "temp_min_int", "umidade_media_int", "ec_drenado")
+COLUNAS_PERFIL = ("perfil", "estufa")
+COLUNAS_SITE = ("cidade", "estado")
+
+_CAMPOS_RECEITUARIO = {
+    "ec_ideal_base": "ec_ideal_solucao",
+    "ph_ideal": "ph_ideal_solucao",
+    "dvp_meta": "meta_deficit_pressao_vapor_kpa",
+    "kc": "kc",
+}
+
+
+def calcular_dvp_vetorizado(temperatura, umidade_relativa):
+    temperatura = np.asarray(temperatura, dtype=float)
+    umidade_relativa = np.asarray(umidade_relativa, dtype=float)
+    pvs = 0.6108 * np.exp((17.27 * temperatura) / (temperatura + 237.3))
+    pva = pvs * (umidade_relativa / 100.0)
+    dvp = pvs - pva
+    return np.where((umidade_relativa <= 0) | (umidade_relativa > 100), 0.0, dvp)
+
+
+# Distância a um limite abaixo da qual o DVP é refeito com o 'math.exp' do
+# motor: o np.exp (SIMD) pode diferir dele no último bit (~1e-16 relativo)
+TOLERANCIA_LIMITE_DVP = 1e-9
+
+
+def _dvp_nos_limites(dvp, temperatura, umidade_relativa, *limites):
+    # Refaz com 'motor.calcular_dvp' só as linhas quase em cima de um limite,
+    # para que os status sejam os mesmos do motor também nesses casos. Os
+    # limites podem ter mais dimensões que 'dvp' (varredura de cenários)
+    perto = np.zeros(dvp.shape, dtype=bool)
+    for limite in limites:
+        mascara = np.abs(dvp - limite) <= TOLERANCIA_LIMITE_DVP
+        extras = mascara.ndim - dvp.ndim
+        if extras:
+            mascara = mascara.any(axis=tuple(range(extras)))
+        eixos = tuple(i for i, n in enumerate(dvp.shape) if n == 1 and mascara.shape[i] != 1)
+        perto |= mascara.any(axis=eixos, keepdims=True) if eixos else mascara
+    if perto.any():
+        temperatura = np.broadcast_to(temperatura, dvp.shape)
+        umidade_relativa = np.broadcast_to(umidade_relativa, dvp.shape)
+        for i in zip(*np.nonzero(perto)):
+            dvp[i] = motor.calcular_dvp(float(temperatura[i]), float(umidade_relativa[i]))
+    return dvp
+
+
+def calcular_volume_irrigacao_vetorizado(radiacao_solar_externa_mj, kc, p=motor.PARAMETROS_PADRAO):
+    radiacao_interna = np.asarray(radiacao_solar_externa_mj, dtype=float) * p["transmissividade_estufa"]
+    eto_mm_dia = radiacao_interna * p["fator_conversao_radiacao_eto"]
+    etc_mm_dia = eto_mm_dia * np.asarray(kc, dtype=float)
+    litros_por_planta = etc_mm_dia / p["densidade_plantas"]
+    return litros_por_planta * p["fracao_lixiviacao"]
+
+
+@functools.lru_cache(maxsize=None)
+def _colunas_perfis():
+    # 'perfis.tabela()' em arrays somente-leitura: uma coluna por campo e o
+    # mapa denso (perfil, estufa, estágio) -> linha (-1 onde não existe), e
+    # os campos que não mudam com o estágio em nenhum perfil
+    t = perfis.tabela()
+    colunas = {campo: np.array([linha[campo] for linha in t.linhas], dtype=float) for campo in perfis.CAMPOS}
+    mapa = np.full((len(t.perfis), len(t.estufas), len(t.estagios)), -1, dtype=np.intp)
+    for (perfil, estufa, estagio), i in t.indice.items():
+        mapa[t.perfis.index(perfil), t.estufas.index(estufa), t.estagios.index(estagio)] = i
+    for array in (*colunas.values(), mapa):
+        array.flags.writeable = False
+    fixos = frozenset(
+        campo for campo in perfis.CAMPOS_PERFIL
+        if all(t.linhas[i][campo] == t.gerais[(perfil, estufa)][campo] for (perfil, estufa, _), i in t.indice.items())
+    )
+    return colunas, mapa, fixos
+
+
+def _codigos(valores, categorias, padrao, rotulo):
+    # Códigos (posição em 'categorias') por linha; None/NaN/"" usam o padrão.
+    # Só os valores distintos (poucos) são procurados em 'categorias'.
+    if valores is None:
+        return np.intp(categorias.index(padrao))
+    codigos, distintos = pd.factorize(np.asarray(valores, dtype=object).ravel())
+    posicoes = {c: i for i, c in enumerate(categorias)}
+    vazio = posicoes.get(padrao, -1)
+    mapa = np.array([vazio if v == "" else posicoes.get(v, -2) for v in distintos] + [vazio], dtype=np.intp)
+    desconhecidos = sorted(str(v) for v, i in zip(distintos, mapa) if i < 0)
+    if vazio < 0 and np.any(codigos < 0):
+        desconhecidos.append("(vazio)")
+    if desconhecidos:
+        raise ValueError(f"{rotulo} desconhecido(s): {', '.join(desconhecidos)}")
+    return mapa[codigos].reshape(np.shape(valores))
+
+
+def _indices_perfis(estagios, perfis_site, estufas):
+    # (perfil, estufa, linha da tabela) por site; perfil/estufa são escalares sem as colunas
+    t = perfis.tabela()
+    _, mapa, _ = _colunas_perfis()
+    i_estagio = _codigos(estagios, list(t.estagios), None, "Estágio(s) fenológico(s)")
+    i_perfil = _codigos(perfis_site, list(t.perfis), t.perfil_padrao, "Perfil(is)")
+    i_estufa = _codigos(estufas, list(t.estufas), t.estufa_padrao, "Tipo(s) de estufa")
+    linhas = mapa[i_perfil, i_estufa, i_estagio]
+    if np.any(linhas < 0):
+        p, e, faltando = np.broadcast_arrays(i_perfil, i_estagio, linhas < 0)
+        pares = sorted({(t.perfis[i], t.estagios[j]) for i, j in zip(p[faltando], e[faltando])})
+        raise ValueError("Estágio(s) sem parâmetros no perfil: " + ", ".join(f"{e} ({p})" for p, e in pares))
+    return i_perfil, i_estufa, linhas
+
+
+def parametros_receituario(estagios, perfis_site=None, estufas=None):
+    """Parâmetros por linha: receituário (ec_ideal_base, ph_ideal, dvp_meta, kc) e CAMPOS_PERFIL.
+
+    'perfis_site' e 'estufas' são colunas (ou None = padrão de 'dados/perfis.json').
+    Cada campo sai de um único gather na tabela resolvida de 'perfis.py'; com
+    um só perfil e estufa, os campos que não mudam com o estágio saem escalares.
+    """
+    return _parametros(*_indices_perfis(estagios, perfis_site, estufas))
+
+
+def _parametros(i_perfil, i_estufa, linhas):
+    t = perfis.tabela()
+    colunas, _, fixos = _colunas_perfis()
+    saida = {coluna: colunas[campo][linhas] for coluna, campo in _CAMPOS_RECEITUARIO.items()}
+    gerais = None
+    if np.ndim(i_perfil) == 0 and np.ndim(i_estufa) == 0:
+        gerais = t.parametros_gerais(t.perfis[i_perfil], t.estufas[i_estufa])
+    for campo in perfis.CAMPOS_PERFIL:
+        saida[campo] = gerais[campo] if gerais is not None and campo in fixos else colunas[campo][linhas]
+    return saida
+
+
+def calcular_recomendacoes(p, radiacao, ec_drenado, temp_max_int, temp_min_int, umidade):
+    """Lógica do Módulo 5 sobre arrays de qualquer formato (com broadcasting).
+
+    'p' vem de 'parametros_receituario' (parâmetros do perfil de cada linha).
+    Devolve um dicionário com os campos calculados de 'motor.RecomendacaoDiaria';
+    usado pelo modo lote e pela varredura de cenários ('cenarios.py').
+    """
+    radiacao = np.asarray(radiacao, dtype=float)
+    ec_drenado = np.asarray(ec_drenado, dtype=float)
+    umidade = np.asarray(umidade, dtype=float)
+
+    # Água e Frequência
+    faixa = np.select(
+        [radiacao > p["radiacao_pulsos_alta"], radiacao < p["radiacao_pulsos_baixa"]],
+        ["alta", "baixa"], default="padrao",
+    )
+    volume = calcular_volume_irrigacao_vetorizado(radiacao, p["kc"], p)
+
+    # Nutrientes (Ajuste Clima + Flush)
+    ec_ajuste = np.select(
+        [radiacao > p["radiacao_ec_reduzido"], radiacao < p["radiacao_ec_aumentado"]],
+        [-p["ajuste_ec_clima"], p["ajuste_ec_clima"]], default=0.0,
+    )
+    ec_ideal_ajustado = p["ec_ideal_base"] + ec_ajuste
+    delta_ec = ec_drenado - ec_ideal_ajustado
+    flush = delta_ec > p["limite_delta_ec"]
+    consumo = delta_ec < -p["limite_delta_ec"]
+    volume = np.where(flush, volume * p["fator_flush"], volume)
+    status_nutrientes = np.select([flush, consumo], ["salinidade", "consumo"], default="ok")
+    ec_solucao = np.select(
+        [flush, consumo],
+        [ec_ideal_ajustado - p["ajuste_ec_dreno"], ec_ideal_ajustado + p["ajuste_ec_dreno"]],
+        default=ec_ideal_ajustado,
+    )
+
+    # Ambiente (DVP)
+    temp_media_int = (np.asarray(temp_max_int, dtype=float) + np.asarray(temp_min_int, dtype=float)) / 2.0
+    limite_estresse = p["dvp_meta"] + p["margem_dvp_alto"]
+    limite_umido = p["dvp_meta"] - p["margem_dvp_baixo"]
+    dvp_calculado = _dvp_nos_limites(
+        calcular_dvp_vetorizado(temp_media_int, umidade), temp_media_int, np.asarray(umidade, dtype=float),
+        limite_estresse, limite_umido,
+    )
+    estresse = dvp_calculado > limite_estresse
+    umido = dvp_calculado < limite_umido
+    status_ambiente = np.select([estresse, umido], ["estresse", "umidade"], default="ok")
+
+    return {
+        "faixa_pulsos": faixa,
+        "frequencia_aumentada_dvp": estresse,
+        "volume_planta_litros": volume,
+        "flush": flush,
+        "ec_ajuste_clima": ec_ajuste,
+        "ec_ideal_ajustado": ec_ideal_ajustado,
+        "delta_ec": delta_ec,
+        "status_nutrientes": status_nutrientes,
+        "ec_solucao_recomendada": ec_solucao,
+        "temp_media_int": temp_media_int,
+        "dvp_calculado": dvp_calculado,
+        "status_ambiente": status_ambiente,
+    }
+
+
+def gerar_recomendacoes(sites):
+    """Uma linha por site com os mesmos campos de 'motor.RecomendacaoDiaria'.
+
+    'sites' precisa das colunas de COLUNAS_ENTRADA e 'radiacao_prevista'.
+    Linhas sem radiação (ex: cidade não encontrada) saem vazias (NaN).
+    """
+    faltando = [c for c in COLUNAS_ENTRADA + ("radiacao_prevista",) if c not in sites.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes na tabela de sites: {', '.join(faltando)}")
+
+    validos = sites[sites["radiacao_prevista"].notna()]
+    radiacao = validos["radiacao_prevista"].to_numpy(dtype=float)
+    ec_drenado = validos["ec_drenado"].to_numpy(dtype=float)
+    umidade = validos["umidade_media_int"].to_numpy(dtype=float)
+    t = perfis.tabela()
+    colunas_perfil = [validos[c].to_numpy() if c in validos.columns else None for c in COLUNAS_PERFIL]
+    i_perfil, i_estufa, linhas = _indices_perfis(validos["estagio"].to_numpy(), *colunas_perfil)
+    p = _parametros(i_perfil, i_estufa, linhas)
+    c = calcular_recomendacoes(p, radiacao, ec_drenado, validos["temp_max_int"].to_numpy(dtype=float),
+                               validos["temp_min_int"].to_numpy(dtype=float), umidade)
+
+    resultado = pd.DataFrame({
+        "estagio": validos["estagio"].to_numpy(),
+        "perfil": pd.Categorical.from_codes(np.broadcast_to(i_perfil, len(validos)), categories=t.perfis),
+        "estufa": pd.Categorical.from_codes(np.broadcast_to(i_estufa, len(validos)), categories=t.estufas),
+        "radiacao_prevista": radiacao,
+        "ec_ideal_base": p["ec_ideal_base"],
+        "ph_ideal": p["ph_ideal"],
+        "dvp_meta": p["dvp_meta"],
+        "kc": p["kc"],
+        "faixa_pulsos": c["faixa_pulsos"],
+        "frequencia": pd.Series(c["faixa_pulsos"]).map(motor.FREQUENCIAS_PULSOS).to_numpy(),
+        "frequencia_aumentada_dvp": c["frequencia_aumentada_dvp"],
+        "volume_planta_litros": c["volume_planta_litros"],
+        "flush": c["flush"],
+        "ec_ajuste_clima": c["ec_ajuste_clima"],
+        "ec_ideal_ajustado": c["ec_ideal_ajustado"],
+        "ec_drenado": ec_drenado,
+        "delta_ec": c["delta_ec"],
+        "status_nutrientes": c["status_nutrientes"],
+        "ec_solucao_recomendada": c["ec_solucao_recomendada"],
+        "temp_media_int": c["temp_media_int"],
+        "umidade_media_int": umidade,
+        "dvp_calculado": c["dvp_calculado"],
+        "status_ambiente": c["status_ambiente"],
+    }, index=validos.index)
+    return resultado.reindex(sites.index)
+
+
+def _radiacoes_em_fluxo(sites):
+    # Gera (índices das linhas, radiação) à medida que as previsões chegam.
+    # O geocoding e as previsões andam juntos: cada COORDENADAS_POR_REQUISICAO
+    # coordenadas novas já viram uma busca de previsão, sem esperar as
+    # outras cidades. Linhas sem cidade/estado saem com NaN
+    import clima
+
+    linhas_por_local = sites.groupby(list(COLUNAS_SITE), sort=False, dropna=False).groups
+    sem_local = [local for local in linhas_por_local if any(pd.isna(v) or v == "" for v in local)]
+    for local in sem_local:
+        yield list(linhas_por_local.pop(local)), np.nan
+
+    linhas_por_coordenada = {}
+    radiacao_por_coordenada = {}  # previsões já entregues
+    pendentes, buscas = [], set()
+
+    def entregar(busca):
+        indices, radiacoes = [], []
+        for parcial in busca.result():
+            for coordenada, daily in parcial.items():
+                radiacao = np.nan if daily is None else daily["shortwave_radiation_sum"][0]
+                radiacao_por_coordenada[coordenada] = radiacao
+                linhas = linhas_por_coordenada[coordenada]
+                indices.extend(linhas)
+                radiacoes.extend([radiacao] * len(linhas))
+        return indices, np.array(radiacoes, dtype=float)
+
+    with ThreadPoolExecutor(max_workers=clima.MAX_CONCORRENCIA) as executor:
+        def buscar(coordenadas):
+            buscas.add(executor.submit(lambda: list(clima.buscar_previsoes(coordenadas))))
+
+        for local, resultado in clima.buscar_lat_longs(linhas_por_local):
+            if resultado is None:
+                yield list(linhas_por_local[local]), np.nan
+            else:
+                coordenada = (resultado[0], resultado[1])
+                if coordenada in radiacao_por_coordenada:
+                    linhas = list(linhas_por_local[local])
+                    yield linhas, np.full(len(linhas), radiacao_por_coordenada[coordenada])
+                else:
+                    if coordenada not in linhas_por_coordenada:
+                        pendentes.append(coordenada)
+                    linhas_por_coordenada.setdefault(coordenada, []).extend(linhas_por_local[local])
+                    if len(pendentes) >= clima.COORDENADAS_POR_REQUISICAO:
+                        buscar(pendentes)
+                        pendentes = []
+            for busca in [b for b in buscas if b.done()]:
+                buscas.discard(busca)
+                yield entregar(busca)
+
+        if pendentes:
+            buscar(pendentes)
+        for busca in as_completed(list(buscas)):
+            yield entregar(busca)
+
+
+def recomendacoes_em_fluxo(sites):
+    """Como 'gerar_recomendacoes', mas busca o clima e entrega as linhas aos poucos.
+
+    Cada DataFrame gerado cobre os sites cujas previsões acabaram de chegar,
+    então o cálculo começa antes de a última previsão ser baixada.
+    """
+    for indices, radiacao in _radiacoes_em_fluxo(sites):
+        parte = sites.loc[indices].assign(radiacao_prevista=radiacao)
+        yield gerar_recomendacoes(parte)
+
+
+def anexar_radiacao(sites):
+    """Cópia de 'sites' com a coluna 'radiacao_prevista' buscada no open-meteo."""
+    sites = sites.copy()
+    sites["radiacao_prevista"] = np.nan
+    for indices, radiacao in _radiacoes_em_fluxo(sites):
+        sites.loc[indices, "radiacao_prevista"] = radiacao
+    return sites
+
+
+def _com_todas_as_linhas(sites, partes):
+    # As partes e, no fim, as linhas de 'sites' que não vieram em nenhuma
+    # delas (vazias), para que toda linha de entrada apareça na saída
+    vistas = pd.Index([])
+    for parte in partes:
+        vistas = vistas.append(parte.index)
+        yield parte
+    faltando = sites.index.difference(vistas)
+    if len(faltando):
+        yield gerar_recomendacoes(sites.loc[faltando].assign(radiacao_prevista=np.nan))
+
+
+def ler_sites(caminho):
+    if os.path.splitext(caminho)[1].lower() in (".parquet", ".pq"):
+        return pd.read_parquet(caminho)
+    return pd.read_csv(caminho)
+
+
+def gravar_resultado(df, caminho):
+    if os.path.splitext(caminho)[1].lower() in (".parquet", ".pq"):
+        df.to_parquet(caminho)
+    else:
+        df.to_csv(caminho, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recomendação do Módulo 5 para uma frota de estufas.")
+    parser.add_argument("entrada", help="Tabela de sites (.csv ou .parquet)")
+    parser.add_argument("-o", "--saida", help="Arquivo de saída (.csv ou .parquet); padrão: stdout em CSV")
+    args = parser.parse_args(argv)
+
+    sites = ler_sites(args.entrada)
+    if "radiacao_prevista" in sites.columns:
+        partes = [gerar_recomendacoes(sites)]
+    else:
+        partes = recomendacoes_em_fluxo(sites)
+
+    csv_em_fluxo = not args.saida or os.path.splitext(args.saida)[1].lower() not in (".parquet", ".pq")
+    destino = open(args.saida, "w", newline="", encoding="utf-8") if args.saida and csv_em_fluxo else sys.stdout
+    acumuladas = []
+    try:
+        for i, recomendacoes in enumerate(_com_todas_as_linhas(sites, partes)):
+            # Colunas de entrada como vieram (também nas linhas sem previsão)
+            novas = [c for c in recomendacoes.columns if c not in sites.columns]
+            saida = pd.concat([sites.loc[recomendacoes.index], recomendacoes[novas]], axis=1)
+            if csv_em_fluxo:
+                saida.to_csv(destino, index=False, header=(i == 0))
+            else:
+                acumuladas.append(saida)
+    finally:
+        if destino is not sys.stdout:
+            destino.close()
+
+    if acumuladas:
+        gravar_resultado(pd.concat(acumuladas).reindex(sites.index), args.saida)
+
+
+if __name__ == "__main__":
+    main()
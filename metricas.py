@@ -0,0 +1,256 @@
+# ==============================================================================
+# MÉTRICAS DE LATÊNCIA POR ETAPA
+# Contadores e histogramas em memória (um registro por processo, seguro entre
+# threads), alimentados por 'medir(etapa)' em volta de geocoding, previsão,
+# cálculo e renderização, e pelas chamadas ao open-meteo em 'clima.py'.
+#
+# Saídas (ligadas por variáveis de ambiente, ver 'iniciar_do_ambiente'):
+#   CEREBRO_METRICAS_PORTA=9464         -> http://127.0.0.1:9464/metrics
+#                                          (formato texto do Prometheus)
+#   CEREBRO_METRICAS_HOST=0.0.0.0       -> endereço do endpoint (padrão
+#                                          127.0.0.1: só a própria máquina)
+#   CEREBRO_METRICAS_LOG_SEGUNDOS=60    -> um log JSON com o resumo a cada 60 s
+# ==============================================================================
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+AJUDA = {
+    "cerebro_etapa_segundos": ("histogram", "Duração de cada etapa da recomendação."),
+    "cerebro_etapa_erros_total": ("counter", "Etapas que terminaram com exceção."),
+    "cerebro_upstream_segundos": ("histogram", "Duração das chamadas ao open-meteo."),
+    "cerebro_upstream_erros_total": ("counter", "Chamadas ao open-meteo que falharam (exceto timeout)."),
+    "cerebro_upstream_timeouts_total": ("counter", "Chamadas ao open-meteo que estouraram o timeout."),
+    "cerebro_cache_total": ("counter", "Consultas aos caches (clima e cálculos) por resultado, agrupamentos e despejos da memória."),
+    "cerebro_previsoes_servidas_total": ("counter", "Previsões entregues à interface, atualizadas ou não."),
+    "cerebro_registros_total": ("counter", "Registros (leads, recomendações, check-points) por tabela e resultado."),
+    "cerebro_registros_fila": ("gauge", "Registros aguardando a gravação em lote."),
+    "cerebro_prefetch_sites_total": ("counter", "Sites atualizados pelo agendador de pré-busca, por resultado."),
+}
+
+logger = logging.getLogger("cerebro.metricas")
+
+_trava = threading.Lock()
+_contadores = {}   # (nome, rótulos) -> valor
+_histogramas = {}  # (nome, rótulos) -> _Histograma
+_coletores = []    # funções que devolvem [(nome, rótulos, valor)] na hora da leitura
+
+
+class _Histograma:
+    def __init__(self, limites=LIMITES_SEGUNDOS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        # Limite superior do bucket que contém o quantil (aproximado)
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for limite, contagem in zip(self.limites + (float("inf"),), self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+
+def incrementar(nome, valor=1, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def observar(nome, valor, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _trava:
+        histograma = _histogramas.get(chave)
+        if histograma is None:
+            histograma = _histogramas[chave] = _Histograma()
+        histograma.observar(valor)
+
+
+@contextmanager
+def medir(etapa):
+    """Registra a duração do bloco em 'cerebro_etapa_segundos{etapa=...}'."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        incrementar("cerebro_etapa_erros_total", etapa=etapa, tipo=type(e).__name__)
+        raise
+    finally:
+        observar("cerebro_etapa_segundos", time.perf_counter() - inicio, etapa=etapa)
+
+
+def registrar_coletor(coletor):
+    """'coletor()' devolve [(nome, {rótulos}, valor)], lidos a cada exportação."""
+    with _trava:
+        if coletor not in _coletores:
+            _coletores.append(coletor)
+
+
+def _rotulos_texto(rotulos):
+    if not rotulos:
+        return ""
+    partes = []
+    for k, v in rotulos:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _numero(valor):
+    return "+Inf" if valor == float("inf") else repr(float(valor))
+
+
+def _instantaneo():
+    with _trava:
+        contadores = dict(_contadores)
+        histogramas = {
+            k: (h.limites, list(h.contagens), h.soma, h.total) for k, h in _histogramas.items()
+        }
+        coletores = list(_coletores)
+    for coletor in coletores:
+        for nome, rotulos, valor in coletor():
+            contadores[_chave(nome, rotulos)] = valor
+    return contadores, histogramas
+
+
+def texto_prometheus():
+    contadores, histogramas = _instantaneo()
+    por_nome = {}
+    for (nome, rotulos), valor in contadores.items():
+        por_nome.setdefault(nome, []).append(f"{nome}{_rotulos_texto(rotulos)} {_numero(valor)}")
+    for (nome, rotulos), (limites, contagens, soma, total) in histogramas.items():
+        linhas = por_nome.setdefault(nome, [])
+        acumulado = 0
+        for limite, contagem in zip(limites + (float("inf"),), contagens):
+            acumulado += contagem
+            rotulos_bucket = rotulos + (("le", _numero(limite)),)
+            linhas.append(f"{nome}_bucket{_rotulos_texto(rotulos_bucket)} {acumulado}")
+        linhas.append(f"{nome}_sum{_rotulos_texto(rotulos)} {_numero(soma)}")
+        linhas.append(f"{nome}_count{_rotulos_texto(rotulos)} {total}")
+
+    saida = []
+    for nome in sorted(por_nome):
+        tipo, ajuda = AJUDA.get(nome, ("untyped", ""))
+        if ajuda:
+            saida.append(f"# HELP {nome} {ajuda}")
+        saida.append(f"# TYPE {nome} {tipo}")
+        saida.extend(sorted(por_nome[nome]))
+    return "\n".join(saida) + "\n"
+
+
+def resumo():
+    """Dicionário com contadores e, por histograma, total, média, p50 e p95."""
+    contadores, _ = _instantaneo()
+    with _trava:
+        histogramas = {
+            k: {
+                "total": h.total,
+                "media_s": h.soma / h.total if h.total else None,
+                "p50_s": h.quantil(0.5),
+                "p95_s": h.quantil(0.95),
+            }
+            for k, h in _histogramas.items()
+        }
+
+    def nome_texto(chave):
+        nome, rotulos = chave
+        return nome + _rotulos_texto(rotulos)
+
+    return {
+        "contadores": {nome_texto(k): v for k, v in sorted(contadores.items())},
+        "histogramas": {nome_texto(k): v for k, v in sorted(histogramas.items())},
+    }
+
+
+def zerar():
+    with _trava:
+        _contadores.clear()
+        _histogramas.clear()
+
+
+# --- Exportação ---
+
+_servidor = None
+_thread_log = None
+_trava_inicio = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        dados = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+def iniciar_servidor(porta, host="127.0.0.1"):
+    """Servidor HTTP com '/metrics' em uma thread; só um por processo."""
+    global _servidor
+    with _trava_inicio:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer((host, porta), _Handler)
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+        return _servidor
+
+
+def iniciar_log_periodico(segundos):
+    """Registra 'resumo()' em JSON no logger 'cerebro.metricas' a cada 'segundos'."""
+    global _thread_log
+
+    def laco():
+        while True:
+            time.sleep(segundos)
+            logger.info(json.dumps(resumo(), ensure_ascii=False))
+
+    with _trava_inicio:
+        if _thread_log is None:
+            if not logger.handlers:
+                logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+            _thread_log = threading.Thread(target=laco, daemon=True)
+            _thread_log.start()
+        return _thread_log
+
+
+def iniciar_do_ambiente():
+    """Liga o endpoint e/ou o log periódico conforme as variáveis de ambiente."""
+    porta = os.environ.get("CEREBRO_METRICAS_PORTA")
+    if porta:
+        host = os.environ.get("CEREBRO_METRICAS_HOST", "127.0.0.1")
+        try:
+            iniciar_servidor(int(porta), host)
+        except OSError as e:
+            logger.warning("Não foi possível abrir a porta de métricas %s:%s: %s", host, porta, e)
+    segundos = os.environ.get("CEREBRO_METRICAS_LOG_SEGUNDOS")
+    if segundos:
+        iniciar_log_periodico(float(segundos))
@@ -0,0 +1,248 @@
+# ==============================================================================
+# MOTOR DE RECOMENDAÇÃO (sem Streamlit)
+# Receituário, cálculos e a lógica dos Módulos 5 e 6. Pode ser importado por
+# jobs em lote, testes e outros serviços; devolve objetos estruturados e não
+# texto. A formatação para tela fica em 'textos.py'.
+# ==============================================================================
+import math
+from dataclasses import dataclass
+
+import perfis
+
+# ==============================================================================
+# MÓDULO 2: BASE DE CONHECIMENTO (O "Receituário")
+# ==============================================================================
+# Perfis de cultura/cultivar e estufa de 'dados/perfis.json' (ver 'perfis.py').
+# O receituário e as constantes abaixo são os do perfil padrão; as funções
+# aceitam 'perfil' e 'estufa' para usar outro.
+PARAMETROS_PADRAO = perfis.tabela().parametros_gerais()
+receituario_agronomico = perfis.tabela().receituario()
+
+# ==============================================================================
+# MÓDULO 4: FUNÇÕES DO "CÉREBRO" (Cálculos)
+# ==============================================================================
+TRANSMISSIVIDADE_ESTUFA = PARAMETROS_PADRAO["transmissividade_estufa"]
+DENSIDADE_PLANTAS = PARAMETROS_PADRAO["densidade_plantas"]
+FATOR_CONVERSAO_RADIACAO_ETO = PARAMETROS_PADRAO["fator_conversao_radiacao_eto"]
+FRACAO_LIXIVIACAO = PARAMETROS_PADRAO["fracao_lixiviacao"]
+
+def calcular_dvp(temperatura, umidade_relativa):
+    if umidade_relativa <= 0 or umidade_relativa > 100: return 0.0
+    pvs = 0.6108 * math.exp((17.27 * temperatura) / (temperatura + 237.3))
+    pva = pvs * (umidade_relativa / 100.0)
+    dvp = pvs - pva
+    return dvp
+
+def calcular_volume_irrigacao(radiacao_solar_externa_mj, kc,
+                              transmissividade=TRANSMISSIVIDADE_ESTUFA, densidade_plantas=DENSIDADE_PLANTAS,
+                              fracao_lixiviacao=FRACAO_LIXIVIACAO, fator_eto=FATOR_CONVERSAO_RADIACAO_ETO):
+    # Padrões do perfil padrão; 'volume_perfil' tira os de outro perfil
+    radiacao_interna = radiacao_solar_externa_mj * transmissividade
+    eto_mm_dia = radiacao_interna * fator_eto
+    etc_mm_dia = eto_mm_dia * kc
+    litros_por_m2 = etc_mm_dia
+    litros_por_planta = litros_por_m2 / densidade_plantas
+    volume_total_irrigacao_planta = litros_por_planta * fracao_lixiviacao
+    return volume_total_irrigacao_planta
+
+def volume_perfil(p):
+    """Argumentos de 'calcular_volume_irrigacao' a partir de uma linha de 'perfis.tabela()'."""
+    return (p["transmissividade_estufa"], p["densidade_plantas"],
+            p["fracao_lixiviacao"], p["fator_conversao_radiacao_eto"])
+
+# ==============================================================================
+# MÓDULO 5: RECOMENDAÇÃO ESTRATÉGICA (Diária)
+# ==============================================================================
+# Faixas de radiação prevista (MJ/m²/dia)
+RADIACAO_PULSOS_ALTA = PARAMETROS_PADRAO["radiacao_pulsos_alta"]
+RADIACAO_PULSOS_BAIXA = PARAMETROS_PADRAO["radiacao_pulsos_baixa"]
+RADIACAO_EC_REDUZIDO = PARAMETROS_PADRAO["radiacao_ec_reduzido"]
+RADIACAO_EC_AUMENTADO = PARAMETROS_PADRAO["radiacao_ec_aumentado"]
+
+FREQUENCIAS_PULSOS = {
+    "alta": "Alta (12-16 pulsos)",
+    "baixa": "Baixa (6-8 pulsos)",
+    "padrao": "Padrão (8-12 pulsos)",
+}
+
+AJUSTE_EC_CLIMA = PARAMETROS_PADRAO["ajuste_ec_clima"]
+LIMITE_DELTA_EC = PARAMETROS_PADRAO["limite_delta_ec"]
+AJUSTE_EC_DRENO = PARAMETROS_PADRAO["ajuste_ec_dreno"]
+FATOR_FLUSH = PARAMETROS_PADRAO["fator_flush"]
+MARGEM_DVP_ALTO = PARAMETROS_PADRAO["margem_dvp_alto"]
+MARGEM_DVP_BAIXO = PARAMETROS_PADRAO["margem_dvp_baixo"]
+
+
+@dataclass(frozen=True)
+class RecomendacaoDiaria:
+    estagio: str
+    # Perfil ("cultura/cultivar") e tipo de estufa de 'dados/perfis.json'
+    perfil: str
+    estufa: str
+    radiacao_prevista: float
+    # Receituário
+    ec_ideal_base: float
+    ph_ideal: float
+    dvp_meta: float
+    kc: float
+    # Água: faixa_pulsos é "alta", "baixa" ou "padrao"
+    faixa_pulsos: str
+    frequencia_aumentada_dvp: bool
+    volume_planta_litros: float
+    flush: bool
+    # Nutrientes: status_nutrientes é "salinidade", "consumo" ou "ok"
+    ec_ajuste_clima: float
+    ec_ideal_ajustado: float
+    ec_drenado: float
+    delta_ec: float
+    status_nutrientes: str
+    ec_solucao_recomendada: float
+    # Ambiente: status_ambiente é "estresse", "umidade" ou "ok"
+    temp_media_int: float
+    umidade_media_int: float
+    dvp_calculado: float
+    status_ambiente: str
+
+    @property
+    def frequencia(self):
+        return FREQUENCIAS_PULSOS[self.faixa_pulsos]
+
+
+def faixa_pulsos(radiacao_prevista, p=PARAMETROS_PADRAO):
+    if radiacao_prevista > p["radiacao_pulsos_alta"]: return "alta"
+    elif radiacao_prevista < p["radiacao_pulsos_baixa"]: return "baixa"
+    else: return "padrao"
+
+
+def ajuste_ec_clima(radiacao_prevista, p=PARAMETROS_PADRAO):
+    if radiacao_prevista > p["radiacao_ec_reduzido"]: return -p["ajuste_ec_clima"]
+    elif radiacao_prevista < p["radiacao_ec_aumentado"]: return p["ajuste_ec_clima"]
+    else: return 0.0
+
+
+def gerar_recomendacao(estagio, radiacao_prevista, temp_max_int, temp_min_int, umidade_media_int, ec_drenado,
+                       perfil=None, estufa=None):
+    # 1. Busca Receituário (uma linha da tabela de perfis; None = perfil/estufa padrão)
+    tabela = perfis.tabela()
+    perfil = perfil or tabela.perfil_padrao
+    estufa = estufa or tabela.estufa_padrao
+    p = tabela.linha(estagio, perfil, estufa)
+    ec_ideal_base = p['ec_ideal_solucao']
+    dvp_meta = p['meta_deficit_pressao_vapor_kpa']
+    kc_atual = p['kc']
+
+    # 2. Lógica de Água e Frequência
+    faixa = faixa_pulsos(radiacao_prevista, p)
+    volume = calcular_volume_irrigacao(radiacao_prevista, kc_atual, *volume_perfil(p))
+
+    # 3. Lógica de Nutrientes (Ajuste Clima + Flush)
+    ec_ajuste = ajuste_ec_clima(radiacao_prevista, p)
+    ec_ideal_ajustado = ec_ideal_base + ec_ajuste
+    delta_ec = ec_drenado - ec_ideal_ajustado
+
+    flush = False
+    if delta_ec > p['limite_delta_ec']:
+        flush = True
+        volume *= p['fator_flush']
+        status_nutrientes = "salinidade"
+        ec_solucao = ec_ideal_ajustado - p['ajuste_ec_dreno']
+    elif delta_ec < -p['limite_delta_ec']:
+        status_nutrientes = "consumo"
+        ec_solucao = ec_ideal_ajustado + p['ajuste_ec_dreno']
+    else:
+        status_nutrientes = "ok"
+        ec_solucao = ec_ideal_ajustado
+
+    # 4. Lógica de Ambiente (DVP)
+    temp_media_int = (temp_max_int + temp_min_int) / 2.0
+    dvp_calculado = calcular_dvp(temp_media_int, umidade_media_int)
+    if dvp_calculado > (dvp_meta + p['margem_dvp_alto']): status_ambiente = "estresse"
+    elif dvp_calculado < (dvp_meta - p['margem_dvp_baixo']): status_ambiente = "umidade"
+    else: status_ambiente = "ok"
+
+    return RecomendacaoDiaria(
+        estagio=estagio,
+        perfil=perfil,
+        estufa=estufa,
+        radiacao_prevista=radiacao_prevista,
+        ec_ideal_base=ec_ideal_base,
+        ph_ideal=p['ph_ideal_solucao'],
+        dvp_meta=dvp_meta,
+        kc=kc_atual,
+        faixa_pulsos=faixa,
+        frequencia_aumentada_dvp=status_ambiente == "estresse",
+        volume_planta_litros=volume,
+        flush=flush,
+        ec_ajuste_clima=ec_ajuste,
+        ec_ideal_ajustado=ec_ideal_ajustado,
+        ec_drenado=ec_drenado,
+        delta_ec=delta_ec,
+        status_nutrientes=status_nutrientes,
+        ec_solucao_recomendada=ec_solucao,
+        temp_media_int=temp_media_int,
+        umidade_media_int=umidade_media_int,
+        dvp_calculado=dvp_calculado,
+        status_ambiente=status_ambiente,
+    )
+
+# ==============================================================================
+# MÓDULO 6: CHECK-POINT TÁTICO (Meio-Dia)
+# ==============================================================================
+DVP_CRITICO = 1.8
+MARGEM_DVP_TATICO = 0.4
+DELTA_EC_CRITICO = 1.0
+DELTA_EC_CONSUMO = 0.2
+
+
+@dataclass(frozen=True)
+class CheckPoint:
+    estagio: str
+    perfil: str
+    estufa: str
+    dvp_meta: float
+    temp_atual: float
+    umidade_atual: float
+    dvp_atual: float
+    # "estresse_agudo", "estresse_elevado" ou "ok"
+    status_ambiente: str
+    ec_aplicado: float
+    ec_dreno: float
+    delta_ec: float
+    # "acumulo_salino", "consumo_alto" ou "ok"
+    status_nutricao: str
+
+
+def status_ambiente_tatico(dvp_atual, dvp_meta):
+    if dvp_atual > DVP_CRITICO: return "estresse_agudo"
+    elif dvp_atual > (dvp_meta + MARGEM_DVP_TATICO): return "estresse_elevado"
+    else: return "ok"
+
+
+def status_nutricao_tatico(delta_ec):
+    if delta_ec > DELTA_EC_CRITICO: return "acumulo_salino"
+    elif delta_ec < DELTA_EC_CONSUMO: return "consumo_alto"
+    else: return "ok"
+
+
+def analisar_checkpoint(estagio, temp_atual, umidade_atual, ec_aplicado, ec_dreno, perfil=None, estufa=None):
+    # Só a meta de DVP depende do perfil; os limites táticos são os mesmos para todos
+    tabela = perfis.tabela()
+    perfil = perfil or tabela.perfil_padrao
+    estufa = estufa or tabela.estufa_padrao
+    dvp_meta = tabela.linha(estagio, perfil, estufa)['meta_deficit_pressao_vapor_kpa']
+    dvp_atual = calcular_dvp(temp_atual, umidade_atual)
+    delta_ec = ec_dreno - ec_aplicado
+    return CheckPoint(
+        estagio=estagio,
+        perfil=perfil,
+        estufa=estufa,
+        dvp_meta=dvp_meta,
+        temp_atual=temp_atual,
+        umidade_atual=umidade_atual,
+        dvp_atual=dvp_atual,
+        status_ambiente=status_ambiente_tatico(dvp_atual, dvp_meta),
+        ec_aplicado=ec_aplicado,
+        ec_dreno=ec_dreno,
+        delta_ec=delta_ec,
+        status_nutricao=status_nutricao_tatico(delta_ec),
+    )
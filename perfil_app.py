@@ -0,0 +1,57 @@
+# ==============================================================================
+# PERFIL DE INICIALIZAÇÃO E RERUN DO 'app.py'
+# Roda o app com o AppTest do Streamlit (sem navegador e sem rede): mede a
+# primeira execução (inclui imports e carga das bases) e os reruns causados
+# por widgets, e confere que pandas/NumPy não são importados à toa.
+#
+# Uso: python perfil_app.py [--reruns 50]
+# ==============================================================================
+import argparse
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+MODULOS_PESADOS = ("pandas", "numpy")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede a inicialização e os reruns do app.py.")
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_streamlit = time.perf_counter() - inicio
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=60)
+    at.session_state["lead_captured"] = True
+    at.session_state["user_name"] = "perfil"
+
+    inicio = time.perf_counter()
+    at.run()
+    primeira = time.perf_counter() - inicio
+    if at.exception:
+        sys.exit(f"Erro ao executar o app: {at.exception[0].value}")
+
+    tempos = []
+    for i in range(args.reruns):
+        inicio = time.perf_counter()
+        # Mudança típica de widget: EC drenado na barra lateral
+        at.sidebar.number_input[-1].set_value(2.0 + (i % 10) / 10).run()
+        tempos.append(time.perf_counter() - inicio)
+
+    linhas = [
+        ("import do streamlit", f"{import_streamlit * 1000:.1f} ms"),
+        ("primeira execução", f"{primeira * 1000:.1f} ms"),
+        (f"rerun (mediana de {args.reruns})", f"{statistics.median(tempos) * 1000:.1f} ms"),
+        ("rerun (máximo)", f"{max(tempos) * 1000:.1f} ms"),
+        ("Python do app no rerun", f"{at.session_state['tempos_execucao_ms'][-1]:.2f} ms"),
+    ]
+    linhas += [(f"{modulo} importado", "sim" if modulo in sys.modules else "não") for modulo in MODULOS_PESADOS]
+    for rotulo, valor in linhas:
+        print(f"{rotulo:<28}{valor:>12}")
+
+if __name__ == "__main__":
+    main()
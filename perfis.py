@@ -0,0 +1,151 @@
+# ==============================================================================
+# PERFIS DE CULTURA E ESTUFA
+# Os parâmetros do motor (receituário por estágio, transmissividade, densidade
+# de plantas, faixas de radiação, ajustes de EC...) vêm de 'dados/perfis.json',
+# com herança; o que é mais específico ganha:
+#   "parametros" (globais) < cultura < estágio da cultura
+#     < cultivar < estágio do cultivar < tipo de estufa
+# Os estágios só refinam: sem eles, os CAMPOS_PERFIL já precisam estar
+# completos ('gerais', as constantes de 'motor.py' vêm do perfil padrão).
+# Um perfil é "cultura/cultivar" (ex: "tomate/grape"). Tudo é resolvido uma
+# vez por processo em uma tabela plana e imutável: uma linha por
+# (perfil, estufa, estágio) com todos os CAMPOS preenchidos. O motor faz uma
+# única consulta ao dicionário 'indice' por recomendação; o modo lote
+# ('lote.parametros_receituario') transforma a tabela em arrays e busca as
+# linhas de milhares de sites de uma vez (um gather por coluna).
+# Em todo o projeto, os argumentos 'perfil' e 'estufa' são chaves desta
+# tabela, e None é o perfil/estufa padrão.
+# ==============================================================================
+import functools
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import base_conhecimento
+
+CAMPOS_ESTAGIO = ("ec_ideal_solucao", "ph_ideal_solucao", "meta_deficit_pressao_vapor_kpa", "kc")
+CAMPOS_PERFIL = (
+    "transmissividade_estufa",
+    "densidade_plantas",
+    "fator_conversao_radiacao_eto",
+    "fracao_lixiviacao",
+    "radiacao_pulsos_alta",
+    "radiacao_pulsos_baixa",
+    "radiacao_ec_reduzido",
+    "radiacao_ec_aumentado",
+    "ajuste_ec_clima",
+    "limite_delta_ec",
+    "ajuste_ec_dreno",
+    "fator_flush",
+    "margem_dvp_alto",
+    "margem_dvp_baixo",
+)
+CAMPOS = CAMPOS_ESTAGIO + CAMPOS_PERFIL
+
+
+@dataclass(frozen=True)
+class TabelaPerfis:
+    """Perfis resolvidos: 'linhas[indice[(perfil, estufa, estagio)]]' -> parâmetros."""
+
+    perfis: tuple
+    estufas: tuple
+    estagios: tuple
+    nomes: MappingProxyType            # perfil ou estufa -> nome para exibição
+    estagios_por_perfil: MappingProxyType
+    linhas: tuple                      # MappingProxyType com todos os CAMPOS
+    indice: MappingProxyType
+    gerais: MappingProxyType           # (perfil, estufa) -> CAMPOS_PERFIL sem os estágios
+    perfil_padrao: str
+    estufa_padrao: str
+
+    def linha(self, estagio, perfil=None, estufa=None):
+        """Parâmetros de um estágio; None usa o perfil/estufa padrão. KeyError se não existir."""
+        chave = (perfil or self.perfil_padrao, estufa or self.estufa_padrao, estagio)
+        try:
+            return self.linhas[self.indice[chave]]
+        except KeyError:
+            raise KeyError(f"Sem parâmetros para {chave!r} em 'dados/perfis.json'") from None
+
+    def parametros_gerais(self, perfil=None, estufa=None):
+        return self.gerais[(perfil or self.perfil_padrao, estufa or self.estufa_padrao)]
+
+    def receituario(self, perfil=None, estufa=None):
+        """Estágio -> campos do receituário (formato de 'motor.receituario_agronomico')."""
+        perfil = perfil or self.perfil_padrao
+        return MappingProxyType({
+            estagio: MappingProxyType({c: self.linha(estagio, perfil, estufa)[c] for c in CAMPOS_ESTAGIO})
+            for estagio in self.estagios_por_perfil[perfil]
+        })
+
+
+def _sobrepor(destino, origem, onde):
+    for campo, valor in origem.items():
+        if campo not in CAMPOS:
+            raise ValueError(f"Parâmetro desconhecido em {onde}: {campo!r}")
+        destino[campo] = valor
+
+
+def resolver(base):
+    """'dados/perfis.json' (já carregado) -> TabelaPerfis, aplicando a herança."""
+    perfis, estagios, nomes, estagios_por_perfil = [], [], {}, {}
+    linhas, indice, gerais = [], {}, {}
+    estufas = tuple(base["estufas"])
+    for nome_estufa, estufa in base["estufas"].items():
+        nomes[nome_estufa] = estufa.get("nome", nome_estufa)
+
+    for nome_cultura, cultura in base["culturas"].items():
+        for nome_cultivar, cultivar in cultura["cultivares"].items():
+            perfil = f"{nome_cultura}/{nome_cultivar}"
+            perfis.append(perfil)
+            nomes[perfil] = cultivar.get("nome", f"{cultura.get('nome', nome_cultura)} {nome_cultivar}")
+            extras = set(cultivar.get("estagios", {})) - set(cultura["estagios"])
+            if extras:
+                raise ValueError(f"Estágio(s) de '{perfil}' fora da cultura: {', '.join(sorted(extras))}")
+            estagios_por_perfil[perfil] = tuple(cultura["estagios"])
+
+            for nome_estufa in estufas:
+                camadas = lambda estagio: (
+                    (base.get("parametros", {}), "'parametros'"),
+                    (cultura.get("parametros", {}), f"'{nome_cultura}'"),
+                    (cultura["estagios"].get(estagio, {}), f"'{nome_cultura}' / '{estagio}'"),
+                    (cultivar.get("parametros", {}), f"'{perfil}'"),
+                    (cultivar.get("estagios", {}).get(estagio, {}), f"'{perfil}' / '{estagio}'"),
+                    (base["estufas"][nome_estufa].get("parametros", {}), f"estufa '{nome_estufa}'"),
+                )
+                for estagio in (None,) + tuple(cultura["estagios"]):
+                    valores = {}
+                    for origem, onde in camadas(estagio):
+                        _sobrepor(valores, origem, onde)
+                    campos = CAMPOS_PERFIL if estagio is None else CAMPOS
+                    faltando = [c for c in campos if c not in valores]
+                    if faltando:
+                        raise ValueError(f"Perfil '{perfil}' / estufa '{nome_estufa}' / "
+                                         f"{estagio or 'sem estágio'} sem: {', '.join(faltando)}")
+                    if estagio is None:
+                        gerais[(perfil, nome_estufa)] = MappingProxyType({c: valores[c] for c in CAMPOS_PERFIL})
+                        continue
+                    if estagio not in estagios:
+                        estagios.append(estagio)
+                    indice[(perfil, nome_estufa, estagio)] = len(linhas)
+                    linhas.append(MappingProxyType({c: valores[c] for c in CAMPOS}))
+
+    padrao = base["padrao"]
+    if padrao["perfil"] not in estagios_por_perfil or padrao["estufa"] not in estufas:
+        raise ValueError(f"Perfil padrão inexistente: {dict(padrao)!r}")
+    return TabelaPerfis(
+        perfis=tuple(perfis),
+        estufas=estufas,
+        estagios=tuple(estagios),
+        nomes=MappingProxyType(nomes),
+        estagios_por_perfil=MappingProxyType(estagios_por_perfil),
+        linhas=tuple(linhas),
+        indice=MappingProxyType(indice),
+        gerais=MappingProxyType(gerais),
+        perfil_padrao=padrao["perfil"],
+        estufa_padrao=padrao["estufa"],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def tabela():
+    """Tabela de 'dados/perfis.json', resolvida uma vez por processo."""
+    return resolver(base_conhecimento.perfis())
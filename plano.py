@@ -0,0 +1,62 @@
+# ==============================================================================
+# PLANO DE VÁRIOS DIAS (Módulo 7)
+# Usa a série diária da previsão (até 16 dias, uma única requisição) e calcula
+# o plano de irrigação e EC de todo o horizonte em uma passada vetorizada
+# (mesmas regras do Módulo 5, via 'lote.gerar_recomendacoes').
+# ==============================================================================
+import pandas as pd
+
+import lote
+
+COLUNAS_PLANO = (
+    "data",
+    "radiacao_prevista",
+    "faixa_pulsos",
+    "frequencia",
+    "volume_planta_litros",
+    "ec_ajuste_clima",
+    "ec_ideal_ajustado",
+    "delta_ec",
+    "flush",
+    "status_nutrientes",
+    "ec_solucao_recomendada",
+)
+
+
+def gerar_plano(estagio, daily, ec_drenado, temp_max_int, temp_min_int, umidade_media_int,
+                perfil=None, estufa=None):
+    """Plano por dia a partir do bloco 'daily' do open-meteo.
+
+    As medições internas (temperaturas, umidade e EC do dreno) são as de hoje
+    e valem para todo o horizonte; o que muda de um dia para o outro é a
+    radiação prevista. Os dias de 'flush' projetados são os dias em que o EC
+    do dreno de hoje fica acima da meta ajustada pelo clima daquele dia.
+    """
+    radiacao = daily["shortwave_radiation_sum"]
+    dias = pd.DataFrame({
+        "data": pd.to_datetime(daily["time"]).date,
+        "estagio": estagio,
+        "perfil": perfil,
+        "estufa": estufa,
+        "radiacao_prevista": pd.to_numeric(pd.Series(radiacao, dtype=object), errors="coerce"),
+        "temp_max_int": temp_max_int,
+        "temp_min_int": temp_min_int,
+        "umidade_media_int": umidade_media_int,
+        "ec_drenado": ec_drenado,
+    })
+    recomendacoes = lote.gerar_recomendacoes(dias)
+    recomendacoes["data"] = dias["data"]
+    return recomendacoes[list(COLUNAS_PLANO)]
+
+
+def resumo_plano(plano):
+    """Totais do horizonte para o preparo dos tanques."""
+    validos = plano.dropna(subset=["radiacao_prevista"])
+    return {
+        "dias": len(plano),
+        "dias_sem_previsao": len(plano) - len(validos),
+        "volume_total_planta_litros": float(validos["volume_planta_litros"].sum()),
+        "ec_solucao_min": float(validos["ec_solucao_recomendada"].min()) if len(validos) else None,
+        "ec_solucao_max": float(validos["ec_solucao_recomendada"].max()) if len(validos) else None,
+        "dias_flush": [str(d) for d in validos.loc[validos["flush"].astype(bool), "data"]],
+    }
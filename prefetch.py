@@ -0,0 +1,203 @@
+# ==============================================================================
+# PRÉ-BUSCA DE PREVISÕES (agendador em segundo plano)
+# Mantém aquecido o cache de previsão dos sites registrados, para que o
+# primeiro clique da manhã não espere pelo open-meteo. Os sites vêm de:
+#   - cada cidade consultada na interface ('registrar_site', guardada no
+#     cache SQLite por CEREBRO_SITES_TTL_DIAS);
+#   - um CSV opcional com colunas 'cidade,estado' (CEREBRO_SITES_ARQUIVO).
+# A atualização roda uma vez ao iniciar e depois nos horários de
+# CEREBRO_PREFETCH_HORARIOS (hora local, ex: "04:30,11:00"). O padrão,
+# "rodadas", é o início da janela de trabalho (CEREBRO_PREFETCH_JANELA,
+# ex: "05:00-19:00") e cada publicação de rodada dos modelos dentro dela: o
+# cache de previsão vale até a próxima rodada ('clima.segundos_ate_proxima_rodada'),
+# então uma pré-busca só às 05:00 já teria expirado no meio da manhã.
+# CEREBRO_PREFETCH=0 desliga o agendador.
+#
+# Uso: python prefetch.py --agora          (uma atualização e sai)
+#      python prefetch.py --sites sites.csv
+# ==============================================================================
+import argparse
+import csv
+import datetime
+import logging
+import os
+import threading
+
+import clima
+import metricas
+from cache import cache_sites, normalizar_chave
+
+HORARIOS_PADRAO = "rodadas"
+JANELA_TRABALHO = os.environ.get("CEREBRO_PREFETCH_JANELA", "05:00-19:00")
+ARQUIVO_SITES = os.environ.get("CEREBRO_SITES_ARQUIVO")
+# Horizontes pré-buscados: o do Módulo 5 e o padrão do plano (Módulo 7)
+HORIZONTES_DIAS = (1, clima.DIAS_PLANO_PADRAO)
+
+logger = logging.getLogger("cerebro.prefetch")
+
+_thread = None
+_trava_inicio = threading.Lock()
+_trava_rodada = threading.Lock()
+_ultima_rodada = {}
+
+
+def registrar_site(cidade, estado):
+    """Inclui o site nas próximas pré-buscas (idempotente)."""
+    chave = normalizar_chave(cidade, estado)
+    sites = cache_sites()
+    if sites.ler(chave) is None:
+        sites.gravar(chave, {"cidade": cidade, "estado": estado})
+
+
+def ler_arquivo_sites(caminho):
+    with open(caminho, newline="", encoding="utf-8") as f:
+        return [(linha["cidade"], linha["estado"]) for linha in csv.DictReader(f)
+                if linha.get("cidade") and linha.get("estado")]
+
+
+def sites_registrados(caminho=None):
+    """[(cidade, estado)] sem repetições (mesma normalização do geocoding)."""
+    caminho = ARQUIVO_SITES if caminho is None else caminho
+    sites = {}
+    if caminho:
+        try:
+            for cidade, estado in ler_arquivo_sites(caminho):
+                sites.setdefault(normalizar_chave(cidade, estado), (cidade, estado))
+        except (OSError, KeyError) as e:
+            logger.warning("Não foi possível ler os sites de %s: %s", caminho, e)
+    for site in cache_sites().valores():
+        sites.setdefault(normalizar_chave(site["cidade"], site["estado"]), (site["cidade"], site["estado"]))
+    return list(sites.values())
+
+
+def atualizar(sites=None):
+    """Busca de novo a previsão de todos os sites, ignorando o cache.
+
+    Devolve {"sites", "ok", "falhas", "segundos"}; uma rodada de cada vez por
+    processo (uma chamada concorrente espera a anterior terminar).
+    """
+    with _trava_rodada:
+        inicio = datetime.datetime.now()
+        sites = sites_registrados() if sites is None else list(sites)
+        coordenada_site = {site: tuple(r[:2]) for site, r in clima.buscar_lat_longs(sites) if r is not None}
+        coordenadas = list(dict.fromkeys(coordenada_site.values()))
+        # Um site conta como atualizado quando a previsão do dia da sua
+        # coordenada chegou (sites vizinhos dividem a mesma coordenada)
+        recebidas = set()
+        for dias in HORIZONTES_DIAS:
+            for parcial in clima.buscar_previsoes(coordenadas, dias=dias, forcar=True):
+                if dias == 1:
+                    recebidas.update(c for c, daily in parcial.items() if daily is not None)
+        ok = sum(coordenada_site.get(tuple(site)) in recebidas for site in sites)
+        falhas = len(sites) - ok
+        metricas.incrementar("cerebro_prefetch_sites_total", ok, resultado="ok")
+        metricas.incrementar("cerebro_prefetch_sites_total", falhas, resultado="falha")
+        _ultima_rodada.update({
+            "inicio": inicio.isoformat(timespec="seconds"),
+            "sites": len(sites),
+            "ok": ok,
+            "falhas": falhas,
+            "segundos": (datetime.datetime.now() - inicio).total_seconds(),
+        })
+        return dict(_ultima_rodada)
+
+
+def ultima_rodada():
+    return dict(_ultima_rodada)
+
+
+def _janela(texto):
+    inicio, fim = (datetime.time.fromisoformat(h.strip()) for h in texto.split("-"))
+    return inicio, fim
+
+
+def horarios_rodadas(janela=JANELA_TRABALHO, dia=None):
+    """Início da janela de trabalho + cada publicação de rodada dentro dela (hora local)."""
+    inicio, fim = _janela(janela)
+    dia = datetime.date.today() if dia is None else dia
+    momento = datetime.datetime.combine(dia, inicio)
+    limite = datetime.datetime.combine(dia, fim)
+    horarios = []
+    while momento <= limite:
+        horarios.append(momento.time())
+        momento += datetime.timedelta(seconds=clima.segundos_ate_proxima_rodada(momento.timestamp()))
+    return horarios
+
+
+def _horarios(texto):
+    if texto.strip() == "rodadas":
+        return horarios_rodadas()
+    return sorted(datetime.time.fromisoformat(h.strip()) for h in texto.split(",") if h.strip())
+
+
+def proxima_execucao(horarios, agora=None):
+    """Próximo horário agendado (datetime local) depois de 'agora'."""
+    agora = datetime.datetime.now() if agora is None else agora
+    for dia in (agora.date(), agora.date() + datetime.timedelta(days=1)):
+        for h in horarios:
+            momento = datetime.datetime.combine(dia, h)
+            if momento > agora:
+                return momento
+
+
+def _laco(horarios, parar):
+    while not parar.is_set():
+        try:
+            logger.info("Pré-busca: %s", atualizar())
+        except Exception:
+            logger.exception("Falha na pré-busca de previsões")
+        espera = (proxima_execucao(horarios) - datetime.datetime.now()).total_seconds()
+        parar.wait(max(espera, 0))
+
+
+def iniciar(horarios=HORARIOS_PADRAO):
+    """Agendador em uma thread daemon; só um por processo. Devolve o Event de parada.
+
+    ValueError se 'horarios' não tiver nenhum horário.
+    """
+    global _thread
+    lista = _horarios(horarios)
+    if not lista:
+        raise ValueError(f"Nenhum horário de pré-busca em {horarios!r}")
+    with _trava_inicio:
+        if _thread is None:
+            parar = threading.Event()
+            _thread = threading.Thread(
+                target=_laco, args=(lista, parar), name="cerebro-prefetch", daemon=True
+            )
+            _thread.parar = parar
+            _thread.start()
+        return _thread.parar
+
+
+def iniciar_do_ambiente():
+    """Liga o agendador, exceto com CEREBRO_PREFETCH=0."""
+    if os.environ.get("CEREBRO_PREFETCH", "1") == "0":
+        return
+    iniciar(os.environ.get("CEREBRO_PREFETCH_HORARIOS", HORARIOS_PADRAO))
+
+
+def main(argv=None):
+    global ARQUIVO_SITES
+    parser = argparse.ArgumentParser(description="Pré-busca das previsões dos sites registrados.")
+    parser.add_argument("--agora", action="store_true", help="Faz uma única atualização e sai")
+    parser.add_argument("--sites", default=ARQUIVO_SITES, help="CSV com colunas cidade,estado")
+    parser.add_argument("--horarios", default=os.environ.get("CEREBRO_PREFETCH_HORARIOS", HORARIOS_PADRAO),
+                        help='Horários locais das atualizações (ex: 04:30,11:00) ou "rodadas"')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.agora:
+        print(atualizar(sites_registrados(args.sites)))
+        return
+
+    ARQUIVO_SITES = args.sites
+    parar = iniciar(args.horarios)
+    try:
+        parar.wait()
+    except KeyboardInterrupt:
+        parar.set()
+
+
+if __name__ == "__main__":
+    main()
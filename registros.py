@@ -0,0 +1,277 @@
+# ==============================================================================
+# REGISTROS (leads, recomendações do Módulo 5 e check-points do Módulo 6)
+# A interface só coloca o registro em uma fila limitada, em memória; uma
+# thread gravadora abre o banco, cria o esquema, junta o que chegou e grava em
+# lotes, uma transação SQLite por lote. A thread do Streamlit nunca espera
+# pelo disco para gravar: com a fila cheia (disco travado, por exemplo) o
+# registro é descartado e contado em 'cerebro_registros_total{resultado="descartado"}'.
+# Um lote que falha é gravado de novo linha a linha; só a linha com problema
+# se perde. Na saída do processo, a fila é descarregada por no máximo
+# CEREBRO_REGISTROS_ESPERA_SAIDA_S segundos.
+#
+# Índices por usuário (e-mail), site e data mantêm as consultas de histórico
+# de um site rápidas com milhões de linhas.
+#
+# Configuração: CEREBRO_REGISTROS_DB (arquivo SQLite), CEREBRO_FILA_REGISTROS
+# (tamanho da fila), CEREBRO_LOTE_REGISTROS (linhas por transação).
+# ==============================================================================
+import atexit
+import dataclasses
+import datetime
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import metricas
+import motor
+from cache import normalizar_chave
+
+CAMINHO_BANCO = os.environ.get(
+    "CEREBRO_REGISTROS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros", "cerebro.sqlite3"),
+)
+TAMANHO_FILA = int(os.environ.get("CEREBRO_FILA_REGISTROS", "10000"))
+TAMANHO_LOTE = int(os.environ.get("CEREBRO_LOTE_REGISTROS", "500"))
+# Quanto a gravadora espera por mais registros antes de fechar um lote
+ESPERA_LOTE_S = 0.2
+ESPERA_SAIDA_S = float(os.environ.get("CEREBRO_REGISTROS_ESPERA_SAIDA_S", "10"))
+# Consultas esperam a gravadora criar o esquema por no máximo (s)
+ESPERA_ESQUEMA_S = 30
+
+logger = logging.getLogger("cerebro.registros")
+
+_TIPOS_SQL = {str: "TEXT", float: "REAL", int: "INTEGER", bool: "INTEGER"}
+
+# Colunas comuns; as demais vêm dos campos das dataclasses de 'motor'
+_COLUNAS_CONTEXTO = ("momento REAL NOT NULL", "data TEXT NOT NULL", "usuario TEXT", "site TEXT",
+                     "cidade TEXT", "estado TEXT")
+
+
+def _colunas_dataclass(classe):
+    return tuple(f"{c.name} {_TIPOS_SQL[c.type]}" for c in dataclasses.fields(classe))
+
+
+TABELAS = {
+    "leads": ("momento REAL NOT NULL", "data TEXT NOT NULL", "nome TEXT NOT NULL", "email TEXT NOT NULL"),
+    "recomendacoes": _COLUNAS_CONTEXTO + _colunas_dataclass(motor.RecomendacaoDiaria),
+    "checkpoints": _COLUNAS_CONTEXTO + _colunas_dataclass(motor.CheckPoint),
+}
+
+INDICES = {
+    "leads": (("email", "data"), ("data",)),
+    "recomendacoes": (("site", "data"), ("usuario", "data"), ("data",)),
+    "checkpoints": (("site", "data"), ("usuario", "data"), ("data",)),
+}
+
+
+def criar_esquema(con):
+    for tabela, colunas in TABELAS.items():
+        con.execute(f"CREATE TABLE IF NOT EXISTS {tabela} (id INTEGER PRIMARY KEY, {', '.join(colunas)})")
+        # Campos novos nas dataclasses de 'motor' viram colunas em bancos já existentes
+        existentes = {linha[1] for linha in con.execute(f"PRAGMA table_info({tabela})")}
+        for coluna in colunas:
+            if coluna.split()[0] not in existentes:
+                con.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna.replace(' NOT NULL', '')}")
+        for campos in INDICES[tabela]:
+            con.execute(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{'_'.join(campos)} ON {tabela} ({', '.join(campos)})")
+
+
+def _conectar(caminho):
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    con = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+class GravadorRegistros:
+    """Fila limitada + thread que grava em lotes (uma transação por lote)."""
+
+    def __init__(self, caminho=CAMINHO_BANCO, tamanho_fila=TAMANHO_FILA, tamanho_lote=TAMANHO_LOTE):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self._con = None  # aberta pela própria gravadora
+        self._aberto = threading.Event()  # primeira tentativa de abrir o banco terminou
+        self._thread = threading.Thread(target=self._laco, name="cerebro-registros", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, tabela, linha):
+        """Nunca bloqueia: devolve False (e descarta) se a fila estiver cheia."""
+        try:
+            self.fila.put_nowait((tabela, linha))
+            return True
+        except queue.Full:
+            metricas.incrementar("cerebro_registros_total", tabela=tabela, resultado="descartado")
+            return False
+
+    def _proximo_lote(self):
+        lote = [self.fila.get()]
+        limite = time.monotonic() + ESPERA_LOTE_S
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _conexao(self):
+        # Só na thread gravadora; uma falha (disco, permissão) é tentada de novo no próximo lote
+        if self._con is None:
+            con = _conectar(self.caminho)
+            with con:
+                criar_esquema(con)
+            self._con = con
+        return self._con
+
+    def _inserir(self, por_tabela):
+        con = self._conexao()
+        with con:
+            for (tabela, colunas), valores in por_tabela.items():
+                con.executemany(
+                    f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                    valores,
+                )
+
+    def _gravar(self, lote):
+        por_tabela = {}
+        for tabela, linha in lote:
+            por_tabela.setdefault((tabela, tuple(linha)), []).append(tuple(linha.values()))
+        try:
+            self._inserir(por_tabela)
+            contagem = {(tabela, "gravado"): len(valores) for (tabela, _), valores in por_tabela.items()}
+        except Exception:
+            # Uma linha ruim (coluna desconhecida, tipo rejeitado) derruba a
+            # transação inteira: grava de novo uma a uma e perde só ela
+            contagem = {}
+            for (tabela, colunas), valores in por_tabela.items():
+                for valor in valores:
+                    try:
+                        self._inserir({(tabela, colunas): [valor]})
+                        resultado = "gravado"
+                    except Exception as e:
+                        logger.warning("Registro descartado em '%s': %s", tabela, e)
+                        resultado = "erro"
+                    contagem[(tabela, resultado)] = contagem.get((tabela, resultado), 0) + 1
+        for (tabela, resultado), n in contagem.items():
+            metricas.incrementar("cerebro_registros_total", n, tabela=tabela, resultado=resultado)
+
+    def _laco(self):
+        try:
+            self._conexao()
+        except Exception:
+            logger.exception("Não foi possível abrir o banco de registros %s", self.caminho)
+        finally:
+            self._aberto.set()
+        while True:
+            lote = self._proximo_lote()
+            inicio = time.perf_counter()
+            try:
+                self._gravar(lote)
+            except Exception:
+                # A gravadora não pode morrer: sem ela a fila enche e tudo é descartado
+                logger.exception("Falha ao gravar um lote de registros")
+            finally:
+                metricas.observar("cerebro_etapa_segundos", time.perf_counter() - inicio, etapa="gravar_registros")
+                for _ in lote:
+                    self.fila.task_done()
+
+    def descarregar(self, timeout=None):
+        """Espera até tudo o que foi enfileirado estar gravado, por no máximo
+        'timeout' segundos (None: sem limite). Devolve False se não terminou."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self.fila.unfinished_tasks:
+            if not self._thread.is_alive() or (limite is not None and time.monotonic() >= limite):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def consultar(self, sql, parametros=()):
+        # Conexão própria por chamada: leituras não disputam com a gravadora
+        # (que cria o esquema ao abrir o banco)
+        self._aberto.wait(ESPERA_ESQUEMA_S)
+        con = sqlite3.connect(self.caminho, timeout=30)
+        con.row_factory = sqlite3.Row
+        try:
+            return [dict(linha) for linha in con.execute(sql, parametros)]
+        finally:
+            con.close()
+
+
+_gravador = None
+_trava_gravador = threading.Lock()
+
+
+def gravador():
+    global _gravador
+    with _trava_gravador:
+        if _gravador is None:
+            _gravador = GravadorRegistros()
+            atexit.register(_gravador.descarregar, ESPERA_SAIDA_S)
+        return _gravador
+
+
+def _contexto(usuario, cidade, estado):
+    agora = datetime.datetime.now()
+    return {
+        "momento": agora.timestamp(),
+        "data": agora.date().isoformat(),
+        "usuario": usuario.strip().lower() if usuario else None,
+        "site": normalizar_chave(cidade, estado),
+        "cidade": cidade,
+        "estado": estado,
+    }
+
+
+def registrar_lead(nome, email):
+    agora = datetime.datetime.now()
+    return gravador().enfileirar("leads", {
+        "momento": agora.timestamp(),
+        "data": agora.date().isoformat(),
+        "nome": nome.strip(),
+        "email": email.strip().lower(),
+    })
+
+
+def registrar_recomendacao(r, usuario, cidade, estado):
+    """'r' é um 'motor.RecomendacaoDiaria'."""
+    return gravador().enfileirar("recomendacoes", {**_contexto(usuario, cidade, estado), **dataclasses.asdict(r)})
+
+
+def registrar_checkpoint(c, usuario, cidade, estado):
+    """'c' é um 'motor.CheckPoint'."""
+    return gravador().enfileirar("checkpoints", {**_contexto(usuario, cidade, estado), **dataclasses.asdict(c)})
+
+
+def historico_site(tabela, cidade, estado, inicio=None, fim=None, limite=1000):
+    """Linhas de 'recomendacoes' ou 'checkpoints' de um site, mais recentes primeiro.
+
+    'inicio' e 'fim' são datas ISO (inclusivas); a busca usa o índice (site, data).
+    """
+    if tabela not in ("recomendacoes", "checkpoints"):
+        raise ValueError(f"Tabela sem histórico por site: {tabela!r}")
+    sql = f"SELECT * FROM {tabela} WHERE site = ?"
+    parametros = [normalizar_chave(cidade, estado)]
+    if inicio is not None:
+        sql += " AND data >= ?"
+        parametros.append(str(inicio))
+    if fim is not None:
+        sql += " AND data <= ?"
+        parametros.append(str(fim))
+    sql += " ORDER BY data DESC, id DESC LIMIT ?"
+    parametros.append(int(limite))
+    return gravador().consultar(sql, parametros)
+
+
+def _coletar_metricas_fila():
+    if _gravador is not None:
+        yield "cerebro_registros_fila", {}, _gravador.fila.qsize()
+
+
+metricas.registrar_coletor(_coletar_metricas_fila)
@@ -0,0 +1,220 @@
+# ==============================================================================
+# RELATÓRIOS DIÁRIOS DA FROTA (Módulo 5 para todos os clientes)
+# Gera, para cada site de uma tabela (as mesmas colunas de 'lote.py', com
+# 'perfil' e 'estufa' opcionais), o relatório da recomendação do dia em HTML
+# pronto para imprimir (e, com --pdf e o pacote 'weasyprint' instalado, em
+# PDF), mais um CSV com uma linha por site.
+#
+# O texto vem de 'motor.gerar_recomendacao' + 'textos.blocos_recomendacao',
+# exatamente o que o Módulo 5 mostra na tela. Os sites são divididos em
+# blocos e desenhados em um pool de processos (um por núcleo); cada processo
+# grava seus arquivos direto no disco e devolve só as linhas do CSV, que o
+# processo principal escreve na ordem da entrada. A tabela é lida em partes
+# e há no máximo 2 blocos por processo em andamento, então a memória não
+# cresce com o número de fazendas.
+#
+# Sem a coluna 'radiacao_prevista', a previsão é buscada por parte da tabela
+# ('lote.anexar_radiacao', com os caches de 'clima.py').
+#
+# Uso: python relatorios.py sites.csv -o relatorios/2026-10-17
+#      python relatorios.py sites.csv -o saida --processos 8 --pdf
+# ==============================================================================
+import argparse
+import csv
+import dataclasses
+import datetime
+import html
+import math
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import lote
+import motor
+from cache import normalizar_chave
+from textos import blocos_recomendacao
+
+# Sites por tarefa do pool e linhas lidas da entrada por vez
+TAMANHO_BLOCO = int(os.environ.get("CEREBRO_RELATORIOS_BLOCO", "200"))
+TAMANHO_PARTE = 20000
+ARQUIVO_CSV = "recomendacoes.csv"
+
+COLUNAS_CSV = (
+    ("linha", "cidade", "estado")
+    + tuple(f.name for f in dataclasses.fields(motor.RecomendacaoDiaria))
+    + ("frequencia", "arquivo", "erro")
+)
+
+_ESTILO = """
+body { font-family: sans-serif; max-width: 46em; margin: 2em auto; color: #222; }
+h2 { font-size: 1.3em; }
+h3 { margin-top: 1.4em; border-bottom: 1px solid #ccc; }
+code { background: #f2f2f2; padding: 0 .2em; }
+.caption { color: #666; font-size: .9em; }
+@page { size: A4; margin: 1.5cm; }
+@media print { body { margin: 0; max-width: none; } }
+"""
+
+
+def _markdown_html(texto):
+    # Só o markdown usado em 'textos.py': **negrito**, *itálico*, `código` e quebras de linha
+    texto = html.escape(texto, quote=False)
+    texto = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", texto)
+    texto = re.sub(r"\*(.+?)\*", r"<em>\1</em>", texto)
+    texto = re.sub(r"`(.+?)`", r"<code>\1</code>", texto)
+    return texto.replace("\n", "<br>\n")
+
+
+def html_relatorio(blocos, titulo):
+    """Página HTML a partir dos blocos de 'textos.blocos_recomendacao'."""
+    corpo = []
+    for tipo, texto in blocos:
+        if tipo == "subheader":
+            corpo.append(f"<h3>{_markdown_html(texto)}</h3>")
+        elif tipo == "caption":
+            corpo.append(f'<p class="caption">{_markdown_html(texto)}</p>')
+        elif texto.startswith("## "):
+            corpo.append(f"<h2>{_markdown_html(texto[3:])}</h2>")
+        else:
+            corpo.append(f"<p>{_markdown_html(texto)}</p>")
+    return (
+        '<!DOCTYPE html>\n<html lang="pt-BR">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(titulo)}</title>\n<style>{_ESTILO}</style>\n</head>\n<body>\n"
+        + "\n".join(corpo)
+        + "\n</body>\n</html>\n"
+    )
+
+
+def _nome_arquivo(linha, cidade, estado):
+    slug = re.sub(r"[^a-z0-9]+", "-", normalizar_chave(cidade, estado)).strip("-")
+    return f"{linha:06d}_{slug or 'site'}"
+
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def renderizar_bloco(sites, diretorio, data, pdf=False):
+    """Desenha os relatórios de uma lista de sites (dicts) e devolve as linhas do CSV.
+
+    Roda dentro dos processos do pool; um site com erro (perfil ou estágio
+    desconhecido, sem previsão) vira uma linha com 'erro' preenchido, sem
+    parar o bloco.
+    """
+    if pdf:
+        from weasyprint import HTML
+
+    saida = []
+    for site in sites:
+        linha = {"linha": site["linha"], "cidade": site.get("cidade"), "estado": site.get("estado")}
+        try:
+            if _vazio(site.get("radiacao_prevista")):
+                raise ValueError("sem previsão de radiação")
+            r = motor.gerar_recomendacao(
+                site["estagio"], float(site["radiacao_prevista"]), float(site["temp_max_int"]),
+                float(site["temp_min_int"]), float(site["umidade_media_int"]), float(site["ec_drenado"]),
+                site.get("perfil") or None, site.get("estufa") or None,
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            motivo = e.args[0] if isinstance(e, KeyError) else str(e)
+            saida.append({**linha, "erro": motivo})
+            continue
+
+        local = f"{site.get('cidade')}, {site.get('estado')}"
+        pagina = html_relatorio(blocos_recomendacao(r, local, data), f"Recomendação {data:%d/%m/%Y} - {local}")
+        nome = _nome_arquivo(site["linha"], site.get("cidade"), site.get("estado"))
+        with open(os.path.join(diretorio, nome + ".html"), "w", encoding="utf-8") as f:
+            f.write(pagina)
+        if pdf:
+            HTML(string=pagina).write_pdf(os.path.join(diretorio, nome + ".pdf"))
+        saida.append({**linha, **dataclasses.asdict(r), "frequencia": r.frequencia,
+                      "arquivo": nome + (".pdf" if pdf else ".html")})
+    return saida
+
+
+def _partes(entrada):
+    # Tabela em partes de TAMANHO_PARTE linhas (Parquet é lido de uma vez)
+    if isinstance(entrada, pd.DataFrame):
+        yield entrada
+    elif os.path.splitext(entrada)[1].lower() in (".parquet", ".pq"):
+        yield lote.ler_sites(entrada)
+    else:
+        yield from pd.read_csv(entrada, chunksize=TAMANHO_PARTE)
+
+
+def _blocos(entrada):
+    inicio = 0
+    for parte in _partes(entrada):
+        faltando = [c for c in lote.COLUNAS_ENTRADA if c not in parte.columns]
+        if faltando:
+            raise ValueError(f"Colunas ausentes na tabela de sites: {', '.join(faltando)}")
+        if "radiacao_prevista" not in parte.columns:
+            parte = lote.anexar_radiacao(parte)
+        registros = parte.astype(object).where(parte.notna(), None).to_dict("records")
+        for i, site in enumerate(registros):
+            site["linha"] = inicio + i
+        inicio += len(registros)
+        for j in range(0, len(registros), TAMANHO_BLOCO):
+            yield registros[j:j + TAMANHO_BLOCO]
+
+
+def gerar_relatorios(entrada, diretorio, data=None, processos=None, pdf=False):
+    """Relatórios de todos os sites de 'entrada' (caminho .csv/.parquet ou DataFrame).
+
+    Grava um arquivo por site e 'recomendacoes.csv' em 'diretorio'. Devolve
+    {"sites", "relatorios", "erros", "segundos"}.
+    """
+    data = datetime.date.today() if data is None else data
+    os.makedirs(diretorio, exist_ok=True)
+    inicio = datetime.datetime.now()
+    processos = processos or os.cpu_count() or 1
+    contagem = {"sites": 0, "relatorios": 0, "erros": 0}
+
+    with open(os.path.join(diretorio, ARQUIVO_CSV), "w", newline="", encoding="utf-8") as f, \
+            ProcessPoolExecutor(max_workers=processos) as pool:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_CSV)
+        escritor.writeheader()
+        limite = 2 * processos
+        pendentes = deque()
+
+        def escrever_mais_antigo():
+            for linha in pendentes.popleft().result():
+                escritor.writerow(linha)
+                contagem["sites"] += 1
+                contagem["erros" if linha.get("erro") else "relatorios"] += 1
+
+        for bloco in _blocos(entrada):
+            pendentes.append(pool.submit(renderizar_bloco, bloco, diretorio, data, pdf))
+            if len(pendentes) >= limite:
+                escrever_mais_antigo()
+        while pendentes:
+            escrever_mais_antigo()
+
+    return {**contagem, "segundos": (datetime.datetime.now() - inicio).total_seconds()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatórios do Módulo 5 para todos os sites, em paralelo.")
+    parser.add_argument("entrada", help="Tabela de sites (.csv ou .parquet), com as colunas de 'lote.py'")
+    parser.add_argument("-o", "--saida", help="Diretório de saída; padrão: relatorios/<data>")
+    parser.add_argument("--data", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="Data impressa nos relatórios (AAAA-MM-DD)")
+    parser.add_argument("--processos", type=int, help="Processos do pool; padrão: um por núcleo")
+    parser.add_argument("--pdf", action="store_true", help="Gera também PDF, além do HTML (requer 'weasyprint')")
+    args = parser.parse_args(argv)
+
+    if args.pdf:
+        try:
+            import weasyprint  # noqa: F401
+        except ImportError:
+            parser.error("--pdf requer o pacote 'weasyprint' (pip install weasyprint)")
+
+    saida = args.saida or os.path.join("relatorios", args.data.isoformat())
+    print(gerar_relatorios(args.entrada, saida, args.data, args.processos, args.pdf))
+
+
+if __name__ == "__main__":
+    main()
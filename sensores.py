@@ -0,0 +1,384 @@
+# ==============================================================================
+# LEITURAS CONTÍNUAS DE SENSORES (Módulo 6 automático)
+# Recebe as leituras dos registradores das estufas (uma por minuto, por
+# exemplo) de um arquivo acompanhado em tempo real, do stdin ou de um socket
+# local. Mantém uma janela circular por estufa com DVP médio, ECs médios e
+# tempo acima de DVP_CRITICO / DELTA_EC_CRITICO, atualizada em O(1)
+# (amortizado) por leitura, e dispara os alertas com as mesmas regras do
+# Módulo 6.
+#
+# Formato: uma leitura por linha, em JSON
+#   {"estufa": "E1", "momento": "2026-10-17T13:00:00", "temperatura": 31.2,
+#    "umidade": 58, "ec_aplicado": 2.4, "ec_dreno": 3.1}
+# ou CSV na ordem estufa,momento,temperatura,umidade,ec_aplicado,ec_dreno[,ph].
+# Campos opcionais "estagio", "perfil" e "tipo_estufa" (os de
+# 'dados/perfis.json') trocam o estágio fenológico / perfil daquela estufa; o
+# "ph" (opcional) alimenta o diagnóstico automático ('detetive.py'). Linhas
+# com valores não finitos ou estágio/perfil desconhecido são descartadas.
+#
+# Uso: python sensores.py --arquivo leituras.jsonl --seguir
+#      registrador | python sensores.py --stdin
+#      python sensores.py --porta 9099
+# ==============================================================================
+import argparse
+import datetime
+import json
+import logging
+import math
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import motor
+import perfis
+from textos import textos_checkpoint
+
+JANELA_LEITURAS = int(os.environ.get("CEREBRO_JANELA_LEITURAS", "15"))
+ESTAGIO_PADRAO = "Florescimento"
+CAMPOS_CSV = ("estufa", "momento", "temperatura", "umidade", "ec_aplicado", "ec_dreno", "ph")
+
+logger = logging.getLogger("cerebro.sensores")
+
+
+@dataclass(frozen=True)
+class Leitura:
+    estufa: str
+    momento: float  # epoch (s)
+    temperatura: float
+    umidade: float
+    ec_aplicado: float
+    ec_dreno: float
+    estagio: str = None
+    ph: float = None
+    perfil: str = None
+    tipo_estufa: str = None
+
+
+@dataclass(frozen=True)
+class Alerta:
+    estufa: str
+    momento: float
+    # "ambiente" ou "nutricao"; 'status' usa os códigos de 'motor.CheckPoint'
+    tipo: str
+    status: str
+    checkpoint: motor.CheckPoint
+    segundos_dvp_critico: float
+    segundos_delta_ec_critico: float
+
+
+def _momento(valor):
+    if valor in (None, ""):
+        return time.time()
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return datetime.datetime.fromisoformat(str(valor)).timestamp()
+
+
+def _finito(dados, campo):
+    try:
+        valor = float(dados[campo])
+    except TypeError:
+        # null, listas etc. no JSON
+        raise ValueError(f"Valor não numérico em '{campo}': {dados[campo]!r}") from None
+    if not math.isfinite(valor):
+        raise ValueError(f"Valor não finito em '{campo}': {dados[campo]!r}")
+    return valor
+
+
+def _opcao(dados, campo, validos):
+    valor = dados.get(campo) or None
+    if valor is not None and valor not in validos:
+        raise ValueError(f"Valor desconhecido em '{campo}': {valor!r}")
+    return valor
+
+
+def interpretar_linha(linha):
+    """Leitura a partir de uma linha JSON ou CSV; None para linhas vazias.
+
+    ValueError/KeyError para linhas inválidas (campo ausente, valor não
+    finito, estágio ou perfil fora de 'dados/perfis.json').
+    """
+    linha = linha.strip()
+    if not linha or linha.startswith("#"):
+        return None
+    if linha.startswith("{"):
+        dados = json.loads(linha)
+    else:
+        dados = dict(zip(CAMPOS_CSV, (c.strip() for c in linha.split(","))))
+    tabela = perfis.tabela()
+    return Leitura(
+        estufa=str(dados["estufa"]),
+        momento=_momento(dados.get("momento")),
+        temperatura=_finito(dados, "temperatura"),
+        umidade=_finito(dados, "umidade"),
+        ec_aplicado=_finito(dados, "ec_aplicado"),
+        ec_dreno=_finito(dados, "ec_dreno"),
+        estagio=_opcao(dados, "estagio", tabela.estagios),
+        ph=_finito(dados, "ph") if dados.get("ph") not in (None, "") else None,
+        perfil=_opcao(dados, "perfil", tabela.perfis),
+        tipo_estufa=_opcao(dados, "tipo_estufa", tabela.estufas),
+    )
+
+
+class JanelaEstufa:
+    """Últimas 'tamanho' leituras de uma estufa, com somas mantidas a cada
+    entrada/saída. Para que os erros de arredondamento das somas não se
+    acumulem num fluxo sem fim, elas são refeitas com 'math.fsum' sobre a
+    janela a cada 'tamanho' leituras."""
+
+    def __init__(self, estufa, estagio=ESTAGIO_PADRAO, tamanho=JANELA_LEITURAS, perfil=None, tipo_estufa=None):
+        self.estufa = estufa
+        self.estagio = self.perfil = self.tipo_estufa = None
+        self.trocar_estagio(estagio, perfil, tipo_estufa)
+        # Cada item: (momento, leitura, dvp, ec_aplicado, ec_dreno, s_dvp_critico, s_delta_critico);
+        # as somas seguem a ordem dos itens a partir de 'dvp'
+        self._itens = deque(maxlen=tamanho)
+        self._somas = [0.0] * 5
+        self._desde_recalculo = 0
+        self.status_ambiente = "ok"
+        self.status_nutricao = "ok"
+        self.ph = None  # última leitura com pH
+
+    def __len__(self):
+        return len(self._itens)
+
+    def trocar_estagio(self, estagio, perfil=None, tipo_estufa=None):
+        """Novo estágio e/ou perfil (None mantém o atual). KeyError se a
+        combinação não existir em 'dados/perfis.json'; a janela não muda."""
+        estagio = estagio or self.estagio
+        perfil = perfil or self.perfil
+        tipo_estufa = tipo_estufa or self.tipo_estufa
+        self.dvp_meta = perfis.tabela().linha(estagio, perfil, tipo_estufa)['meta_deficit_pressao_vapor_kpa']
+        self.estagio, self.perfil, self.tipo_estufa = estagio, perfil, tipo_estufa
+
+    def adicionar(self, leitura):
+        valores = (leitura.temperatura, leitura.umidade, leitura.ec_aplicado, leitura.ec_dreno)
+        if not all(math.isfinite(v) for v in valores):
+            # Um NaN ficaria nas somas da janela mesmo depois de sair dela
+            raise ValueError(f"Leitura com valor não finito da estufa {leitura.estufa}")
+        if leitura.ph is not None:
+            self.ph = leitura.ph
+        dvp = motor.calcular_dvp(leitura.temperatura, leitura.umidade)
+        delta_ec = leitura.ec_dreno - leitura.ec_aplicado
+
+        # O intervalo desde a leitura anterior conta como "acima do limite"
+        # quando a leitura atual está acima
+        intervalo = leitura.momento - self._itens[-1][0] if self._itens else 0.0
+        intervalo = max(intervalo, 0.0)
+        s_dvp = intervalo if dvp > motor.DVP_CRITICO else 0.0
+        s_delta = intervalo if delta_ec > motor.DELTA_EC_CRITICO else 0.0
+        valores = (dvp, leitura.ec_aplicado, leitura.ec_dreno, s_dvp, s_delta)
+
+        if len(self._itens) == self._itens.maxlen:
+            for i, v in enumerate(self._itens[0][2:]):
+                self._somas[i] -= v
+        self._itens.append((leitura.momento, leitura) + valores)
+
+        self._desde_recalculo += 1
+        if self._desde_recalculo >= self._itens.maxlen:
+            self._somas = [math.fsum(coluna) for coluna in list(zip(*self._itens))[2:]]
+            self._desde_recalculo = 0
+        else:
+            for i, v in enumerate(valores):
+                self._somas[i] += v
+
+    @property
+    def dvp_medio(self):
+        return self._somas[0] / len(self._itens)
+
+    @property
+    def ec_aplicado_medio(self):
+        return self._somas[1] / len(self._itens)
+
+    @property
+    def ec_dreno_medio(self):
+        return self._somas[2] / len(self._itens)
+
+    @property
+    def delta_ec_medio(self):
+        return self.ec_dreno_medio - self.ec_aplicado_medio
+
+    @property
+    def segundos_dvp_critico(self):
+        return self._somas[3]
+
+    @property
+    def segundos_delta_ec_critico(self):
+        return self._somas[4]
+
+    def checkpoint(self):
+        """Check-point do Módulo 6 com as médias da janela (temperatura e
+        umidade são as da última leitura)."""
+        ultima = self._itens[-1][1]
+        ec_aplicado, ec_dreno = self.ec_aplicado_medio, self.ec_dreno_medio
+        delta_ec = ec_dreno - ec_aplicado
+        dvp = self.dvp_medio
+        tabela = perfis.tabela()
+        return motor.CheckPoint(
+            estagio=self.estagio,
+            perfil=self.perfil or tabela.perfil_padrao,
+            estufa=self.tipo_estufa or tabela.estufa_padrao,
+            dvp_meta=self.dvp_meta,
+            temp_atual=ultima.temperatura,
+            umidade_atual=ultima.umidade,
+            dvp_atual=dvp,
+            status_ambiente=motor.status_ambiente_tatico(dvp, self.dvp_meta),
+            ec_aplicado=ec_aplicado,
+            ec_dreno=ec_dreno,
+            delta_ec=delta_ec,
+            status_nutricao=motor.status_nutricao_tatico(delta_ec),
+        )
+
+
+class MonitorSensores:
+    """Janelas de todas as estufas; 'processar' devolve os alertas novos.
+
+    Um alerta só é disparado quando o status (ambiente ou nutrição) de uma
+    estufa muda, inclusive a volta para "ok".
+    """
+
+    def __init__(self, estagio_padrao=ESTAGIO_PADRAO, tamanho_janela=JANELA_LEITURAS, estagios=None,
+                 perfil=None, tipo_estufa=None):
+        self.estagio_padrao = estagio_padrao
+        self.tamanho_janela = tamanho_janela
+        self.estagios = dict(estagios or {})
+        self.perfil = perfil
+        self.tipo_estufa = tipo_estufa
+        self.janelas = {}
+
+    def janela(self, estufa):
+        janela = self.janelas.get(estufa)
+        if janela is None:
+            estagio = self.estagios.get(estufa, self.estagio_padrao)
+            janela = JanelaEstufa(estufa, estagio, self.tamanho_janela, self.perfil, self.tipo_estufa)
+            self.janelas[estufa] = janela
+        return janela
+
+    def processar(self, leitura):
+        """Alertas novos da leitura. ValueError/KeyError (leitura descartada)
+        para valores não finitos ou estágio/perfil sem parâmetros em
+        'dados/perfis.json'."""
+        janela = self.janela(leitura.estufa)
+        if leitura.estagio or leitura.perfil or leitura.tipo_estufa:
+            janela.trocar_estagio(leitura.estagio, leitura.perfil, leitura.tipo_estufa)
+        janela.adicionar(leitura)
+
+        c = janela.checkpoint()
+        alertas = []
+        for tipo, atual in (("ambiente", c.status_ambiente), ("nutricao", c.status_nutricao)):
+            anterior = getattr(janela, f"status_{tipo}")
+            if atual != anterior:
+                setattr(janela, f"status_{tipo}", atual)
+                alertas.append(Alerta(
+                    estufa=leitura.estufa,
+                    momento=leitura.momento,
+                    tipo=tipo,
+                    status=atual,
+                    checkpoint=c,
+                    segundos_dvp_critico=janela.segundos_dvp_critico,
+                    segundos_delta_ec_critico=janela.segundos_delta_ec_critico,
+                ))
+        return alertas
+
+
+# --- Fontes de leituras (geram linhas de texto) ---
+
+def linhas_arquivo(caminho, seguir=False, intervalo=1.0):
+    """Linhas do arquivo; com 'seguir', continua esperando linhas novas (tail -f)."""
+    with open(caminho, encoding="utf-8") as f:
+        while True:
+            linha = f.readline()
+            if linha:
+                yield linha
+            elif seguir:
+                time.sleep(intervalo)
+            else:
+                return
+
+
+def linhas_stdin():
+    yield from sys.stdin
+
+
+def linhas_socket(porta, host="127.0.0.1"):
+    """Linhas recebidas por TCP; aceita vários registradores ao mesmo tempo."""
+    fila = queue.Queue()
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for linha in self.rfile:
+                fila.put(linha.decode("utf-8", errors="replace"))
+
+    servidor = socketserver.ThreadingTCPServer((host, porta), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        while True:
+            yield fila.get()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def monitorar(linhas, monitor):
+    """Processa as linhas e gera os alertas; linhas inválidas são ignoradas
+    (com um aviso no logger 'cerebro.sensores')."""
+    for linha in linhas:
+        try:
+            leitura = interpretar_linha(linha)
+            alertas = monitor.processar(leitura) if leitura is not None else ()
+        except (ValueError, KeyError) as e:
+            logger.warning("Linha ignorada (%s): %s", e.args[0] if isinstance(e, KeyError) else e, linha.strip())
+            continue
+        yield from alertas
+
+
+def formatar_alerta(alerta):
+    t = textos_checkpoint(alerta.checkpoint)
+    momento = datetime.datetime.fromtimestamp(alerta.momento).strftime("%d/%m/%Y %H:%M:%S")
+    if alerta.tipo == "ambiente":
+        texto = f"{t['alerta_ambiente']} {t['acao_ambiente']}".strip()
+        acima = f"(DVP acima de {motor.DVP_CRITICO} kPa por {alerta.segundos_dvp_critico / 60:.0f} min na janela)"
+    else:
+        texto = f"{t['alerta_nutricao']} {t['acao_nutricao']}".strip()
+        acima = f"(Delta de EC acima de {motor.DELTA_EC_CRITICO} mS/cm por {alerta.segundos_delta_ec_critico / 60:.0f} min na janela)"
+    return f"[{momento}] Estufa {alerta.estufa}: {texto}\n   {acima}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check-point contínuo (Módulo 6) a partir de leituras de sensores.")
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument("--arquivo", help="Arquivo de leituras (JSON ou CSV, uma por linha)")
+    fonte.add_argument("--stdin", action="store_true", help="Lê as leituras do stdin")
+    fonte.add_argument("--porta", type=int, help="Recebe as leituras por TCP nesta porta (localhost)")
+    parser.add_argument("--seguir", action="store_true", help="Com --arquivo, continua lendo linhas novas")
+    parser.add_argument("--estagio", default=ESTAGIO_PADRAO, choices=list(motor.receituario_agronomico))
+    parser.add_argument("--perfil", choices=perfis.tabela().perfis, help="Perfil de 'dados/perfis.json'")
+    parser.add_argument("--tipo-estufa", choices=perfis.tabela().estufas, help="Tipo de estufa de 'dados/perfis.json'")
+    parser.add_argument("--janela", type=int, default=JANELA_LEITURAS, help="Leituras na janela móvel")
+    args = parser.parse_args(argv)
+
+    if args.arquivo:
+        linhas = linhas_arquivo(args.arquivo, seguir=args.seguir)
+    elif args.stdin:
+        linhas = linhas_stdin()
+    else:
+        linhas = linhas_socket(args.porta)
+
+    monitor = MonitorSensores(estagio_padrao=args.estagio, tamanho_janela=args.janela,
+                              perfil=args.perfil, tipo_estufa=args.tipo_estufa)
+    try:
+        for alerta in monitorar(linhas, monitor):
+            print(formatar_alerta(alerta), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
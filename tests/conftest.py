@@ -0,0 +1,140 @@
+# ==============================================================================
+# Entradas compartilhadas pelos testes de equivalência: o modo lote
+# ('lote.py'), a tabela de consulta ('cenarios.py') e os perfis ('perfis.py')
+# precisam dar as mesmas faixas e status que 'motor.gerar_recomendacao',
+# inclusive em cima dos limites do motor.
+# ==============================================================================
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lote  # noqa: E402
+import motor  # noqa: E402
+import perfis  # noqa: E402
+
+COLUNAS_MOTOR = ("estagio", "radiacao_prevista", "temp_max_int", "temp_min_int", "umidade_media_int", "ec_drenado")
+STATUS = ("faixa_pulsos", "status_nutrientes", "status_ambiente", "flush", "frequencia_aumentada_dvp")
+
+
+def entradas_aleatorias(n, semente=0, perfil=None, estufa=None):
+    """Sites aleatórios (DataFrame com as colunas de 'motor.gerar_recomendacao')."""
+    rng = np.random.default_rng(semente)
+    tabela = perfis.tabela()
+    estagios = tabela.estagios_por_perfil[perfil or tabela.perfil_padrao]
+    return pd.DataFrame({
+        "estagio": rng.choice(estagios, n),
+        "radiacao_prevista": rng.uniform(0, 35, n),
+        "temp_max_int": rng.uniform(15, 42, n),
+        "temp_min_int": rng.uniform(5, 25, n),
+        "umidade_media_int": rng.uniform(10, 100, n),
+        "ec_drenado": rng.uniform(0.5, 6, n),
+    })
+
+
+def _em_volta(valor):
+    return (np.nextafter(valor, -np.inf), valor, np.nextafter(valor, np.inf))
+
+
+def _ambientes_divergentes(limite, maximo=20):
+    # (temperatura, umidade) em que o DVP vetorizado (np.exp) e o do motor
+    # (math.exp) caem em lados diferentes de 'limite'
+    temperatura = np.repeat(np.round(np.arange(15, 40, 0.02), 2), 7)
+    pvs = 0.6108 * np.exp((17.27 * temperatura) / (temperatura + 237.3))
+    umidade = 100.0 * (1 - limite / pvs)
+    for passo in range(-3, 4):
+        alvo = umidade[passo + 3::7]
+        for _ in range(abs(passo)):
+            alvo = np.nextafter(alvo, np.inf if passo > 0 else -np.inf)
+        umidade[passo + 3::7] = alvo
+    vetorizado = lote.calcular_dvp_vetorizado(temperatura, umidade)
+    escalar = np.array([motor.calcular_dvp(t, u) for t, u in zip(temperatura, umidade)])
+    lados = lambda dvp: np.sign(dvp - limite)
+    divergentes = np.flatnonzero(lados(vetorizado) != lados(escalar))[:maximo]
+    return list(zip(temperatura[divergentes], umidade[divergentes]))
+
+
+def entradas_nos_limites(perfil=None, estufa=None):
+    """Sites exatamente em cima (e um ulp de cada lado) dos limites do motor:
+    faixas de radiação, delta de EC e DVP da meta ± margens (inclusive onde o
+    np.exp e o math.exp discordam no último bit)."""
+    tabela = perfis.tabela()
+    linhas = []
+    for estagio in tabela.estagios_por_perfil[perfil or tabela.perfil_padrao]:
+        p = tabela.linha(estagio, perfil, estufa)
+        radiacoes = [r for campo in ("radiacao_pulsos_alta", "radiacao_pulsos_baixa",
+                                     "radiacao_ec_reduzido", "radiacao_ec_aumentado")
+                     for r in _em_volta(float(p[campo]))]
+        ambientes = [(18.0, 0.0), (30.0, 100.0), (30.0, 101.0)]
+        for temperatura in (18.0, 25.0, 32.0):
+            pvs = 0.6108 * np.exp((17.27 * temperatura) / (temperatura + 237.3))
+            for limite in (p["meta_deficit_pressao_vapor_kpa"] + p["margem_dvp_alto"],
+                           p["meta_deficit_pressao_vapor_kpa"] - p["margem_dvp_baixo"]):
+                umidade = 100.0 * (1 - limite / pvs)
+                ambientes += [(temperatura, u) for u in _em_volta(umidade)]
+        for limite in (p["meta_deficit_pressao_vapor_kpa"] + p["margem_dvp_alto"],
+                       p["meta_deficit_pressao_vapor_kpa"] - p["margem_dvp_baixo"]):
+            ambientes += _ambientes_divergentes(limite)
+        for radiacao in radiacoes:
+            base = p["ec_ideal_solucao"] + motor.ajuste_ec_clima(radiacao, p)
+            ecs = [e for delta in (p["limite_delta_ec"], -p["limite_delta_ec"]) for e in _em_volta(base + delta)]
+            for ec in ecs:
+                for temperatura, umidade in ambientes:
+                    linhas.append((estagio, radiacao, temperatura, temperatura, umidade, ec))
+    return pd.DataFrame(linhas, columns=list(COLUNAS_MOTOR))
+
+
+def recomendacoes_motor(sites, perfil=None, estufa=None):
+    """'motor.gerar_recomendacao' linha a linha, como DataFrame."""
+    return pd.DataFrame([
+        vars(motor.gerar_recomendacao(*linha, perfil, estufa))
+        for linha in sites[list(COLUNAS_MOTOR)].itertuples(index=False)
+    ])
+
+
+def comparar(esperado, obtido, campos, tolerancias=None):
+    """Faixas, status e textos iguais; números iguais dentro de 'tolerancias' (campo -> atol)."""
+    tolerancias = tolerancias or {}
+    for campo in campos:
+        a = np.asarray(esperado[campo])
+        b = np.asarray(obtido[campo])
+        if campo in STATUS or not np.issubdtype(a.dtype, np.number):
+            divergentes = np.flatnonzero(a.astype(str) != b.astype(str))
+            assert not len(divergentes), f"{campo}: {len(divergentes)} linha(s) diferentes, ex. linha {divergentes[0]}"
+        else:
+            np.testing.assert_allclose(b.astype(float), a.astype(float), rtol=0,
+                                       atol=tolerancias.get(campo, 1e-12), err_msg=campo)
+
+
+@pytest.fixture(scope="session")
+def sites_aleatorios():
+    return entradas_aleatorias(5000)
+
+
+@pytest.fixture(scope="session")
+def sites_nos_limites():
+    return entradas_nos_limites()
+
+
+@pytest.fixture
+def open_meteo(tmp_path, monkeypatch):
+    """'benchmarks/servidor_openmeteo.py' no lugar do open-meteo, com caches
+    novos em 'tmp_path' e sem o teto de requisições por segundo."""
+    import cache
+    import clima
+    from benchmarks.servidor_openmeteo import ServidorOpenMeteo
+
+    diretorio = cache.DIRETORIO_CACHE
+    with ServidorOpenMeteo() as servidor:
+        monkeypatch.setattr(clima, "URL_GEOCODING", servidor.url_geocoding)
+        monkeypatch.setattr(clima, "URL_FORECAST", servidor.url_forecast)
+        monkeypatch.setattr(clima, "_limite_taxa", clima.LimiteTaxa(0))
+        cache.reiniciar_caches(str(tmp_path))
+        try:
+            yield servidor
+        finally:
+            cache.reiniciar_caches(diretorio)
@@ -0,0 +1,262 @@
+import threading
+import time
+import types
+
+import pytest
+
+import cache
+
+
+class Relogio:
+    def __init__(self, agora=1_000_000.0):
+        self.agora = agora
+
+    def time(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = Relogio()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=r.time))
+    return r
+
+
+def _esperar(condicao, limite_s=5.0):
+    fim = time.monotonic() + limite_s
+    while not condicao():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.001)
+
+
+def _em_threads(n, funcao):
+    resultados, erros = [None] * n, [None] * n
+
+    def rodar(i):
+        try:
+            resultados[i] = funcao()
+        except Exception as e:
+            erros[i] = e
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return resultados, erros
+
+
+@pytest.mark.parametrize("variante", ["Pitimbu|PB", " pitimbú |pb", "PITIMBÚ|  PB ", "Pitimbu  |Pb"])
+def test_normalizar_chave_ignora_acentos_caixa_e_espacos(variante):
+    assert cache.normalizar_chave(*variante.split("|")) == "pitimbu|pb"
+
+
+def test_normalizar_chave_separa_as_partes():
+    assert cache.normalizar_chave("São Paulo", "SP") != cache.normalizar_chave("São", "Paulo SP")
+    assert cache.normalizar_chave("São João", "PB") == "sao joao|pb"
+
+
+def test_ttl_expira(tmp_path, relogio):
+    c = cache.CacheSQLite(str(tmp_path / "c.sqlite3"), "teste", ttl_segundos=60)
+    c.gravar("a", {"v": 1})
+    c.gravar("b", [2], ttl_segundos=3600)
+    relogio.agora += 59
+    assert c.ler("a") == {"v": 1}
+    relogio.agora += 2
+    assert c.ler("a") is None
+    assert c.ler("b") == [2]
+
+    c.limpar_expirados()
+    linhas = c._conexao().execute("SELECT chave FROM teste").fetchall()
+    assert linhas == [("b",)]
+
+
+def test_ttl_expira_tambem_no_disco(tmp_path, relogio):
+    # A camada em memória não pode devolver o que o disco já deu por expirado
+    caminho = str(tmp_path / "c.sqlite3")
+    cache.CacheSQLite(caminho, "teste", ttl_segundos=60).gravar("a", 1)
+    relogio.agora += 61
+    assert cache.CacheSQLite(caminho, "teste", ttl_segundos=60).ler("a") is None
+
+
+def test_persiste_ao_reabrir(tmp_path):
+    caminho = str(tmp_path / "c.sqlite3")
+    c = cache.CacheSQLite(caminho, "geocoding", ttl_segundos=3600)
+    chave = cache.normalizar_chave("Pitimbú", "PB")
+    assert c.obter(chave, lambda: [-7.47, -34.81, "Pitimbu"]) == [-7.47, -34.81, "Pitimbu"]
+    del c
+
+    reaberto = cache.CacheSQLite(caminho, "geocoding", ttl_segundos=3600)
+    assert reaberto.obter(cache.normalizar_chave(" PITIMBU ", "pb"), pytest.fail) == [-7.47, -34.81, "Pitimbu"]
+    assert reaberto.estatisticas()["acertos_disco"] == 1
+
+
+def test_none_nao_e_gravado(tmp_path):
+    c = cache.CacheSQLite(str(tmp_path / "c.sqlite3"), "teste", ttl_segundos=3600)
+    chamadas = []
+    for _ in range(2):
+        assert c.obter("inexistente", lambda: chamadas.append(1)) is None
+    assert len(chamadas) == 2
+
+
+def test_ttl_calculado_na_gravacao(tmp_path, relogio):
+    c = cache.CacheSQLite(str(tmp_path / "c.sqlite3"), "teste", ttl_segundos=3600)
+    c.obter("a", lambda: 1, ttl_segundos=lambda: 10)
+    relogio.agora += 11
+    assert c.ler("a") is None
+
+
+def test_buscas_concorrentes_viram_uma(tmp_path):
+    c = cache.CacheSQLite(str(tmp_path / "c.sqlite3"), "teste", ttl_segundos=3600)
+    n = 8
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        # Só termina quando todas as outras threads estão esperando neste voo
+        _esperar(lambda: c._voos.agrupadas == n - 1)
+        return [-7.47, -34.81, "Pitimbu"]
+
+    resultados, erros = _em_threads(n, lambda: c.obter("pitimbu|pb", buscar))
+    assert erros == [None] * n
+    assert resultados == [[-7.47, -34.81, "Pitimbu"]] * n
+    assert len(chamadas) == 1
+    assert c.estatisticas()["falhas"] == 1
+
+
+def test_lru_despeja_o_usado_ha_mais_tempo():
+    lru = cache._LRU(3)
+    for chave in "abc":
+        lru.gravar(chave, chave.upper(), 100.0)
+    assert lru.ler("a", 0.0) == "A"    # 'a' passa a ser o mais recente
+    lru.gravar("b", "B2", 100.0)       # regravar também renova
+    lru.gravar("d", "D", 100.0)
+    assert lru.ler("c", 0.0) is None
+    lru.gravar("e", "E", 100.0)
+    assert lru.ler("a", 0.0) is None
+    assert [lru.ler(c, 0.0) for c in "bde"] == ["B2", "D", "E"]
+    assert lru.despejos == 2
+
+
+def test_lru_nunca_passa_do_limite():
+    lru = cache._LRU(5)
+    for i in range(100):
+        lru.gravar(i, i, 100.0)
+        assert len(lru) <= 5
+    assert lru.despejos == 95
+    assert [lru.ler(i, 0.0) for i in range(95, 100)] == list(range(95, 100))
+
+
+def test_lru_expirado_sai_na_leitura():
+    lru = cache._LRU(3)
+    lru.gravar("a", 1, 10.0)
+    assert lru.ler("a", 10.0) == 1
+    assert lru.ler("a", 10.5) is None
+    assert len(lru) == 0
+
+
+def test_camada_em_memoria_limitada(tmp_path):
+    c = cache.CacheSQLite(str(tmp_path / "c.sqlite3"), "teste", ttl_segundos=3600, max_itens_memoria=4)
+    for i in range(10):
+        c.gravar(f"k{i}", i)
+    assert len(c._memoria) == 4
+    # O que saiu da memória continua no disco
+    assert c.obter("k0", pytest.fail) == 0
+    assert c.estatisticas()["acertos_disco"] == 1
+
+
+def test_grupo_voos_um_calculo_para_n_chamadas():
+    voos = cache.GrupoVoos()
+    n = 8
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        _esperar(lambda: voos.agrupadas == n - 1)
+        return object()
+
+    resultados, erros = _em_threads(n, lambda: voos.executar("k", calcular))
+    assert erros == [None] * n
+    assert len(chamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+
+
+def test_grupo_voos_erro_chega_a_todos_e_nao_fica_guardado():
+    voos = cache.GrupoVoos()
+    n = 8
+    chamadas = []
+
+    def falhar():
+        chamadas.append(1)
+        _esperar(lambda: voos.agrupadas == n - 1)
+        raise ConnectionError("fora do ar")
+
+    resultados, erros = _em_threads(n, lambda: voos.executar("k", falhar))
+    assert len(chamadas) == 1
+    assert resultados == [None] * n
+    assert all(isinstance(e, ConnectionError) for e in erros)
+    # Terminado o voo, a próxima chamada executa de novo
+    assert voos.executar("k", lambda: 42) == 42
+    assert voos._em_voo == {}
+
+
+def test_grupo_voos_chaves_diferentes_nao_se_agrupam():
+    voos = cache.GrupoVoos()
+    # Só passa da barreira se as duas chaves estiverem calculando ao mesmo tempo
+    dentro = threading.Barrier(2, timeout=5)
+    chaves = iter(["a", "b"])
+
+    def executar():
+        chave = next(chaves)
+        return voos.executar(chave, lambda: dentro.wait() is not None and chave)
+
+    resultados, erros = _em_threads(2, executar)
+    assert erros == [None, None]
+    assert sorted(resultados) == ["a", "b"]
+    assert voos.agrupadas == 0
+
+
+def test_cache_memoria_um_calculo_para_n_chamadas(relogio):
+    c = cache.CacheMemoria(max_itens=10, ttl_segundos=60)
+    n = 8
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        _esperar(lambda: c._voos.agrupadas == n - 1)
+        return {"plano": 1}
+
+    resultados, erros = _em_threads(n, lambda: c.obter(("plano", 1), calcular))
+    assert erros == [None] * n
+    assert resultados == [{"plano": 1}] * n
+    assert len(chamadas) == 1
+    assert c.obter(("plano", 1), pytest.fail) == {"plano": 1}
+    assert c.estatisticas() == {"acertos_memoria": 1, "falhas": 1, "agrupadas": n - 1, "despejos_memoria": 0}
+
+    relogio.agora += 61
+    assert c.obter(("plano", 1), lambda: {"plano": 2}) == {"plano": 2}
+
+
+def test_cache_memoria_erro_chega_a_todos(relogio):
+    c = cache.CacheMemoria(max_itens=10, ttl_segundos=60)
+    n = 8
+
+    def falhar():
+        _esperar(lambda: c._voos.agrupadas == n - 1)
+        raise ValueError("entrada inválida")
+
+    _, erros = _em_threads(n, lambda: c.obter("k", falhar))
+    assert all(isinstance(e, ValueError) for e in erros)
+    assert c.estatisticas()["falhas"] == 1
+    # O erro não é guardado
+    assert c.obter("k", lambda: 3) == 3
+
+
+def test_cache_memoria_limitada(relogio):
+    c = cache.CacheMemoria(max_itens=3, ttl_segundos=60)
+    for i in range(5):
+        c.obter(i, lambda: i)
+    assert len(c._memoria) == 3
+    assert c.estatisticas()["despejos_memoria"] == 2
+    assert c.obter(4, pytest.fail) == 4
+    assert c.obter(0, lambda: "recalculado") == "recalculado"
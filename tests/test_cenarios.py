@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cenarios
+import motor
+from conftest import COLUNAS_MOTOR, comparar, recomendacoes_motor
+
+CAMPOS = ("volume_planta_litros", "ec_solucao_recomendada", "faixa_pulsos", "status_nutrientes", "flush",
+          "dvp_calculado", "status_ambiente")
+# Grades em float32; o DVP é interpolado dentro da célula (erro < 1e-4 kPa)
+TOLERANCIAS = {"volume_planta_litros": 1e-6, "ec_solucao_recomendada": 1e-6, "dvp_calculado": 1e-4}
+
+
+@pytest.fixture(scope="module")
+def tabela():
+    return cenarios.TabelaRecomendacao.construir()
+
+
+@pytest.mark.parametrize("entradas", ["sites_aleatorios", "sites_nos_limites"])
+def test_tabela_igual_ao_motor(tabela, entradas, request):
+    sites = request.getfixturevalue(entradas)
+    obtido = tabela.consultar(*(sites[c].to_numpy() for c in COLUNAS_MOTOR))
+    comparar(recomendacoes_motor(sites), obtido, CAMPOS, TOLERANCIAS)
+
+
+def test_consulta_escalar(tabela):
+    entrada = ("Florescimento", 24.0, 31.0, 19.0, 65.0, 3.4)
+    r = motor.gerar_recomendacao(*entrada)
+    obtido = tabela.consultar(*entrada)
+    assert obtido["faixa_pulsos"] == r.faixa_pulsos
+    assert obtido["status_nutrientes"] == r.status_nutrientes
+    assert obtido["status_ambiente"] == r.status_ambiente
+    assert obtido["volume_planta_litros"] == pytest.approx(r.volume_planta_litros, abs=1e-6)
+
+
+def test_varredura_igual_ao_motor():
+    radiacoes = np.arange(10.0, 27.0, 0.5)
+    umidades = np.arange(40.0, 95.0, 5.0)
+    v = cenarios.varrer(None, radiacoes, 3.0, 28.0, umidades)
+    for e, estagio in enumerate(v.eixos["estagio"]):
+        for i, radiacao in enumerate(radiacoes):
+            for m, umidade in enumerate(umidades):
+                r = motor.gerar_recomendacao(estagio, radiacao, 28.0, 28.0, umidade, 3.0)
+                assert v.campos["faixa_pulsos"][e, i, 0, 0, m] == r.faixa_pulsos
+                assert v.campos["status_ambiente"][e, i, 0, 0, m] == r.status_ambiente
+                assert v.campos["volume_planta_litros"][e, i, 0, 0, m] == pytest.approx(r.volume_planta_litros)
+
+
+def test_tabela_fora_dos_nos_igual_ao_motor(tabela):
+    # Entre os nós, perto do DVP zerado (umidade 0 e 100), nas bordas e fora da grade
+    rng = np.random.default_rng(1)
+    n = 2000
+    umidades = np.concatenate([rng.uniform(0, 0.2, n), rng.uniform(99.8, 100.2, n), rng.uniform(-1, 101, n)])
+    temperaturas = rng.uniform(-6, 51, 3 * n)
+    sites = pd.DataFrame({
+        "estagio": rng.choice(list(motor.receituario_agronomico), 3 * n),
+        "radiacao_prevista": rng.uniform(-1, 41, 3 * n),
+        "temp_max_int": temperaturas,
+        "temp_min_int": temperaturas,
+        "umidade_media_int": umidades,
+        "ec_drenado": rng.uniform(-0.5, 10.5, 3 * n),
+    })
+    obtido = tabela.consultar(*(sites[c].to_numpy() for c in COLUNAS_MOTOR))
+    comparar(recomendacoes_motor(sites), obtido, CAMPOS, TOLERANCIAS)
@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+
+import cache
+import clima
+
+
+def _epoch(texto):
+    return datetime.datetime.fromisoformat(texto).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def test_hoje_local_usa_o_fuso_do_site(open_meteo):
+    # 22:00 em Fortaleza (UTC-3) já é o dia seguinte em UTC
+    agora = _epoch("2026-10-18T01:00:00")
+    cache.cache_fusos().gravar("-7.47|-34.81", -10800)
+    assert clima._hoje_local(-7.47, -34.81, agora) == "2026-10-17"
+    # Sem resposta anterior: estimado pela longitude
+    assert clima._hoje_local(-23.55, -46.63, agora) == "2026-10-17"
+    assert clima._hoje_local(51.5, -0.12, agora) == "2026-10-18"
+    assert clima._hoje_local(35.68, 139.69, _epoch("2026-10-17T16:00:00")) == "2026-10-18"
+
+
+def test_previsao_em_cache_pela_data_do_site(open_meteo):
+    daily = clima.buscar_previsao_diaria(-7.47, -34.81)
+    assert clima.buscar_previsao_diaria(-7.47, -34.81) == daily
+    assert open_meteo.contadores["forecast"] == 1
+    hoje = clima._hoje_local(-7.47, -34.81)
+    assert daily["time"] == [hoje]
+    assert cache.cache_previsao().ler(clima._chave_previsao(-7.47, -34.81, clima.VARIAVEIS_DIARIAS, 1, hoje)) == daily
+
+
+def test_fuso_estimado_errado_nao_guarda_a_previsao_em_outra_data(open_meteo):
+    # O fuso guardado (-12 h) e o da resposta (+14 h) dão datas sempre diferentes
+    open_meteo._daily["utc_offset_seconds"] = 14 * 3600
+    cache.cache_fusos().gravar("-7.47|-34.81", -12 * 3600)
+    pedida = clima._hoje_local(-7.47, -34.81)
+
+    daily = clima.buscar_previsao_diaria(-7.47, -34.81)
+    assert daily["time"][0] != pedida
+    assert cache.cache_previsao().ler(clima._chave_previsao(-7.47, -34.81, clima.VARIAVEIS_DIARIAS, 1, pedida)) is None
+    # Com o fuso da resposta, a próxima busca já acha a previsão
+    assert clima._hoje_local(-7.47, -34.81) == daily["time"][0]
+    assert clima.buscar_previsao_diaria(-7.47, -34.81) == daily
+    assert open_meteo.contadores["forecast"] == 1
+
+
+def test_lote_guarda_pela_data_da_resposta(open_meteo):
+    open_meteo._daily["utc_offset_seconds"] = 14 * 3600
+    cache.cache_fusos().gravar("-7.47|-34.81", -12 * 3600)
+    (parcial,) = clima.buscar_previsoes([(-7.47, -34.81)])
+    assert list(clima.buscar_previsoes([(-7.47, -34.81)])) == [parcial]
+    assert open_meteo.contadores["forecast"] == 1
+
+
+@pytest.mark.parametrize("hora, segundos", [
+    ("00:29:00", 60),
+    ("00:30:00", 3 * 3600),
+    ("02:00:00", 1800 + 3600),
+    ("03:29:59", 1),
+    ("23:45:00", 2700),
+])
+def test_validade_ate_a_proxima_rodada(hora, segundos, monkeypatch):
+    monkeypatch.setattr(clima, "INTERVALO_RODADA_HORAS", 3)
+    monkeypatch.setattr(clima, "ATRASO_PUBLICACAO_MIN", 30)
+    assert clima.segundos_ate_proxima_rodada(_epoch(f"2026-10-17T{hora}")) == pytest.approx(segundos)
+
+
+def test_previsao_expira_na_proxima_rodada(open_meteo, monkeypatch):
+    import types
+
+    clima.buscar_previsao_diaria(-7.47, -34.81)
+    chave = clima._chave_previsao(-7.47, -34.81, clima.VARIAVEIS_DIARIAS, 1)
+    (expira_em,) = cache.cache_previsao()._conexao().execute(
+        "SELECT expira_em FROM previsao WHERE chave = ?", (chave,)).fetchone()
+    intervalo = clima.INTERVALO_RODADA_HORAS * 3600
+    atraso = clima.ATRASO_PUBLICACAO_MIN * 60
+    assert (expira_em - atraso) % intervalo == pytest.approx(0, abs=1e-3) or \
+        (expira_em - atraso) % intervalo == pytest.approx(intervalo, abs=1e-3)
+
+    # Depois da rodada, a mesma consulta busca de novo
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: expira_em + 1))
+    clima.buscar_previsao_diaria(-7.47, -34.81)
+    assert open_meteo.contadores["forecast"] == 2
+
+
+def test_recorte_a_partir_de_hoje():
+    daily = {"time": ["2026-10-16", "2026-10-17", "2026-10-18"], "shortwave_radiation_sum": [10.0, 20.0, 30.0]}
+    assert clima._a_partir_de_hoje(daily, 1, "2026-10-17") == {"time": ["2026-10-17"], "shortwave_radiation_sum": [20.0]}
+    assert clima._a_partir_de_hoje(daily, 5, "2026-10-18") == {"time": ["2026-10-18"], "shortwave_radiation_sum": [30.0]}
+    assert clima._a_partir_de_hoje(daily, 1, "2026-10-19") is None
+
+
+@pytest.mark.parametrize("fuso", [14 * 3600, -12 * 3600])
+def test_previsao_desatualizada_serve_o_dia_de_hoje_do_site(open_meteo, monkeypatch, fuso):
+    import requests
+
+    # Duas datas locais sempre diferentes (26 h): a do servidor só pode ser uma delas
+    cache.cache_fusos().gravar("-7.47|-34.81", fuso)
+    hoje = datetime.date.fromisoformat(clima._hoje_local(-7.47, -34.81))
+    datas = [(hoje + datetime.timedelta(days=d)).isoformat() for d in range(-2, 5)]
+    daily = {"time": datas, "shortwave_radiation_sum": [float(d) for d in range(-2, 5)]}
+    cache.cache_ultima_previsao().gravar(clima._chave_base(-7.47, -34.81, ("shortwave_radiation_sum",), 7),
+                                         {"daily": daily, "obtida_em": 0.0})
+
+    def fora_do_ar(url, params):
+        raise requests.exceptions.ConnectionError("fora do ar")
+
+    monkeypatch.setattr(clima, "_get_json", fora_do_ar)
+    servida = clima.previsao_diaria_imediata(-7.47, -34.81, ("shortwave_radiation_sum",), dias=2)
+    assert servida.desatualizada
+    assert servida.daily == {"time": datas[2:4], "shortwave_radiation_sum": [0.0, 1.0]}
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import detetive
+
+BASE = {
+    "Folhas": {
+        "Bordas queimadas": {"diagnostico": "A", "regras": [
+            {"variavel": "dvp", "operador": ">", "limite": 1.5, "peso": 1.0, "descricao": "DVP alto"},
+            {"variavel": "delta_ec", "operador": "<", "limite": 0.2, "peso": 0.5, "descricao": "Delta baixo"},
+        ]},
+        "Amarelas": {"diagnostico": "B", "regras": [
+            {"variavel": "ph", "operador": ">", "limite": 6.5, "peso": 0.8, "descricao": "pH alto"},
+        ]},
+        "Rachadas": {"diagnostico": "C"},
+    },
+}
+
+# Estufa 0: 4 leituras (uma sem DVP); estufa 1: 2 leituras. Valores em cima
+# do limite não contam (comparações estritas)
+COLUNAS = {
+    "dvp": np.array([1.5, 2.0, 1.6, np.nan, 1.0, 1.2]),
+    "delta_ec": np.array([0.1, 0.5, 0.2, 0.0, 0.1, 0.1]),
+    "ph": np.array([np.nan, np.nan, np.nan, np.nan, 7.0, 6.0]),
+}
+GRUPOS = np.array([0, 0, 0, 0, 1, 1])
+
+
+def test_avaliar_fracoes_por_estufa():
+    fracoes = detetive.IndiceRegras(BASE).avaliar(COLUNAS, GRUPOS)
+    np.testing.assert_allclose(fracoes, [[2 / 3, 2 / 4, np.nan], [0 / 2, 2 / 2, 1 / 2]])
+
+
+def test_pontuar_maior_peso_vezes_fracao():
+    indice = detetive.IndiceRegras(BASE)
+    pontuacao, _ = indice.pontuar(indice.avaliar(COLUNAS, GRUPOS))
+    # A: max(1.0 x 2/3, 0.5 x 1/2) e max(1.0 x 0, 0.5 x 1); B: sem pH = 0 e 0.8 x 1/2; C: sem regras
+    np.testing.assert_allclose(pontuacao, [[2 / 3, 0.0, 0.0], [0.5, 0.4, 0.0]])
+
+
+def test_ranquear():
+    ranking = detetive.IndiceRegras(BASE).ranquear(COLUNAS, GRUPOS, ["E1", "E2"])
+    assert ranking[["site", "diagnostico", "evidencia"]].values.tolist() == [
+        ["E1", "A", "DVP alto"],
+        ["E2", "A", "Delta baixo"],
+        ["E2", "B", "pH alto"],
+    ]
+    np.testing.assert_allclose(ranking["pontuacao"], [2 / 3, 0.5, 0.4])
+    np.testing.assert_allclose(ranking["fracao_leituras"], [2 / 3, 1.0, 0.5])
+    assert detetive.IndiceRegras(BASE).ranquear(COLUNAS, GRUPOS, ["E1", "E2"], minimo=0.45)["diagnostico"].tolist() == ["A", "A"]
+
+
+@pytest.mark.parametrize("regra, erro", [
+    ({"variavel": "umidade_solo", "operador": ">", "limite": 1}, "Variável desconhecida"),
+    ({"variavel": "dvp", "operador": ">=", "limite": 1}, "Operador inválido"),
+])
+def test_regra_invalida(regra, erro):
+    with pytest.raises(ValueError, match=erro):
+        detetive.IndiceRegras({"Folhas": {"X": {"diagnostico": "X", "regras": [dict(regra, descricao="x")]}}})
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+import historico
+
+INICIO = 1_792_000_000  # 2026-10 (UTC)
+
+
+def _leituras(momentos, base=0.0):
+    n = len(momentos)
+    return {
+        "momento": momentos,
+        "temperatura": base + np.arange(n, dtype=np.float32),
+        "umidade": base + 50 + np.arange(n, dtype=np.float32),
+        "ec_aplicado": np.full(n, 2.4, dtype=np.float32),
+        "ec_dreno": base + 3 + np.arange(n, dtype=np.float32),
+    }
+
+
+def test_anexar_e_ler(tmp_path):
+    h = historico.Historico(str(tmp_path))
+    h.anexar("leituras", "E1", _leituras([INICIO + 120, INICIO, INICIO + 60]))
+    lido = h.ler("leituras", "E1", INICIO, INICIO + 3600)["E1"]
+    assert lido["momento"].tolist() == [INICIO, INICIO + 60, INICIO + 120]
+    assert lido["temperatura"].tolist() == [1.0, 2.0, 0.0]
+    with pytest.raises(ValueError, match="só acréscimo"):
+        h.anexar("leituras", "E1", _leituras([INICIO + 30]))
+
+
+def test_gravacao_interrompida_e_cortada(tmp_path):
+    h = historico.Historico(str(tmp_path))
+    h.anexar("leituras", "E1", _leituras([INICIO, INICIO + 60, INICIO + 120]))
+    dir_mes = os.path.join(str(tmp_path), "leituras", "E1", h.meses("leituras", "E1")[0])
+
+    # Acréscimo interrompido: campos com 2 linhas a mais, meia linha ou nada;
+    # o 'momento' (gravado por último) com meio valor
+    extras = {"temperatura": 8, "umidade": 6, "ec_aplicado": 0, "ec_dreno": 4, "momento": 4}
+    for campo, n_bytes in extras.items():
+        tipo = historico.ESQUEMAS["leituras"][campo]
+        with open(h._caminho(dir_mes, campo, tipo), "ab") as f:
+            f.write(b"\xff" * n_bytes)
+
+    # A leitura continua vendo só as linhas completas
+    lido = h.ler("leituras", "E1", INICIO, INICIO + 3600)["E1"]
+    assert {c: len(v) for c, v in lido.items()} == dict.fromkeys(historico.ESQUEMAS["leituras"], 3)
+
+    # O próximo acréscimo corta os restos e fica alinhado com o 'momento'
+    h.anexar("leituras", "E1", _leituras([INICIO + 180, INICIO + 240], base=100))
+    for campo, tipo in historico.ESQUEMAS["leituras"].items():
+        assert os.path.getsize(h._caminho(dir_mes, campo, tipo)) == 5 * np.dtype(tipo).itemsize
+
+    lido = historico.Historico(str(tmp_path)).ler("leituras", "E1", INICIO, INICIO + 3600)["E1"]
+    assert lido["momento"].tolist() == [INICIO + 60 * i for i in range(5)]
+    assert lido["temperatura"].tolist() == [0.0, 1.0, 2.0, 100.0, 101.0]
+    assert lido["ec_dreno"].tolist() == [3.0, 4.0, 5.0, 103.0, 104.0]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import lote
+import motor
+from conftest import comparar, recomendacoes_motor
+
+CAMPOS = ("faixa_pulsos", "frequencia_aumentada_dvp", "volume_planta_litros", "flush", "ec_ajuste_clima",
+          "ec_ideal_ajustado", "delta_ec", "status_nutrientes", "ec_solucao_recomendada",
+          "temp_media_int", "dvp_calculado", "status_ambiente", "ec_ideal_base", "dvp_meta", "kc")
+
+
+@pytest.mark.parametrize("entradas", ["sites_aleatorios", "sites_nos_limites"])
+def test_lote_igual_ao_motor(entradas, request):
+    sites = request.getfixturevalue(entradas)
+    comparar(recomendacoes_motor(sites), lote.gerar_recomendacoes(sites), CAMPOS,
+             {"dvp_calculado": 1e-12})
+
+
+def test_dvp_vetorizado_igual_ao_motor():
+    rng = np.random.default_rng(1)
+    temperatura = rng.uniform(-5, 50, 2000)
+    umidade = rng.uniform(-10, 110, 2000)
+    esperado = [motor.calcular_dvp(t, u) for t, u in zip(temperatura, umidade)]
+    np.testing.assert_allclose(lote.calcular_dvp_vetorizado(temperatura, umidade), esperado, rtol=1e-14, atol=0)
+
+
+def test_linhas_sem_radiacao_saem_vazias(sites_aleatorios):
+    sites = sites_aleatorios.head(10).copy()
+    sites.loc[3, "radiacao_prevista"] = np.nan
+    saida = lote.gerar_recomendacoes(sites)
+    assert len(saida) == 10
+    assert saida["volume_planta_litros"].isna().tolist() == [i == 3 for i in range(10)]
+
+
+def test_estagio_desconhecido(sites_aleatorios):
+    sites = sites_aleatorios.head(5).copy()
+    sites.loc[2, "estagio"] = "Inexistente"
+    with pytest.raises(ValueError, match="Inexistente"):
+        lote.gerar_recomendacoes(sites)
+
+
+def test_main_mantem_todas_as_linhas_e_colunas(open_meteo, sites_aleatorios, tmp_path):
+    from benchmarks.servidor_openmeteo import CIDADE_INEXISTENTE
+
+    sites = sites_aleatorios.head(4).drop(columns="radiacao_prevista").round(3)
+    sites["cidade"] = ["Pitimbu", "", CIDADE_INEXISTENTE, "Pitimbu"]
+    sites["estado"] = "PB"
+    sites["observacao"] = ["a", "b", "c", "d"]
+    entrada, saida = tmp_path / "sites.csv", tmp_path / "saida.csv"
+    sites.to_csv(entrada, index=False)
+    lote.main([str(entrada), "-o", str(saida)])
+
+    resultado = pd.read_csv(saida).sort_values("observacao").reset_index(drop=True)
+    assert resultado["observacao"].tolist() == ["a", "b", "c", "d"]
+    for coluna in ("estagio", "ec_drenado", "umidade_media_int"):
+        assert resultado[coluna].tolist() == sites[coluna].tolist()
+    assert resultado["radiacao_prevista"].isna().tolist() == [False, True, True, False]
+    assert resultado["status_ambiente"].isna().tolist() == [False, True, True, False]
+
+
+def test_previsoes_comecam_antes_do_fim_do_geocoding(open_meteo, monkeypatch, sites_aleatorios):
+    import clima
+
+    monkeypatch.setattr(clima, "COORDENADAS_POR_REQUISICAO", 5)
+    open_meteo.latencia_ms = 20
+    geocodings_na_primeira_previsao = []
+    forecast = open_meteo.forecast
+
+    def forecast_contando(params):
+        if not geocodings_na_primeira_previsao:
+            geocodings_na_primeira_previsao.append(open_meteo.contadores["geocoding"])
+        return forecast(params)
+
+    open_meteo.forecast = forecast_contando
+    sites = sites_aleatorios.head(60).drop(columns="radiacao_prevista")
+    sites["cidade"] = [f"Cidade {i}" for i in range(60)]
+    sites["estado"] = "PB"
+    partes = list(lote.recomendacoes_em_fluxo(sites))
+
+    assert sorted(i for p in partes for i in p.index) == list(sites.index)
+    assert not pd.concat(partes)["radiacao_prevista"].isna().any()
+    assert geocodings_na_primeira_previsao[0] < 60
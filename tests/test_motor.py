@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+import motor
+
+
+def test_volume_segue_a_formula_do_modulo_5():
+    # radiação x transmissividade x 0.408 (ETo) x Kc / densidade x lixiviação
+    esperado = 20.0 * 0.70 * 0.408 * 0.9 / 3.0 * 1.20
+    assert motor.calcular_volume_irrigacao(20.0, 0.9) == pytest.approx(esperado, rel=1e-15)
+
+
+def test_dvp():
+    pvs = 0.6108 * math.exp(17.27 * 25.0 / (25.0 + 237.3))
+    assert motor.calcular_dvp(25.0, 60.0) == pytest.approx(pvs * 0.4, rel=1e-15)
+    assert motor.calcular_dvp(25.0, 0.0) == 0.0
+    assert motor.calcular_dvp(25.0, 101.0) == 0.0
+
+
+@pytest.mark.parametrize("radiacao, faixa", [
+    (motor.RADIACAO_PULSOS_ALTA, "padrao"),
+    (math.nextafter(motor.RADIACAO_PULSOS_ALTA, math.inf), "alta"),
+    (motor.RADIACAO_PULSOS_BAIXA, "padrao"),
+    (math.nextafter(motor.RADIACAO_PULSOS_BAIXA, -math.inf), "baixa"),
+])
+def test_limites_de_radiacao_sao_estritos(radiacao, faixa):
+    assert motor.faixa_pulsos(radiacao) == faixa
+
+
+def test_flush_acima_do_limite_de_delta_ec():
+    estagio = "Florescimento"
+    base = motor.receituario_agronomico[estagio]["ec_ideal_solucao"]
+    r = motor.gerar_recomendacao(estagio, 20.0, 30.0, 20.0, 70.0, base + motor.LIMITE_DELTA_EC + 0.01)
+    assert r.flush and r.status_nutrientes == "salinidade"
+    assert r.ec_solucao_recomendada == pytest.approx(base - motor.AJUSTE_EC_DRENO)
+    sem_flush = motor.gerar_recomendacao(estagio, 20.0, 30.0, 20.0, 70.0, base)
+    assert r.volume_planta_litros == pytest.approx(sem_flush.volume_planta_litros * motor.FATOR_FLUSH)
+
+
+@pytest.mark.parametrize("ec_aplicado, ec_dreno, status", [
+    (2.4, 3.0, "ok"),
+    (2.4, 2.4 + motor.DELTA_EC_CRITICO + 0.01, "acumulo_salino"),
+    (2.4, 2.4 + motor.DELTA_EC_CONSUMO - 0.01, "consumo_alto"),
+])
+def test_checkpoint_nutricao(ec_aplicado, ec_dreno, status):
+    c = motor.analisar_checkpoint("Florescimento", 25.0, 70.0, ec_aplicado, ec_dreno)
+    assert c.status_nutricao == status
+    assert (c.perfil, c.estufa) == ("tomate/grape", "filme")
+
+
+def test_estagio_desconhecido():
+    with pytest.raises(KeyError):
+        motor.gerar_recomendacao("Inexistente", 20.0, 30.0, 20.0, 70.0, 2.8)
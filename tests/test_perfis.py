@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import base_conhecimento
+import lote
+import motor
+import perfis
+from conftest import comparar, entradas_aleatorias, entradas_nos_limites, recomendacoes_motor
+from test_lote import CAMPOS
+
+
+def _combinacoes():
+    tabela = perfis.tabela()
+    return [(perfil, estufa) for perfil in tabela.perfis for estufa in tabela.estufas]
+
+
+def test_perfil_padrao_mantem_o_receituario():
+    # Os valores de antes dos perfis (receituário e constantes do motor)
+    assert dict(motor.receituario_agronomico["Florescimento"]) == {
+        "ec_ideal_solucao": 2.4, "ph_ideal_solucao": 5.8, "meta_deficit_pressao_vapor_kpa": 1.2, "kc": 0.8,
+    }
+    assert (motor.TRANSMISSIVIDADE_ESTUFA, motor.DENSIDADE_PLANTAS, motor.FRACAO_LIXIVIACAO) == (0.70, 3.0, 1.20)
+    assert (motor.RADIACAO_PULSOS_ALTA, motor.RADIACAO_PULSOS_BAIXA) == (24, 15)
+
+
+@pytest.mark.parametrize("perfil, estufa", _combinacoes())
+def test_lote_igual_ao_motor_por_perfil(perfil, estufa):
+    sites = pd.concat([entradas_aleatorias(500, 7, perfil, estufa), entradas_nos_limites(perfil, estufa)],
+                      ignore_index=True)
+    sites["perfil"], sites["estufa"] = perfil, estufa
+    obtido = lote.gerar_recomendacoes(sites)
+    comparar(recomendacoes_motor(sites, perfil, estufa), obtido, CAMPOS, {"dvp_calculado": 1e-12})
+    assert (obtido["perfil"].astype(str) == perfil).all() and (obtido["estufa"].astype(str) == estufa).all()
+
+
+def test_lote_com_perfis_misturados():
+    rng = np.random.default_rng(3)
+    sites = entradas_aleatorias(3000, 11)
+    combinacoes = _combinacoes() + [(None, None), ("", "")]
+    escolha = rng.integers(len(combinacoes), size=len(sites))
+    sites["perfil"] = [combinacoes[i][0] for i in escolha]
+    sites["estufa"] = [combinacoes[i][1] for i in escolha]
+    # Vazios (None/NaN/"") são o perfil padrão, como no lote
+    vazio = lambda valor: valor if isinstance(valor, str) and valor else None
+    esperado = pd.DataFrame([
+        vars(motor.gerar_recomendacao(*linha[:6], vazio(linha[6]), vazio(linha[7])))
+        for linha in sites.itertuples(index=False)
+    ])
+    comparar(esperado, lote.gerar_recomendacoes(sites), CAMPOS + ("perfil", "estufa"), {"dvp_calculado": 1e-12})
+
+
+def test_perfil_desconhecido():
+    sites = entradas_aleatorias(5)
+    sites["perfil"] = ["tomate/grape", "x/y", None, None, None]
+    with pytest.raises(ValueError, match="x/y"):
+        lote.gerar_recomendacoes(sites)
+    with pytest.raises(KeyError):
+        motor.gerar_recomendacao("Florescimento", 20.0, 30.0, 20.0, 70.0, 2.8, "x/y")
+
+
+def _base():
+    # Cópia editável de 'dados/perfis.json' (a carregada é somente-leitura)
+    return json.loads(json.dumps(base_conhecimento.perfis(), default=dict))
+
+
+def test_heranca():
+    base = _base()
+    tomate = base["culturas"]["tomate"]
+    tomate["cultivares"]["italiano"]["estagios"] = {"Florescimento": {"kc": 0.9}}
+    base["estufas"]["vidro"]["parametros"]["densidade_plantas"] = 4.0
+    tabela = perfis.resolver(base)
+    # estágio do cultivar > estágio da cultura; estufa > cultivar > cultura
+    assert tabela.linha("Florescimento", "tomate/italiano")["kc"] == 0.9
+    assert tabela.linha("Vegetativo", "tomate/italiano")["kc"] == tomate["estagios"]["Vegetativo"]["kc"]
+    assert tabela.linha("Florescimento", "tomate/italiano")["densidade_plantas"] == 2.5
+    assert tabela.linha("Florescimento", "tomate/italiano", "vidro")["densidade_plantas"] == 4.0
+    assert tabela.linha("Florescimento", "tomate/grape")["densidade_plantas"] == 3.0
+
+
+def test_campo_desconhecido_ou_ausente():
+    base = _base()
+    base["estufas"]["vidro"]["parametros"]["transmisividade"] = 0.8
+    with pytest.raises(ValueError, match="desconhecido"):
+        perfis.resolver(base)
+    base = _base()
+    del base["parametros"]["fator_flush"]
+    with pytest.raises(ValueError, match="fator_flush"):
+        perfis.resolver(base)
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+import pytest
+
+import motor
+import registros
+
+
+@pytest.fixture
+def gravador(tmp_path, monkeypatch):
+    g = registros.GravadorRegistros(str(tmp_path / "registros.sqlite3"))
+    monkeypatch.setattr(registros, "_gravador", g)
+    return g
+
+
+def _lead(i, **campos):
+    return {"momento": time.time(), "data": "2026-10-17", "nome": f"Lead {i}", "email": f"lead{i}@x.com", **campos}
+
+
+def _leads(g):
+    return [linha["nome"] for linha in g.consultar("SELECT nome FROM leads ORDER BY id")]
+
+
+def test_linha_ruim_nao_derruba_o_lote(gravador):
+    gravador._aberto.wait(5)
+    lote = [("leads", _lead(0)),
+            ("leads", _lead(1, nome=None)),            # NOT NULL, no mesmo executemany das boas
+            ("leads", _lead(2)),
+            ("leads", _lead(3, coluna_inexistente=1)),  # outro grupo de colunas
+            ("leads", _lead(4))]
+    gravador._gravar(lote)
+    assert _leads(gravador) == ["Lead 0", "Lead 2", "Lead 4"]
+
+
+def test_gravadora_sobrevive_a_erro_do_sqlite(gravador, monkeypatch):
+    gravar = gravador._gravar
+    falhas = []
+
+    def gravar_falhando_uma_vez(lote):
+        if not falhas:
+            falhas.append(lote)
+            raise sqlite3.OperationalError("database is locked")
+        gravar(lote)
+
+    monkeypatch.setattr(gravador, "_gravar", gravar_falhando_uma_vez)
+    gravador.enfileirar("leads", _lead(0))
+    assert gravador.descarregar(5)
+    gravador.enfileirar("leads", _lead(1))
+    assert gravador.descarregar(5)
+    assert falhas and gravador._thread.is_alive()
+    assert _leads(gravador) == ["Lead 1"]
+
+
+def test_banco_que_nao_abre_nao_mata_a_gravadora(tmp_path):
+    (tmp_path / "arquivo").write_text("")
+    g = registros.GravadorRegistros(str(tmp_path / "arquivo" / "registros.sqlite3"))
+    g.enfileirar("leads", _lead(0))
+    assert g.descarregar(5)
+    assert g._thread.is_alive()
+
+
+def test_historico_site_ve_o_que_foi_enfileirado(gravador):
+    c = motor.analisar_checkpoint("Florescimento", 31.0, 50.0, 2.4, 3.8)
+    for _ in range(3):
+        assert registros.registrar_checkpoint(c, "Ana@X.com ", "Pitimbú", "PB")
+    registros.registrar_checkpoint(c, "ana@x.com", "João Pessoa", "PB")
+    assert gravador.descarregar(5)
+
+    linhas = registros.historico_site("checkpoints", " pitimbu", "pb")
+    assert len(linhas) == 3
+    assert {(l["usuario"], l["site"], l["delta_ec"], l["status_nutricao"]) for l in linhas} == {
+        ("ana@x.com", "pitimbu|pb", c.delta_ec, c.status_nutricao)}
+    assert [l["id"] for l in linhas] == sorted((l["id"] for l in linhas), reverse=True)
+
+
+def test_descarregar_com_limite(gravador, monkeypatch):
+    monkeypatch.setattr(gravador, "_gravar", lambda lote: time.sleep(1))
+    gravador.enfileirar("leads", _lead(0))
+    inicio = time.monotonic()
+    assert not gravador.descarregar(0.1)
+    assert time.monotonic() - inicio < 0.5
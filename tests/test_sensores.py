@@ -0,0 +1,57 @@
+import json
+import math
+import random
+
+import pytest
+
+import motor
+import sensores
+
+
+def _linha(momento, **campos):
+    leitura = {"estufa": "E1", "momento": momento, "temperatura": 25.0, "umidade": 60.0,
+               "ec_aplicado": 2.4, "ec_dreno": 2.6}
+    leitura.update(campos)
+    return json.dumps(leitura)
+
+
+@pytest.mark.parametrize("invalida", [
+    _linha(1, temperatura=None),
+    _linha(1, umidade="alta"),
+    _linha(1, ec_dreno=[3.0]),
+    _linha(1, ph=float("nan")),
+    _linha(1, estagio="Colheita"),
+    '{"estufa": "E1"',
+    "E1,1,25,60",
+])
+def test_linha_invalida_nao_para_o_fluxo(invalida, caplog):
+    monitor = sensores.MonitorSensores()
+    # Delta de EC alto: a leitura válida seguinte tem de gerar o alerta de nutrição
+    alertas = list(sensores.monitorar([invalida, _linha(60, ec_dreno=4.0)], monitor))
+    assert [(a.tipo, a.status) for a in alertas] == [("nutricao", "acumulo_salino")]
+    assert len(monitor.janela("E1")) == 1
+    assert "Linha ignorada" in caplog.text
+
+
+def test_checkpoint_usa_as_medias_da_janela():
+    janela = sensores.JanelaEstufa("E1", tamanho=3)
+    for momento, (aplicado, dreno) in enumerate([(9.0, 9.0), (2.0, 2.5), (2.2, 3.1), (2.4, 2.9)]):
+        janela.adicionar(sensores.interpretar_linha(_linha(momento, ec_aplicado=aplicado, ec_dreno=dreno)))
+    c = janela.checkpoint()
+    assert c.ec_aplicado == pytest.approx((2.0 + 2.2 + 2.4) / 3)
+    assert c.ec_dreno == pytest.approx((2.5 + 3.1 + 2.9) / 3)
+    assert c.delta_ec == pytest.approx(c.ec_dreno - c.ec_aplicado)
+
+
+def test_somas_da_janela_nao_acumulam_erro():
+    rng = random.Random(0)
+    janela = sensores.JanelaEstufa("E1", tamanho=7)
+    # Valores de ordens de grandeza bem diferentes: somas só incrementais
+    # ficariam longe da soma exata da janela
+    for momento in range(20000):
+        dreno = rng.choice((1e9, 1e-9, 3.3)) if momento < 19986 else 3.5
+        janela.adicionar(sensores.Leitura("E1", momento * 60.0, 30.0, 40.0, 2.0, dreno))
+    itens = list(janela._itens)
+    assert janela.ec_dreno_medio == pytest.approx(3.5, rel=1e-12)
+    assert janela.dvp_medio == pytest.approx(motor.calcular_dvp(30.0, 40.0), rel=1e-12)
+    assert janela.segundos_delta_ec_critico == math.fsum(i[-1] for i in itens) == 7 * 60.0
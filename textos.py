@@ -0,0 +1,132 @@
+# ==============================================================================
+# TEXTOS DAS RECOMENDAÇÕES
+# Converte os resultados do 'motor.py' nos textos (markdown) exibidos ao
+# agrônomo. Tudo que mostra uma recomendação usa estas funções, para que a
+# tela e qualquer outra saída digam exatamente a mesma coisa.
+# ==============================================================================
+import perfis
+from motor import DVP_CRITICO
+
+
+def textos_recomendacao(r):
+    p = perfis.tabela().linha(r.estagio, r.perfil, r.estufa)
+    fracao_lix_base = (p['fracao_lixiviacao'] - 1) * 100
+    pct_flush = (p['fator_flush'] - 1) * 100
+
+    frequencia = r.frequencia
+    if r.frequencia_aumentada_dvp:
+        frequencia = f"{frequencia} (AUMENTADA DEVIDO AO DVP ALTO)"
+
+    if r.flush:
+        nota_lixiviacao = f"*(Nota: Volume inclui {fracao_lix_base:.0f}% de lixiviação + {pct_flush:.0f}% de 'flush' para lavagem de sais.)*"
+    else:
+        nota_lixiviacao = f"(Nota: Volume inclui {fracao_lix_base:.0f}% de lixiviação)"
+
+    if r.ec_ajuste_clima < 0:
+        nota_ajuste_clima = f"(EC reduzido em {-r.ec_ajuste_clima} devido à alta radiação prevista de {r.radiacao_prevista} MJ/m²)"
+    elif r.ec_ajuste_clima > 0:
+        nota_ajuste_clima = f"(EC aumentado em {r.ec_ajuste_clima} devido à baixa radiação prevista de {r.radiacao_prevista} MJ/m²)"
+    else:
+        nota_ajuste_clima = "(EC padrão para esta radiação)"
+
+    if r.status_nutrientes == "salinidade":
+        acao_nutrientes = (f"**ATENÇÃO:** Risco de salinidade. O EC do dreno ({r.ec_drenado:.1f} mS/cm) está alto.\n"
+                           f"   - O volume de água já foi aumentado em {pct_flush:.0f}% para lixiviar (lavar) o substrato.\n"
+                           f"   - Reduzir o EC da solução nutritiva para {r.ec_solucao_recomendada:.1f} mS/cm temporariamente.")
+    elif r.status_nutrientes == "consumo":
+        acao_nutrientes = (f"**INFO:** A planta está absorvendo nutrientes ativamente. O EC do dreno ({r.ec_drenado:.1f} mS/cm) está baixo.\n"
+                           f"   - Aumentar o EC da solução nutritiva para {r.ec_solucao_recomendada:.1f} mS/cm.")
+    else:
+        acao_nutrientes = (f"**OK:** O EC do dreno ({r.ec_drenado:.1f} mS/cm) está próximo da meta.\n"
+                           f"   - Manter o EC da solução nutritiva em {r.ec_solucao_recomendada:.1f} mS/cm.")
+
+    alerta_ambiente = ""
+    if r.status_ambiente == "estresse":
+        alerta_ambiente = f"   - **[ALERTA DE ESTRESSE]**\n"
+        acao_ambiente = (f"O DVP calculado ({r.dvp_calculado:.2f} kPa) está acima da meta ({r.dvp_meta} kPa).\n"
+                         f"   - O ar está seco, aumentando o risco de estresse hídrico e deficiência de Cálcio (fundo-preto).\n"
+                         f"   - **AÇÃO:** Aumentar a FREQUÊNCIA dos pulsos (conforme sugerido) para manter o substrato úmido.\n"
+                         f"   - Se disponível, acionar nebulização/sombreamento.")
+    elif r.status_ambiente == "umidade":
+        alerta_ambiente = f"   - **[ALERTA DE UMIDADE]**\n"
+        acao_ambiente = (f"O DVP calculado ({r.dvp_calculado:.2f} kPa) está muito baixo ({r.dvp_meta} kPa).\n"
+                         f"   - O ar está muito úmido, reduzindo a transpiração e o risco de doenças fúngicas.\n"
+                         f"   - **AÇÃO:** Aumentar a ventilação da estufa (abrir janelas/ventoinhas) para renovar o ar.")
+    else:
+        acao_ambiente = f"**OK:** O DVP calculado ({r.dvp_calculado:.2f} kPa) está dentro da faixa ideal (Meta: {r.dvp_meta} kPa)."
+
+    return {
+        "frequencia": frequencia,
+        "nota_lixiviacao": nota_lixiviacao,
+        "nota_ajuste_clima": nota_ajuste_clima,
+        "acao_nutrientes": acao_nutrientes,
+        "alerta_ambiente": alerta_ambiente,
+        "acao_ambiente": acao_ambiente,
+    }
+
+
+def blocos_recomendacao(r, local, data):
+    """Tela do Módulo 5 como lista de (tipo, markdown), na ordem de exibição.
+
+    'tipo' é o nome da função do Streamlit ("markdown", "subheader" ou
+    "caption"); 'relatorios.py' desenha os mesmos blocos em HTML.
+    """
+    t = textos_recomendacao(r)
+    tabela = perfis.tabela()
+    cultura = f"**Cultura:** {tabela.nomes[r.perfil]} (Estágio: {r.estagio})"
+    if r.estufa != tabela.estufa_padrao:
+        cultura += f" | **Estufa:** {tabela.nomes[r.estufa]}"
+    return [
+        ("markdown", f"## --- RECOMENDAÇÃO DE FERTIRRIGAÇÃO ({data:%d/%m/%Y}) ---"),
+        ("markdown", f"{cultura}\n**Local:** {local}"),
+        ("subheader", "1. GESTÃO DE ÁGUA"),
+        ("markdown", f"*(Baseado em previsão de {r.radiacao_prevista:.2f} MJ/m² de radiação)*"),
+        ("markdown", f"**Volume Total por Planta:** `{r.volume_planta_litros:.2f} Litros/planta/dia`"),
+        ("markdown", f"**Sugestão de Frequência:** `{t['frequencia']}`"),
+        ("caption", t['nota_lixiviacao']),
+        ("subheader", "2. GESTÃO DE NUTRIENTES"),
+        ("markdown", f"**Meta de EC Base (Estágio):** `{r.ec_ideal_base} mS/cm`"),
+        ("markdown", f"**Meta de EC Ajustada (Clima):** `{r.ec_ideal_ajustado:.1f} mS/cm`"),
+        ("caption", t['nota_ajuste_clima']),
+        ("markdown", f"**Meta de pH da Solução:** `{r.ph_ideal}`"),
+        ("markdown", f"**AÇÃO:**\n {t['acao_nutrientes']}"),
+        ("subheader", "3. ANÁLISE DE AMBIENTE (INTERNO)"),
+        ("markdown", t['alerta_ambiente'] + "   - " + t['acao_ambiente']),
+    ]
+
+
+def textos_checkpoint(c):
+    alerta_ambiente = ""
+    if c.status_ambiente == "estresse_agudo":
+        alerta_ambiente = "**[ALERTA DE ESTRESSE AGUDO]**"
+        acao_ambiente = (f"O DVP atual ({c.dvp_atual:.2f} kPa) está acima do limite crítico ({DVP_CRITICO} kPa).\n"
+                         f"   - A planta está em forte estresse hídrico (risco de 'fundo-preto').\n"
+                         f"   - **AÇÃO IMEDIATA:** Aumentar a FREQUÊNCIA dos pulsos de irrigação (ex: de 60 para 40 min).\n"
+                         f"   - Se disponível, acionar nebulização/sombreamento AGORA.")
+    elif c.status_ambiente == "estresse_elevado":
+        alerta_ambiente = "**[ATENÇÃO: Estresse Elevado]**"
+        acao_ambiente = (f"O DVP atual ({c.dvp_atual:.2f} kPa) está elevado (Meta: {c.dvp_meta} kPa).\n"
+                         f"   - Aumentar a frequência dos pulsos de irrigação para o restante da tarde.")
+    else:
+        acao_ambiente = f"**OK:** O DVP atual ({c.dvp_atual:.2f} kPa) está dentro da faixa ideal."
+
+    alerta_nutricao = ""
+    if c.status_nutricao == "acumulo_salino":
+        alerta_nutricao = "**[ALERTA DE ACÚMULO SALINO]**"
+        acao_nutricao = (f"O EC do dreno ({c.ec_dreno:.1f} mS/cm) está muito acima do EC aplicado ({c.ec_aplicado:.1f} mS/cm).\n"
+                         f"   - Isso indica que a planta não está conseguindo absorver a solução, e os sais estão concentrando rápido.\n"
+                         f"   - **AÇÃO IMEDIATA:** Realizar 1-2 pulsos de irrigação com EC 50% mais baixo (ou água pura) para lavar o substrato.")
+    elif c.status_nutricao == "consumo_alto":
+        alerta_nutricao = "**[INFO: CONSUMO ALTO]**"
+        acao_nutricao = (f"O EC do dreno ({c.ec_dreno:.1f} mS/cm) está muito próximo (ou abaixo) do EC aplicado ({c.ec_aplicado:.1f} mS/cm).\n"
+                         f"   - A planta está consumindo nutrientes mais rápido do que a aplicação.\n"
+                         f"   - **AÇÃO:** Considerar aumentar o EC da solução no próximo preparo de tanque.")
+    else:
+        acao_nutricao = f"**OK:** O EC do dreno ({c.ec_dreno:.1f} mS/cm) está com um diferencial saudável em relação ao aplicado ({c.ec_aplicado:.1f} mS/cm)."
+
+    return {
+        "alerta_ambiente": alerta_ambiente,
+        "acao_ambiente": acao_ambiente,
+        "alerta_nutricao": alerta_nutricao,
+        "acao_nutricao": acao_nutricao,
+    }